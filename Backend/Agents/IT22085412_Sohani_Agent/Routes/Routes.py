@@ -1,10 +1,19 @@
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, UploadFile, File, Depends
 from utils import extract_text_from_pdf
+from Backend.merged_backend.utils.response_shaping import ResponseShape, response_shape
 from Agent.analyser import analyze_document, summarize_text, extract_entities
 from models import PolicyAnalysis
 
 router = APIRouter()
 
+# Named field groups for ?include= on /full-analysis
+FULL_ANALYSIS_GROUPS = {
+    "scores": ["document_name", "word_count"],
+    "summary": ["summary"],
+    "analysis": ["analysis"],
+    "entities": ["entities"],
+}
+
 @router.post("/analyze", response_model=PolicyAnalysis)
 async def analyze_document_api(file: UploadFile = File(...)):
     if not file.filename.endswith(".pdf"):
@@ -33,12 +42,16 @@ async def ner_api(file: UploadFile = File(...)):
 # NEW FULL ANALYSIS ENDPOINT
 # ----------------------------
 @router.post("/full-analysis")
-async def full_analysis_api(file: UploadFile = File(...)):
+async def full_analysis_api(file: UploadFile = File(...),
+                            shape: ResponseShape = Depends(response_shape(FULL_ANALYSIS_GROUPS))):
     """
     Upload a PDF and get:
     1. Structured Policy Analysis
     2. Policy Summary
     3. Named Entities
+
+    `fields=` / `include=` select parts of the response and `max_items=`
+    caps every list (e.g. the analysis sentence lists).
     """
     if not file.filename.endswith(".pdf"):
         return {"error": "Only PDF files are supported"}
@@ -49,10 +62,10 @@ async def full_analysis_api(file: UploadFile = File(...)):
     summary = summarize_text(text)
     entities = extract_entities(text)
 
-    return {
+    return shape.respond({
         "document_name": file.filename,
         "word_count": len(text.split()),
         "analysis": analysis.dict(),
         "summary": summary,
         "entities": entities
-    }
+    })
@@ -1,7 +1,8 @@
-import re
 import os
 import uuid
 import json
+import time
+import hashlib
 import sqlite3
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
@@ -14,41 +15,33 @@ import io
 from .text_cleaners import TextCleaners
 from .numeric_normalizers import NumericNormalizers
 from .structure_cleaners import StructureCleaners
+from .artifact_cache import ArtifactCache
+# Terms counted in the corpus statistics; the reader (merged_backend/utils/term_stats.py)
+# tokenizes with the same pattern and filters stopwords at lookup time
+from Backend.merged_backend.utils.term_pattern import TERM_PATTERN
 
-class DocumentProcessor:
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# File types DocumentCleaner.extract_text can read
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.doc')
+
+
+class DocumentCleaner:
     """
-    Comprehensive document processor for climate policy documents
-    Handles text extraction, cleaning, and preprocessing
+    Text extraction and the cleaning pipeline, without any storage.
+    Opens no database and creates no files, so pool workers can hold one.
     """
 
-    def __init__(self, db_path: str = "processed_documents.db"):
-        self.db_path = db_path
-        self.init_database()
+    def __init__(self):
         self.text_cleaners = TextCleaners()
         self.numeric_normalizers = NumericNormalizers()
         self.structure_cleaners = StructureCleaners()
 
-    def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS processed_documents (
-                id TEXT PRIMARY KEY,
-                filename TEXT NOT NULL,
-                original_text TEXT NOT NULL,
-                processed_text TEXT NOT NULL,
-                metadata TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        conn.close()
-
     def extract_text(self, file_path: str) -> str:
         ext = os.path.splitext(file_path)[1].lower()
         if ext == '.pdf':
             return self._extract_pdf_text(file_path)
-        elif ext in ['.docx', '.doc']:
+        elif ext in SUPPORTED_EXTENSIONS:
             return self._extract_docx_text(file_path)
         else:
             raise ValueError(f"Unsupported file format: {ext}")
@@ -91,6 +84,138 @@ class DocumentProcessor:
         text = self.structure_cleaners.final_cleanup(text)
         return text
 
+
+class DocumentProcessor(DocumentCleaner):
+    """
+    Comprehensive document processor for climate policy documents
+    Handles text extraction, cleaning, and preprocessing
+    """
+
+    def __init__(self, db_path: str = "processed_documents.db", artifact_dir: Optional[str] = None):
+        super().__init__()
+        self.db_path = db_path
+        self.init_database()
+        self.artifact_cache = ArtifactCache(
+            artifact_dir
+            or os.environ.get("ARTIFACT_CACHE_DIR", "").strip()
+            or os.path.join(os.path.dirname(os.path.abspath(db_path)), "artifact_cache")
+        )
+
+    def init_database(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS processed_documents (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                original_text TEXT NOT NULL,
+                processed_text TEXT NOT NULL,
+                metadata TEXT,
+                source_sha256 TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Databases created before source hashes were tracked
+        cursor.execute('PRAGMA table_info(processed_documents)')
+        if 'source_sha256' not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute('ALTER TABLE processed_documents ADD COLUMN source_sha256 TEXT')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_processed_documents_source
+            ON processed_documents (source_sha256)
+        ''')
+        # Outbox of documents waiting to be delivered to the analyzer agent
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analyzer_outbox (
+                document_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                http_status INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_analyzer_outbox_due
+            ON analyzer_outbox (status, next_attempt_at)
+        ''')
+        # Corpus term statistics (document frequency per term), kept up to date on ingest
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS term_document_frequency (
+                term TEXT PRIMARY KEY,
+                df INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS corpus_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("SELECT 1 FROM corpus_counters WHERE name = 'documents'")
+        if cursor.fetchone() is None:
+            self._rebuild_term_index(cursor)
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def document_terms(text: str) -> set:
+        return {t for t in TERM_PATTERN.findall(text.lower()) if len(t) > 1}
+
+    def _rebuild_term_index(self, cursor):
+        """Backfill the term statistics from every stored document (databases from before the index)"""
+        frequencies: Dict[str, int] = {}
+        documents = 0
+        for (processed_text,) in cursor.connection.execute('SELECT processed_text FROM processed_documents'):
+            documents += 1
+            for term in self.document_terms(processed_text):
+                frequencies[term] = frequencies.get(term, 0) + 1
+        cursor.execute('DELETE FROM term_document_frequency')
+        cursor.executemany('INSERT INTO term_document_frequency (term, df) VALUES (?, ?)', frequencies.items())
+        cursor.execute('''
+            INSERT INTO corpus_counters (name, value) VALUES ('documents', ?)
+            ON CONFLICT(name) DO UPDATE SET value = excluded.value
+        ''', (documents,))
+
+    def _index_terms(self, cursor, texts: List[str]):
+        """Add documents to the term statistics, inside the caller's transaction"""
+        batch: Dict[str, int] = {}
+        for text in texts:
+            for term in self.document_terms(text):
+                batch[term] = batch.get(term, 0) + 1
+        cursor.executemany('''
+            INSERT INTO term_document_frequency (term, df) VALUES (?, ?)
+            ON CONFLICT(term) DO UPDATE SET df = df + excluded.df
+        ''', batch.items())
+        cursor.execute('''
+            UPDATE corpus_counters SET value = value + ? WHERE name = 'documents'
+        ''', (len(texts),))
+
+    def term_statistics(self, terms: Optional[List[str]] = None) -> Dict:
+        """
+        Corpus size and document frequencies, for all terms or just `terms`.
+        Same shape as the JSON table read by merged_backend/utils/term_stats.py.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM corpus_counters WHERE name = 'documents'")
+        row = cursor.fetchone()
+        if terms is None:
+            cursor.execute('SELECT term, df FROM term_document_frequency')
+            frequencies = dict(cursor.fetchall())
+        else:
+            frequencies = {}
+            for i in range(0, len(terms), 500):
+                chunk = terms[i:i + 500]
+                cursor.execute(f'''
+                    SELECT term, df FROM term_document_frequency
+                    WHERE term IN ({",".join("?" * len(chunk))})
+                ''', chunk)
+                frequencies.update(cursor.fetchall())
+        conn.close()
+        return {"documents": row[0] if row else 0, "document_frequency": frequencies}
+
     def build_docx_bytes(self, text: str, title: str = "Processed Document"):
         doc = DocxDocument()
         doc.add_heading(title, level=1)
@@ -101,23 +226,95 @@ class DocumentProcessor:
         buf.seek(0)
         return buf
 
-    def store_processed_document(self, filename: str, original_text: str, processed_text: str) -> str:
-        doc_id = str(uuid.uuid4())
-        metadata = {
-            "original_length": len(original_text),
-            "processed_length": len(processed_text),
-            "processing_timestamp": datetime.now().isoformat(),
-            "compression_ratio": len(processed_text) / len(original_text) if len(original_text) else 0,
-        }
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def document_content_hash(self, document: Dict) -> str:
+        """Hash of the processed text, taken from metadata when stored with it"""
+        return document.get("metadata", {}).get("content_sha256") or self.content_hash(document["processed_text"])
+
+    def get_docx_artifact(self, document: Dict) -> Tuple[str, str]:
+        """
+        Return (path, content_hash) of the processed DOCX for a stored document,
+        building it only if no cached copy exists for the current content.
+        """
+        content_hash = self.document_content_hash(document)
+        title = os.path.splitext(document["filename"])[0]
+        path = self.artifact_cache.get_or_build(
+            document["document_id"], content_hash, "docx",
+            lambda: self.build_docx_bytes(document["processed_text"], title=title)
+        )
+        return path, content_hash
+
+    def store_processed_document(self, filename: str, original_text: str, processed_text: str,
+                                 enqueue_for_analyzer: bool = False, source_sha256: Optional[str] = None) -> str:
+        """
+        Store a processed document. With enqueue_for_analyzer the document is
+        added to the analyzer outbox in the same transaction, so it can never
+        be stored without also being scheduled for delivery.
+        """
+        return self.store_processed_documents([{
+            "filename": filename,
+            "original_text": original_text,
+            "processed_text": processed_text,
+            "source_sha256": source_sha256,
+        }], enqueue_for_analyzer=enqueue_for_analyzer)[0]
+
+    def store_processed_documents(self, documents: List[Dict], enqueue_for_analyzer: bool = False) -> List[str]:
+        """
+        Store many processed documents in a single transaction.
+        Each item needs filename, original_text and processed_text, and may carry
+        source_sha256 (hash of the uploaded file) for de-duplication.
+        Returns the new document ids in input order.
+        """
+        doc_ids = []
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            for document in documents:
+                doc_id = str(uuid.uuid4())
+                original_text = document["original_text"]
+                processed_text = document["processed_text"]
+                metadata = {
+                    "original_length": len(original_text),
+                    "processed_length": len(processed_text),
+                    "processing_timestamp": datetime.now().isoformat(),
+                    "compression_ratio": len(processed_text) / len(original_text) if len(original_text) else 0,
+                    "content_sha256": self.content_hash(processed_text),
+                }
+                cursor.execute('''
+                    INSERT INTO processed_documents (id, filename, original_text, processed_text, metadata, source_sha256)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (doc_id, document["filename"], original_text, processed_text, json.dumps(metadata),
+                      document.get("source_sha256")))
+                if enqueue_for_analyzer:
+                    self._enqueue_outbox(cursor, doc_id)
+                doc_ids.append(doc_id)
+            self._index_terms(cursor, [d["processed_text"] for d in documents])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return doc_ids
+
+    def find_ingested_sources(self, source_hashes: List[str]) -> Dict[str, str]:
+        """Map each already stored source file hash to its document id"""
+        found = {}
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO processed_documents (id, filename, original_text, processed_text, metadata)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (doc_id, filename, original_text, processed_text, json.dumps(metadata)))
-        conn.commit()
+        # Stay below SQLite's bound-parameter limit
+        for i in range(0, len(source_hashes), 500):
+            chunk = source_hashes[i:i + 500]
+            cursor.execute(f'''
+                SELECT source_sha256, id FROM processed_documents
+                WHERE source_sha256 IN ({",".join("?" * len(chunk))})
+            ''', chunk)
+            found.update({r[0]: r[1] for r in cursor.fetchall()})
         conn.close()
-        return doc_id
+        return found
 
     def get_processed_document(self, doc_id: str) -> Optional[Dict]:
         conn = sqlite3.connect(self.db_path)
@@ -139,6 +336,23 @@ class DocumentProcessor:
             "created_at": row[4],
         }
 
+    def get_document_header(self, doc_id: str) -> Optional[Dict]:
+        """Filename and content hash of a stored document, without loading its text"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT filename, metadata FROM processed_documents WHERE id = ?', (doc_id,))
+        row = cursor.fetchone()
+        if row:
+            content_hash = (json.loads(row[1]) if row[1] else {}).get("content_sha256")
+            if not content_hash:
+                # Stored before content hashes were recorded in the metadata
+                cursor.execute('SELECT processed_text FROM processed_documents WHERE id = ?', (doc_id,))
+                content_hash = self.content_hash(cursor.fetchone()[0])
+        conn.close()
+        if not row:
+            return None
+        return {"document_id": doc_id, "filename": row[0], "content_sha256": content_hash}
+
     def list_documents(self) -> List[Dict]:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
@@ -158,27 +372,182 @@ class DocumentProcessor:
             for r in rows
         ]
 
-    def send_to_analyzer_agent(self, doc_id: str) -> Dict:
+    # ---- analyzer outbox ----
+    def _enqueue_outbox(self, cursor, doc_id: str):
+        cursor.execute('''
+            INSERT INTO analyzer_outbox (document_id, status, attempts, next_attempt_at)
+            VALUES (?, 'pending', 0, 0)
+            ON CONFLICT(document_id) DO UPDATE SET
+                status = 'pending', attempts = 0, next_attempt_at = 0,
+                last_error = NULL, http_status = NULL, updated_at = CURRENT_TIMESTAMP
+        ''', (doc_id,))
+
+    def enqueue_for_analyzer(self, doc_id: str):
+        """Queue (or re-queue) a document for delivery to the analyzer agent"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        self._enqueue_outbox(cursor, doc_id)
+        conn.commit()
+        conn.close()
+
+    def claim_outbox_batch(self, limit: int) -> List[Tuple[str, int]]:
         """
-        Send processed document to Document Analyzer Agent.
-        Config via env vars:
+        Claim up to `limit` due outbox entries for delivery.
+        Returns (document_id, attempts) pairs; claimed rows move to 'in_flight'.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT document_id, attempts FROM analyzer_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT ?
+            ''', (time.time(), limit))
+            rows = cursor.fetchall()
+            cursor.executemany('''
+                UPDATE analyzer_outbox SET status = 'in_flight', updated_at = CURRENT_TIMESTAMP
+                WHERE document_id = ?
+            ''', [(r[0],) for r in rows])
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return [(r[0], r[1]) for r in rows]
+
+    def release_inflight_outbox(self) -> int:
+        """Return entries left 'in_flight' by a previous process to 'pending'"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE analyzer_outbox SET status = 'pending', updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'in_flight'
+        ''')
+        released = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return released
+
+    def mark_outbox_delivered(self, doc_id: str, http_status: int):
+        self._update_outbox(doc_id, 'delivered', http_status=http_status, failed_attempt=False)
+
+    def mark_outbox_retry(self, doc_id: str, error: str, next_attempt_at: float, http_status: Optional[int] = None):
+        self._update_outbox(doc_id, 'pending', error=error, next_attempt_at=next_attempt_at, http_status=http_status)
+
+    def mark_outbox_failed(self, doc_id: str, error: str, http_status: Optional[int] = None):
+        self._update_outbox(doc_id, 'failed', error=error, http_status=http_status)
+
+    def _update_outbox(self, doc_id: str, status: str, error: Optional[str] = None,
+                       next_attempt_at: float = 0, http_status: Optional[int] = None,
+                       failed_attempt: bool = True):
+        """`attempts` counts failed deliveries only"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE analyzer_outbox
+            SET status = ?, attempts = attempts + ?, next_attempt_at = ?, last_error = ?,
+                http_status = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE document_id = ?
+        ''', (status, int(failed_attempt), next_attempt_at, error, http_status, doc_id))
+        conn.commit()
+        conn.close()
+
+    def get_outbox_entry(self, doc_id: str) -> Optional[Dict]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT status, attempts, next_attempt_at, last_error, http_status, updated_at
+            FROM analyzer_outbox WHERE document_id = ?
+        ''', (doc_id,))
+        row = cursor.fetchone()
+        conn.close()
+        if not row:
+            return None
+        return {
+            "document_id": doc_id,
+            "status": row[0],
+            "attempts": row[1],
+            "next_attempt_at": row[2],
+            "last_error": row[3],
+            "http_status": row[4],
+            "updated_at": row[5],
+        }
+
+    def outbox_stats(self) -> Dict[str, int]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT status, COUNT(*) FROM analyzer_outbox GROUP BY status')
+        rows = cursor.fetchall()
+        conn.close()
+        stats = {"pending": 0, "in_flight": 0, "delivered": 0, "failed": 0}
+        stats.update({r[0]: r[1] for r in rows})
+        return stats
+
+    def analyzer_config(self) -> Dict:
+        """
+        Analyzer agent settings, read from env vars:
         - ANALYZER_URL: target endpoint (required to actually send)
         - ANALYZER_SEND_FORMAT: 'json' (default) or 'docx'
         - ANALYZER_API_KEY: optional bearer token
         """
-        document = self.get_processed_document(doc_id)
-        if not document:
-            raise ValueError(f"Document {doc_id} not found")
-
-        analyzer_url = os.environ.get("ANALYZER_URL", "").strip()
-        send_format = (os.environ.get("ANALYZER_SEND_FORMAT", "json").strip().lower() or "json")
-        api_key = os.environ.get("ANALYZER_API_KEY", "").strip()
+        return {
+            "url": os.environ.get("ANALYZER_URL", "").strip(),
+            "send_format": (os.environ.get("ANALYZER_SEND_FORMAT", "json").strip().lower() or "json"),
+            "api_key": os.environ.get("ANALYZER_API_KEY", "").strip(),
+        }
 
+    def build_analyzer_request(self, document: Dict, send_format: str, api_key: str = "") -> Dict:
+        """
+        Build the keyword arguments for an analyzer POST.
+        The result works with both `requests.post` and `httpx.AsyncClient.post`.
+        """
         meta = {
-            "document_id": doc_id,
+            "document_id": document["document_id"],
             "filename": document["filename"],
             "metadata": document.get("metadata", {}),
         }
+        headers = {"Accept": "application/json"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+
+        if send_format == "docx":
+            filename_base = os.path.splitext(document["filename"])[0]
+            path, _ = self.get_docx_artifact(document)
+            with open(path, "rb") as f:
+                buf = io.BytesIO(f.read())
+            return {
+                "headers": headers,
+                "files": {
+                    "file": (
+                        f"processed_{filename_base}.docx",
+                        buf,
+                        DOCX_MEDIA_TYPE
+                    )
+                },
+                "data": {"metadata": json.dumps(meta)},
+            }
+
+        headers["Content-Type"] = "application/json"
+        return {
+            "headers": headers,
+            "json": {**meta, "processed_text": document["processed_text"]},
+        }
+
+    def send_to_analyzer_agent(self, doc_id: str) -> Dict:
+        """
+        Send processed document to Document Analyzer Agent synchronously.
+        Uploads go through the analyzer outbox instead (see analyzer_outbox.py);
+        this is kept for scripts and one-off resends.
+        """
+        document = self.get_processed_document(doc_id)
+        if not document:
+            raise ValueError(f"Document {doc_id} not found")
+
+        config = self.analyzer_config()
+        analyzer_url = config["url"]
+        send_format = config["send_format"]
 
         if not analyzer_url:
             return {
@@ -186,32 +555,15 @@ class DocumentProcessor:
                 "message": "ANALYZER_URL not configured. Skipping external call.",
                 "would_send_format": send_format,
                 "payload_preview": {
-                    "document_id": meta["document_id"],
-                    "filename": meta["filename"],
+                    "document_id": doc_id,
+                    "filename": document["filename"],
                     "text_size": len(document["processed_text"]) if send_format == "json" else None
                 }
             }
 
-        headers = {"Accept": "application/json"}
-        if api_key:
-            headers["Authorization"] = f"Bearer {api_key}"
-
         try:
-            if send_format == "docx":
-                buf = self.build_docx_bytes(document["processed_text"], title=os.path.splitext(document["filename"])[0])
-                files = {
-                    "file": (
-                        f"processed_{os.path.splitext(document['filename'])[0]}.docx",
-                        buf,
-                        "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-                }
-                data = {"metadata": json.dumps(meta)}
-                resp = requests.post(analyzer_url, headers=headers, files=files, data=data, timeout=60)
-            else:
-                payload = {**meta, "processed_text": document["processed_text"]}
-                headers["Content-Type"] = "application/json"
-                resp = requests.post(analyzer_url, headers=headers, json=payload, timeout=60)
+            resp = requests.post(analyzer_url, timeout=60,
+                                 **self.build_analyzer_request(document, send_format, config["api_key"]))
 
             try:
                 content = resp.json()
@@ -227,4 +579,4 @@ class DocumentProcessor:
             return {
                 "status": "error",
                 "message": f"Failed to send to analyzer agent: {e}",
-            }
\ No newline at end of file
+            }
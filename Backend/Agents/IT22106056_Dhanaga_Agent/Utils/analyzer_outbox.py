@@ -0,0 +1,192 @@
+"""
+Background delivery of processed documents to the Document Analyzer Agent.
+
+Uploads only write the document and an outbox row; this worker drains the
+outbox with a pooled keep-alive HTTP client, bounded concurrency and
+exponential backoff, so an analyzer outage delays delivery instead of losing it.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def _env_number(name: str, default, cast=float):
+    value = os.environ.get(name, "").strip()
+    try:
+        return cast(value) if value else default
+    except ValueError:
+        return default
+
+
+class AnalyzerOutboxWorker:
+    """
+    Drains the `analyzer_outbox` table of a DocumentProcessor.
+
+    Config via env vars (constructor arguments take precedence):
+    - ANALYZER_OUTBOX_BATCH_SIZE: entries claimed per poll (default 20)
+    - ANALYZER_OUTBOX_CONCURRENCY: simultaneous requests (default 4)
+    - ANALYZER_OUTBOX_MAX_ATTEMPTS: attempts before an entry is marked failed (default 8)
+    - ANALYZER_OUTBOX_BACKOFF_BASE / ANALYZER_OUTBOX_BACKOFF_MAX: backoff in seconds (default 2 / 300)
+    - ANALYZER_OUTBOX_POLL_INTERVAL: idle poll interval in seconds (default 2)
+    - ANALYZER_OUTBOX_TIMEOUT: per-request timeout in seconds (default 60)
+
+    `transport` is passed to httpx, e.g. `httpx.ASGITransport(app=stand_in_app)`
+    to run the worker against a local stand-in analyzer.
+    """
+
+    def __init__(self, doc_processor, analyzer_url: Optional[str] = None,
+                 batch_size: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 max_attempts: Optional[int] = None, backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None, poll_interval: Optional[float] = None,
+                 timeout: Optional[float] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.doc_processor = doc_processor
+        self._analyzer_url = analyzer_url
+        self.batch_size = batch_size or _env_number("ANALYZER_OUTBOX_BATCH_SIZE", 20, int)
+        self.max_concurrency = max_concurrency or _env_number("ANALYZER_OUTBOX_CONCURRENCY", 4, int)
+        self.max_attempts = max_attempts or _env_number("ANALYZER_OUTBOX_MAX_ATTEMPTS", 8, int)
+        self.backoff_base = backoff_base or _env_number("ANALYZER_OUTBOX_BACKOFF_BASE", 2.0)
+        self.backoff_max = backoff_max or _env_number("ANALYZER_OUTBOX_BACKOFF_MAX", 300.0)
+        self.poll_interval = poll_interval or _env_number("ANALYZER_OUTBOX_POLL_INTERVAL", 2.0)
+        self.timeout = timeout or _env_number("ANALYZER_OUTBOX_TIMEOUT", 60.0)
+        self.transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def analyzer_url(self) -> str:
+        return self._analyzer_url or self.doc_processor.analyzer_config()["url"]
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Open the pooled client and start the delivery loop"""
+        if self.running:
+            return
+        if not self.analyzer_url:
+            logger.info("ANALYZER_URL not configured; documents will be held in the analyzer outbox")
+            return
+
+        released = await asyncio.to_thread(self.doc_processor.release_inflight_outbox)
+        if released:
+            logger.info(f"Re-queued {released} analyzer outbox entries left in flight")
+
+        await self._open_client()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the delivery loop and close the client"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def wake(self):
+        """Deliver newly queued documents without waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _open_client(self):
+        if self._client is None:
+            limits = httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            )
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=limits, transport=self.transport)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _run(self):
+        while True:
+            try:
+                delivered = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Analyzer outbox delivery loop error: {e}")
+                delivered = 0
+
+            # A full batch means more work is probably waiting
+            if delivered >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run_once(self) -> int:
+        """
+        Claim one batch of due outbox entries and deliver them concurrently.
+        Returns the number of entries attempted.
+        """
+        await self._open_client()
+        batch = await asyncio.to_thread(self.doc_processor.claim_outbox_batch, self.batch_size)
+        if batch:
+            await asyncio.gather(*(self._deliver(doc_id, attempts) for doc_id, attempts in batch))
+        return len(batch)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempts))
+        # Full jitter keeps retries of a failed batch from arriving together
+        return random.uniform(delay / 2, delay)
+
+    async def _deliver(self, doc_id: str, attempts: int):
+        error, http_status, retryable = None, None, True
+        try:
+            async with self._semaphore:
+                document = await asyncio.to_thread(self.doc_processor.get_processed_document, doc_id)
+                if not document:
+                    await asyncio.to_thread(self.doc_processor.mark_outbox_failed, doc_id, "Document not found")
+                    return
+
+                config = self.doc_processor.analyzer_config()
+                request_kwargs = await asyncio.to_thread(
+                    self.doc_processor.build_analyzer_request, document, config["send_format"], config["api_key"]
+                )
+
+                resp = await self._client.post(self.analyzer_url, **request_kwargs)
+                http_status = resp.status_code
+                if resp.is_success:
+                    await asyncio.to_thread(self.doc_processor.mark_outbox_delivered, doc_id, http_status)
+                    return
+                error = f"Analyzer returned HTTP {http_status}: {resp.text[:200]}"
+                retryable = http_status >= 500 or http_status in (408, 429)
+        except asyncio.CancelledError:
+            raise
+        except httpx.HTTPError as e:
+            error = f"Failed to send to analyzer agent: {e!r}"
+        except Exception as e:
+            # Loading or building the request failed; the entry must not stay in_flight
+            error = f"Failed to prepare analyzer request: {e!r}"
+
+        try:
+            if not retryable or attempts + 1 >= self.max_attempts:
+                logger.error(f"Giving up on analyzer delivery of {doc_id}: {error}")
+                await asyncio.to_thread(self.doc_processor.mark_outbox_failed, doc_id, error, http_status)
+            else:
+                next_attempt_at = time.time() + self._backoff(attempts)
+                logger.warning(f"Analyzer delivery of {doc_id} failed (attempt {attempts + 1}): {error}")
+                await asyncio.to_thread(
+                    self.doc_processor.mark_outbox_retry, doc_id, error, next_attempt_at, http_status
+                )
+        except Exception as e:
+            # Left in_flight; release_inflight_outbox re-queues it on the next start
+            logger.error(f"Could not record analyzer delivery failure of {doc_id}: {e!r}")
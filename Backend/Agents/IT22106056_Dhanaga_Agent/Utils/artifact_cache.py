@@ -0,0 +1,62 @@
+"""
+On-disk cache for generated download artifacts (e.g. processed DOCX files)
+"""
+import os
+import glob
+import tempfile
+from typing import Callable, BinaryIO, Optional
+
+
+class ArtifactCache:
+    """
+    Stores generated artifacts as `<document_id>-<content_hash>.<ext>`.
+
+    Processed text never changes for a document id, so an artifact only needs
+    to be built once per content hash; later downloads are served from disk.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, doc_id: str, content_hash: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, f"{doc_id}-{content_hash}.{ext}")
+
+    def lookup(self, doc_id: str, content_hash: str, ext: str) -> Optional[str]:
+        """Path of the cached artifact, or None if it has not been built yet"""
+        path = self.path_for(doc_id, content_hash, ext)
+        return path if os.path.exists(path) else None
+
+    def get_or_build(self, doc_id: str, content_hash: str, ext: str, build: Callable[[], BinaryIO]) -> str:
+        """
+        Return the path of a cached artifact, building it with `build()` on a miss.
+        Writes go to a temp file first and are renamed into place, so concurrent
+        readers never see a partially written artifact.
+        """
+        path = self.lookup(doc_id, content_hash, ext)
+        if path:
+            return path
+
+        path = self.path_for(doc_id, content_hash, ext)
+        buf = build()
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=f".{ext}.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buf.getvalue())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        self._remove_stale(doc_id, ext, keep=path)
+        return path
+
+    def _remove_stale(self, doc_id: str, ext: str, keep: str):
+        """Drop artifacts of the same document built from older content"""
+        for stale in glob.glob(os.path.join(self.cache_dir, f"{glob.escape(doc_id)}-*.{ext}")):
+            if stale != keep:
+                try:
+                    os.unlink(stale)
+                except OSError:
+                    pass
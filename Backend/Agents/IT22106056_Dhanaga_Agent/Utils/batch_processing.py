@@ -0,0 +1,78 @@
+"""
+Process-pool helpers for extracting and cleaning many documents in parallel
+"""
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from .Utils import DocumentCleaner
+
+# Per-process extraction/cleaning pipeline; workers never open the database
+_worker_cleaner: Optional[DocumentCleaner] = None
+
+# Shared pool for the API process
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def default_worker_count() -> int:
+    value = os.environ.get("BATCH_MAX_WORKERS", "").strip()
+    return int(value) if value.isdigit() and int(value) > 0 else (os.cpu_count() or 1)
+
+
+def _init_worker():
+    global _worker_cleaner
+    _worker_cleaner = DocumentCleaner()
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def try_file_sha256(file_path: str) -> Optional[str]:
+    """file_sha256, or None when the file can no longer be read (e.g. removed meanwhile)"""
+    try:
+        return file_sha256(file_path)
+    except OSError:
+        return None
+
+
+def extract_and_clean(file_path: str) -> Dict[str, str]:
+    """
+    Extract and clean one document inside a pool worker.
+    Only the resulting texts cross the process boundary.
+    """
+    if _worker_cleaner is None:
+        _init_worker()
+    original_text = _worker_cleaner.extract_text(file_path)
+    processed_text = _worker_cleaner.clean_and_preprocess(original_text)
+    return {
+        "original_text": original_text,
+        "processed_text": processed_text,
+    }
+
+
+def create_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=max_workers or default_worker_count(),
+        initializer=_init_worker,
+    )
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Lazily create the pool shared by API requests"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = create_process_pool()
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -4,6 +4,8 @@ Structure-oriented and climate policy specific cleaning functions
 import re
 from typing import Set, List
 
+from Backend.merged_backend.utils.section_headers import SECTION_HEADERS
+
 class StructureCleaners:
     """
     Collection of structure-oriented and domain-specific cleaning methods
@@ -45,12 +47,12 @@ class StructureCleaners:
     
     def _remove_duplicate_sentences(self, text: str) -> str:
         """Remove duplicate sentences often caused by OCR or PDF extraction"""
-        sentences = re.split(r'[.!?]+', text)
         unique_sentences = []
         seen_sentences = set()
         
-        for sentence in sentences:
-            sentence = sentence.strip()
+        # Same pieces as re.split(r'[.!?]+', text), without building the list
+        for match in re.finditer(r'[^.!?]+', text):
+            sentence = match.group().strip()
             if sentence and len(sentence) > 10:  # Ignore very short fragments
                 # Normalize for comparison (remove extra spaces, lowercase)
                 normalized = re.sub(r'\s+', ' ', sentence.lower())
@@ -77,18 +79,8 @@ class StructureCleaners:
     
     def _section_splitting(self, text: str) -> str:
         """Detect and organize sections by headings"""
-        # Common policy document sections
-        section_headers = [
-            r'\b(introduction|executive\s+summary)\b',
-            r'\b(objectives?|goals?|targets?)\b',
-            r'\b(mitigation|adaptation)\b',
-            r'\b(implementation|monitoring)\b',
-            r'\b(conclusion|summary)\b',
-            r'\b(annex|appendix)\b'
-        ]
-        
         # Add section markers for better organization
-        for header_pattern in section_headers:
+        for header_pattern in SECTION_HEADERS:
             text = re.sub(f'^({header_pattern})', r'\n=== \1 ===\n', text, flags=re.IGNORECASE | re.MULTILINE)
         
         return text
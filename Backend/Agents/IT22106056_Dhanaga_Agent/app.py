@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routes.routes import router as preprocess_router
+from .routes.routes import router as preprocess_router, outbox_worker
+from .Utils.batch_processing import shutdown_process_pool
+from Backend.merged_backend.utils.profiling import ProfilingMiddleware, build_profile_router
 from dotenv import load_dotenv
 
 # Load .env for this agent
@@ -16,8 +18,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-request profiling (admin only)
+app.add_middleware(ProfilingMiddleware)
+
+@app.on_event("startup")
+async def start_outbox_worker():
+    await outbox_worker.start()
+
+@app.on_event("shutdown")
+async def stop_outbox_worker():
+    await outbox_worker.stop()
+    shutdown_process_pool()
+
 # Mount routes under a clear prefix to avoid collisions
 app.include_router(preprocess_router, prefix="/api/preprocess", tags=["Preprocessing"])
+app.include_router(build_profile_router())
 
 @app.get("/")
 def root():
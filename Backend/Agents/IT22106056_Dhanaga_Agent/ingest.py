@@ -0,0 +1,255 @@
+"""
+Bulk-ingest a directory tree of PDF/DOCX policy documents into the processed-document store.
+
+Usage:
+    python -m Backend.Agents.IT22106056_Dhanaga_Agent.ingest path/to/archive [--workers N]
+
+Files are hashed and extracted/cleaned across all cores. Files whose content
+hash is already stored are skipped, and progress is checkpointed so an
+interrupted run resumes where it stopped.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .Utils.Utils import DocumentProcessor, SUPPORTED_EXTENSIONS
+from .Utils.batch_processing import create_process_pool, default_worker_count, extract_and_clean, try_file_sha256
+
+logger = logging.getLogger("ingest")
+
+
+def iter_documents(root: str) -> Iterator[str]:
+    """Yield supported document paths under root in a stable order"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def _file_key(path: str) -> Optional[Tuple[str, int, int]]:
+    """(path, size, mtime), or None if the file disappeared after the walk"""
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        logger.warning(f"Skipping {path}: {e}")
+        return None
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+class Checkpoint:
+    """
+    Append-only JSONL record of files that are finished (stored, duplicate or
+    already ingested). A file is skipped on resume while its path, size and
+    mtime are unchanged, without re-reading it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[Tuple[str, int, int]] = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.done.add((entry["path"], entry["size"], entry["mtime_ns"]))
+                    except (ValueError, KeyError):
+                        continue  # torn last line from an interrupted run
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, key: Tuple[str, int, int]) -> bool:
+        return key in self.done
+
+    def record(self, entries: List[Dict]):
+        for entry in entries:
+            self._file.write(json.dumps(entry) + "\n")
+            self.done.add((entry["path"], entry["size"], entry["mtime_ns"]))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class Progress:
+    """Throughput counters reported as docs/sec and MB/sec"""
+
+    def __init__(self, report_every: float):
+        self.started = time.perf_counter()
+        self.report_every = report_every
+        self.last_report = self.started
+        self.docs = 0
+        self.bytes = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def add(self, size: int):
+        self.docs += 1
+        self.bytes += size
+
+    def rates(self) -> Tuple[float, float]:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return self.docs / elapsed, self.bytes / elapsed / (1024 * 1024)
+
+    def maybe_report(self, total: int):
+        now = time.perf_counter()
+        if now - self.last_report >= self.report_every:
+            self.last_report = now
+            docs_per_sec, mb_per_sec = self.rates()
+            logger.info(
+                f"{self.docs + self.skipped + self.failed}/{total} files | stored {self.docs} | "
+                f"skipped {self.skipped} | failed {self.failed} | "
+                f"{docs_per_sec:.1f} docs/sec | {mb_per_sec:.2f} MB/sec"
+            )
+
+
+def ingest(root: str, db_path: str, checkpoint_path: str, workers: int, commit_every: int,
+           enqueue_for_analyzer: bool = False, report_every: float = 10.0) -> Dict:
+    processor = DocumentProcessor(db_path=db_path)
+    checkpoint = Checkpoint(checkpoint_path)
+    progress = Progress(report_every)
+
+    candidates = []
+    for path in iter_documents(root):
+        key = _file_key(path)
+        if key is None:
+            continue
+        if key in checkpoint:
+            progress.skipped += 1
+        else:
+            candidates.append(key)
+    total = len(candidates) + progress.skipped
+    logger.info(f"Found {total} documents under {root}; {progress.skipped} already checkpointed")
+
+    pool = create_process_pool(max_workers=workers)
+    try:
+        # Phase 1: hash in parallel, then drop anything already in the store or repeated in this run
+        hashes = list(pool.map(try_file_sha256, [key[0] for key in candidates], chunksize=16))
+        existing = processor.find_ingested_sources(sorted({h for h in hashes if h}))
+
+        to_process = []
+        finished = []
+        seen: Set[str] = set()
+        for key, digest in zip(candidates, hashes):
+            if digest is None:
+                logger.warning(f"Skipping {key[0]}: no longer readable")
+                total -= 1
+                continue
+            entry = {"path": key[0], "size": key[1], "mtime_ns": key[2], "sha256": digest}
+            if digest in existing or digest in seen:
+                entry["document_id"] = existing.get(digest)
+                entry["status"] = "duplicate"
+                finished.append(entry)
+                progress.skipped += 1
+            else:
+                seen.add(digest)
+                to_process.append(entry)
+        checkpoint.record(finished)
+
+        # Phase 2: extract and clean across all cores, committing in batches
+        max_in_flight = workers * 4
+        pending = {}
+        buffer = []
+        queue = iter(to_process)
+
+        def commit():
+            doc_ids = processor.store_processed_documents(buffer, enqueue_for_analyzer=enqueue_for_analyzer)
+            checkpoint.record([
+                {
+                    "path": d["path"], "size": d["size"], "mtime_ns": d["mtime_ns"],
+                    "sha256": d["source_sha256"], "document_id": doc_id, "status": "stored",
+                }
+                for d, doc_id in zip(buffer, doc_ids)
+            ])
+            buffer.clear()
+
+        while True:
+            while len(pending) < max_in_flight:
+                entry = next(queue, None)
+                if entry is None:
+                    break
+                pending[pool.submit(extract_and_clean, entry["path"])] = entry
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                entry = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    progress.failed += 1
+                    logger.warning(f"Failed to process {entry['path']}: {e}")
+                    continue
+                buffer.append({
+                    **result,
+                    "filename": os.path.basename(entry["path"]),
+                    "source_sha256": entry["sha256"],
+                    "path": entry["path"], "size": entry["size"], "mtime_ns": entry["mtime_ns"],
+                })
+                progress.add(entry["size"])
+
+            if len(buffer) >= commit_every:
+                commit()
+            progress.maybe_report(total)
+
+        if buffer:
+            commit()
+    finally:
+        pool.shutdown(cancel_futures=True)
+        checkpoint.close()
+
+    docs_per_sec, mb_per_sec = progress.rates()
+    return {
+        "total": total,
+        "stored": progress.docs,
+        "skipped": progress.skipped,
+        "failed": progress.failed,
+        "elapsed_sec": round(time.perf_counter() - progress.started, 2),
+        "docs_per_sec": round(docs_per_sec, 2),
+        "mb_per_sec": round(mb_per_sec, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-ingest policy documents into the processed-document store")
+    parser.add_argument("root", help="Directory to walk for PDF/DOCX files")
+    parser.add_argument("--db", default="processed_documents.db", help="Processed-document SQLite database")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Checkpoint file (default: .ingest_checkpoint.jsonl next to the database)")
+    parser.add_argument("--workers", type=int, default=default_worker_count(), help="Worker processes")
+    parser.add_argument("--commit-every", type=int, default=200, help="Documents per storage transaction")
+    parser.add_argument("--enqueue-analyzer", action="store_true",
+                        help="Also queue ingested documents for the Document Analyzer Agent")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between progress reports")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if not os.path.isdir(args.root):
+        parser.error(f"Not a directory: {args.root}")
+
+    checkpoint = args.checkpoint or os.path.join(
+        os.path.dirname(os.path.abspath(args.db)), ".ingest_checkpoint.jsonl"
+    )
+    summary = ingest(
+        args.root, args.db, checkpoint,
+        workers=max(1, args.workers),
+        commit_every=max(1, args.commit_every),
+        enqueue_for_analyzer=args.enqueue_analyzer,
+        report_every=args.report_every,
+    )
+    logger.info(
+        f"Done: stored {summary['stored']}, skipped {summary['skipped']}, failed {summary['failed']} "
+        f"in {summary['elapsed_sec']}s | {summary['docs_per_sec']} docs/sec | {summary['mb_per_sec']} MB/sec"
+    )
+    print(json.dumps(summary))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
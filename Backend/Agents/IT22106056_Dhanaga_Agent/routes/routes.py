@@ -1,14 +1,122 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, Response
 import os
+import json
+import asyncio
+import hashlib
 import tempfile
-from ..Utils.Utils import DocumentProcessor
+from typing import List, Optional, Tuple
+from ..Utils.Utils import DocumentProcessor, DOCX_MEDIA_TYPE, SUPPORTED_EXTENSIONS
+from ..Utils.analyzer_outbox import AnalyzerOutboxWorker
+from ..Utils.batch_processing import extract_and_clean, get_process_pool, default_worker_count
 
 router = APIRouter()
 
 # Initialize the document processor
 doc_processor = DocumentProcessor()
 
+# Background delivery to the Document Analyzer Agent (started in app.py)
+outbox_worker = AnalyzerOutboxWorker(doc_processor)
+
+def _analyzer_pipeline_status(document_id: str) -> dict:
+    status = {
+        "status": "queued",
+        "document_id": document_id,
+    }
+    if not outbox_worker.running:
+        status["message"] = "ANALYZER_URL not configured. Document held in analyzer outbox."
+    return status
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Upper bound on files extracted at once per batch request (holds memory in check)
+BATCH_MAX_IN_FLIGHT = int(os.environ.get("BATCH_MAX_IN_FLIGHT", "0") or 0) or 2 * default_worker_count()
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end).
+    Returns None for multi-range or malformed headers (served as a full response)
+    and raises ValueError when the range cannot be satisfied.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, sep, end_s = spec.strip().partition("-")
+    if not sep or not (start_s or end_s):
+        return None
+    if (start_s and not start_s.isdigit()) or (end_s and not end_s.isdigit()):
+        return None
+
+    if not start_s:
+        # Suffix range: the last N bytes
+        suffix = int(end_s)
+        if suffix == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - suffix, 0), size - 1
+
+    start = int(start_s)
+    end = int(end_s) if end_s else size - 1
+    if end < start:
+        return None
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+def _iter_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def _cached_file_response(request: Request, path: str, media_type: str, etag: str, headers: dict) -> Response:
+    """
+    Serve a cached artifact from disk with ETag revalidation and single byte-range support
+    """
+    headers = {
+        **headers,
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            return StreamingResponse(
+                _iter_file(path, start, length),
+                status_code=206,
+                media_type=media_type,
+                headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(length)}
+            )
+
+    return StreamingResponse(
+        _iter_file(path, 0, size),
+        media_type=media_type,
+        headers={**headers, "Content-Length": str(size)}
+    )
+
 @router.post("/upload")
 async def upload_document(file: UploadFile = File(...)):
     """
@@ -16,7 +124,7 @@ async def upload_document(file: UploadFile = File(...)):
     """
     try:
         # Validate file type
-        if not file.filename.lower().endswith(('.pdf', '.docx', '.doc')):
+        if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
             raise HTTPException(status_code=400, detail="Only PDF and DOCX files are supported")
         
         # Save uploaded file temporarily
@@ -32,15 +140,15 @@ async def upload_document(file: UploadFile = File(...)):
             # Clean and preprocess the text
             processed_text = doc_processor.clean_and_preprocess(extracted_text)
             
-            # Store the processed document
+            # Store the processed document and queue it for the Document Analyzer Agent
             doc_id = doc_processor.store_processed_document(
                 filename=file.filename,
                 original_text=extracted_text,
-                processed_text=processed_text
+                processed_text=processed_text,
+                enqueue_for_analyzer=True,
+                source_sha256=hashlib.sha256(content).hexdigest()
             )
-            
-            # Automatically send to Document Analyzer Agent via pipeline
-            analyzer_response = doc_processor.send_to_analyzer_agent(doc_id)
+            outbox_worker.wake()
             
             return JSONResponse(content={
                 "message": "Document processed successfully",
@@ -49,7 +157,7 @@ async def upload_document(file: UploadFile = File(...)):
                 "original_length": len(extracted_text),
                 "processed_length": len(processed_text),
                 "preview": processed_text[:500] + "..." if len(processed_text) > 500 else processed_text,
-                "analyzer_pipeline": analyzer_response
+                "analyzer_pipeline": _analyzer_pipeline_status(doc_id)
             })
             
         finally:
@@ -61,6 +169,117 @@ async def upload_document(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
 
+@router.post("/upload/batch")
+async def upload_documents_batch(files: List[UploadFile] = File(...)):
+    """
+    Upload and process many PDF or DOCX documents in one request.
+
+    Files are extracted and cleaned in a process pool with bounded concurrency,
+    then stored (and queued for the analyzer) in a single transaction.
+    Results stream back as NDJSON: one "file" event per file as it finishes,
+    a "stored" event with the document ids, and a final "summary" event.
+    """
+    # Spool uploads to disk before streaming; the pool workers read from these paths
+    spooled = []
+    rejected = []
+    for index, file in enumerate(files):
+        if not file.filename or not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            rejected.append({"index": index, "filename": file.filename, "error": "Only PDF and DOCX files are supported"})
+            continue
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
+            while chunk := await file.read(STREAM_CHUNK_SIZE):
+                temp_file.write(chunk)
+                digest.update(chunk)
+            spooled.append({
+                "index": index, "filename": file.filename,
+                "path": temp_file.name, "source_sha256": digest.hexdigest()
+            })
+
+    return StreamingResponse(_process_batch(spooled, rejected), media_type="application/x-ndjson")
+
+async def _process_batch(spooled: List[dict], rejected: List[dict]):
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    semaphore = asyncio.Semaphore(BATCH_MAX_IN_FLIGHT)
+
+    async def run(item):
+        async with semaphore:
+            try:
+                result = await loop.run_in_executor(pool, extract_and_clean, item["path"])
+                return item, result, None
+            except Exception as e:
+                return item, None, str(e)
+            finally:
+                _remove_temp_file(item["path"])
+
+    tasks = [asyncio.ensure_future(run(item)) for item in spooled]
+    processed = []
+    failed = len(rejected)
+    try:
+        for item in rejected:
+            yield json.dumps({"event": "file", "status": "error", **item}) + "\n"
+
+        for next_done in asyncio.as_completed(tasks):
+            item, result, error = await next_done
+            if error is not None:
+                failed += 1
+                yield json.dumps({
+                    "event": "file", "status": "error",
+                    "index": item["index"], "filename": item["filename"],
+                    "error": f"Error processing document: {error}"
+                }) + "\n"
+                continue
+
+            processed.append({
+                "index": item["index"], "filename": item["filename"],
+                "source_sha256": item["source_sha256"], **result
+            })
+            yield json.dumps({
+                "event": "file", "status": "processed",
+                "index": item["index"], "filename": item["filename"],
+                "original_length": len(result["original_text"]),
+                "processed_length": len(result["processed_text"]),
+            }) + "\n"
+
+        stored = []
+        if processed:
+            processed.sort(key=lambda d: d["index"])
+            try:
+                doc_ids = await asyncio.to_thread(
+                    doc_processor.store_processed_documents, processed, True
+                )
+            except Exception as e:
+                yield json.dumps({"event": "stored", "status": "error", "error": f"Error storing documents: {e}"}) + "\n"
+                doc_ids = []
+                failed += len(processed)
+            else:
+                outbox_worker.wake()
+                stored = [
+                    {"index": d["index"], "filename": d["filename"], "document_id": doc_id}
+                    for d, doc_id in zip(processed, doc_ids)
+                ]
+                yield json.dumps({"event": "stored", "status": "ok", "documents": stored}) + "\n"
+
+        yield json.dumps({
+            "event": "summary",
+            "total": len(spooled) + len(rejected),
+            "stored": len(stored),
+            "failed": failed,
+        }) + "\n"
+    finally:
+        # Client went away mid-stream: don't leave queued extractions or temp files behind
+        for task in tasks:
+            task.cancel()
+        for item in spooled:
+            _remove_temp_file(item["path"])
+
+def _remove_temp_file(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
 @router.get("/processed/{document_id}")
 async def get_processed_document(document_id: str):
     """
@@ -104,26 +323,42 @@ async def preview_processed_document(document_id: str, lines: int = 50):
         raise HTTPException(status_code=500, detail=f"Error retrieving document preview: {str(e)}")
 
 @router.get("/processed/{document_id}/download")
-async def download_processed_document(document_id: str, format: str = "docx"):
+async def download_processed_document(request: Request, document_id: str, format: str = "docx"):
     """
-    Download the processed document as DOCX or TXT
+    Download the processed document as DOCX or TXT.
+    DOCX files are built once per content hash, cached on disk and streamed,
+    with ETag/If-None-Match and Range support.
     """
-    document = doc_processor.get_processed_document(document_id)
-    if not document:
+    header = await asyncio.to_thread(doc_processor.get_document_header, document_id)
+    if not header:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    filename_base = os.path.splitext(document['filename'])[0]
+    filename_base = os.path.splitext(header['filename'])[0]
 
     if format.lower() == "docx":
-        docx_bytes = doc_processor.build_docx_bytes(document['processed_text'], title=filename_base)
-        return StreamingResponse(
-            docx_bytes,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        content_hash = header["content_sha256"]
+        etag = f'"{content_hash}"'
+        # Revalidations and cache hits are answered without loading the document text
+        docx_path = doc_processor.artifact_cache.lookup(document_id, content_hash, "docx")
+        if docx_path is None and not _etag_matches(request.headers.get("if-none-match"), etag):
+            document = await asyncio.to_thread(doc_processor.get_processed_document, document_id)
+            if not document:
+                raise HTTPException(status_code=404, detail="Document not found")
+            docx_path, content_hash = await asyncio.to_thread(doc_processor.get_docx_artifact, document)
+            etag = f'"{content_hash}"'
+        return _cached_file_response(
+            request,
+            docx_path,
+            media_type=DOCX_MEDIA_TYPE,
+            etag=etag,
             headers={
                 "Content-Disposition": f"attachment; filename=processed_{filename_base}.docx"
             }
         )
     elif format.lower() == "txt":
+        document = await asyncio.to_thread(doc_processor.get_processed_document, document_id)
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
         return PlainTextResponse(
             content=document['processed_text'],
             media_type="text/plain",
@@ -137,19 +372,45 @@ async def download_processed_document(document_id: str, format: str = "docx"):
 @router.post("/send-to-analyzer/{document_id}")
 async def send_to_document_analyzer(document_id: str):
     """
-    Send processed document to Document Analyzer Agent
+    Queue (or re-queue) a processed document for the Document Analyzer Agent
     """
     try:
-        result = doc_processor.send_to_analyzer_agent(document_id)
+        if not doc_processor.get_processed_document(document_id):
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        doc_processor.enqueue_for_analyzer(document_id)
+        outbox_worker.wake()
         return JSONResponse(content={
-            "message": "Document sent to analyzer successfully",
+            "message": "Document queued for analyzer",
             "document_id": document_id,
-            "analyzer_response": result
+            "analyzer_pipeline": _analyzer_pipeline_status(document_id)
         })
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending to analyzer: {str(e)}")
 
+@router.get("/send-to-analyzer/{document_id}")
+async def analyzer_delivery_status(document_id: str):
+    """
+    Delivery status of a document in the analyzer outbox
+    """
+    entry = doc_processor.get_outbox_entry(document_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Document not in analyzer outbox")
+    return JSONResponse(content=entry)
+
+@router.get("/outbox")
+async def analyzer_outbox_stats():
+    """
+    Counts of analyzer outbox entries by status
+    """
+    return JSONResponse(content={
+        "worker_running": outbox_worker.running,
+        "outbox": doc_processor.outbox_stats()
+    })
+
 @router.get("/documents")
 async def list_processed_documents():
     """
@@ -0,0 +1,45 @@
+"""
+Local stand-in for the Document Analyzer Agent, for exercising the analyzer outbox.
+
+Run it and point the preprocessing API at it:
+    uvicorn Backend.Agents.IT22106056_Dhanaga_Agent.stand_in_analyzer:app --port 8100
+    ANALYZER_URL=http://127.0.0.1:8100/analyze
+
+Or use it in-process:
+    AnalyzerOutboxWorker(doc_processor, analyzer_url="http://stand-in/analyze",
+                         transport=httpx.ASGITransport(app=app))
+
+STAND_IN_FAILURE_RATE (0..1) makes a share of requests answer 503 so retries
+and backoff can be observed; STAND_IN_DELAY adds latency in seconds.
+"""
+import os
+import random
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Stand-in Document Analyzer Agent")
+
+app.state.received = []
+
+@app.post("/analyze")
+async def analyze(request: Request):
+    delay = float(os.environ.get("STAND_IN_DELAY", "0") or 0)
+    failure_rate = float(os.environ.get("STAND_IN_FAILURE_RATE", "0") or 0)
+    if delay:
+        await asyncio.sleep(delay)
+    if random.random() < failure_rate:
+        return JSONResponse(status_code=503, content={"detail": "Stand-in analyzer unavailable"})
+
+    if request.headers.get("content-type", "").startswith("application/json"):
+        payload = await request.json()
+        document_id = payload.get("document_id")
+    else:
+        form = await request.form()
+        document_id = form.get("metadata")
+    app.state.received.append(document_id)
+    return {"status": "received", "document_id": document_id}
+
+@app.get("/received")
+async def received():
+    return {"count": len(app.state.received), "documents": app.state.received}
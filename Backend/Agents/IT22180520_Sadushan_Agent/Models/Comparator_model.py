@@ -1,15 +1,25 @@
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+from Backend.merged_backend.utils.embedding_batcher import EmbeddingBatcher
 
 model=SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
 
+# Concurrent /compare_policy calls share one batched encode
+batcher = EmbeddingBatcher(model.encode, max_batch_size=64, max_wait_ms=5)
+
 def compute_similarity(policy1: str , policy2: str):
     embedding=model.encode([policy1,policy2])
     similarity = cosine_similarity([embedding[0]],[embedding[1]])[0][0]
     
     return float(similarity)
 
+async def compute_similarity_async(policy1: str , policy2: str):
+    embedding = await batcher.encode([policy1, policy2])
+    similarity = cosine_similarity([embedding[0]],[embedding[1]])[0][0]
+
+    return float(similarity)
+
 def extract_overlap_unique(policy1: str , policy2: str):
     set1=set(policy1.lower().split())
     set2=set(policy2.lower().split())
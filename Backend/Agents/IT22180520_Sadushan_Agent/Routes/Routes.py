@@ -6,7 +6,7 @@ import logging
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from Backend.Agents.IT22180520_Sadushan_Agent.utils.Utils import sanitize_text, validate_policy_input
-from Backend.Agents.IT22180520_Sadushan_Agent.Models.Comparator_model import compute_similarity, extract_overlap_unique
+from Backend.Agents.IT22180520_Sadushan_Agent.Models.Comparator_model import compute_similarity_async, extract_overlap_unique
 
 import os
 import logging
@@ -26,7 +26,7 @@ class ploicycomparter(BaseModel):
     policy2: str
 
 @router.post("/compare_policy")
-def compare_policy(request: ploicycomparter):
+async def compare_policy(request: ploicycomparter):
     if not validate_policy_input(request.policy1) or not validate_policy_input(request.policy2):
         logging.warning("Invalid policy input detected")
         raise HTTPException(status_code=400, detail="Invalid or too short policy text")
@@ -34,7 +34,7 @@ def compare_policy(request: ploicycomparter):
     policy1 = sanitize_text(request.policy1)
     policy2 = sanitize_text(request.policy2)
 
-    similarity_score = compute_similarity(policy1, policy2)
+    similarity_score = await compute_similarity_async(policy1, policy2)
     comparation = extract_overlap_unique(policy1, policy2)
 
     
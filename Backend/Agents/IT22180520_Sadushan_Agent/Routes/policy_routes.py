@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, UploadFile, File
 from pydantic import BaseModel
 import spacy
 from Backend.Agents.IT22180520_Sadushan_Agent.utils.Utils import sanitize_text
+from Backend.merged_backend.utils.nlp_profiles import NlpProfiles
 
 router = APIRouter()
 
@@ -12,6 +13,8 @@ except:
     import subprocess
     subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
     nlp = spacy.load("en_core_web_sm")
+# Each route runs only the components it needs (see merged_backend/utils/nlp_profiles.py)
+nlp = NlpProfiles(nlp)
 
 class TextRequest(BaseModel):
     text: str
@@ -41,8 +44,8 @@ async def named_entity_recognition(request: TextRequest):
                 detail="Text cannot be empty"
             )
         
-        # Process text with spaCy
-        doc = nlp(request.text)
+        # Process text with spaCy (entities only: no tagger/parser/lemmatizer)
+        doc = nlp(request.text, profile="ner_only")
         
         # Extract named entities
         entities = []
@@ -78,8 +81,8 @@ async def full_analysis(request: TextRequest):
     if not request.text:
         raise HTTPException(status_code=400, detail="Text is required")
     
-    # Process text with spaCy
-    doc = nlp(request.text)
+    # Process text with spaCy (noun chunks and sentences need the tagger and parser)
+    doc = nlp(request.text, profile="full")
     
     # Get entities
     entities = [{"text": ent.text, "label": ent.label_} for ent in doc.ents]
@@ -0,0 +1,267 @@
+"""
+Concurrent load generator for the merged API.
+
+Run from Backend/merged_backend:
+    python -m benchmarks.load_test --in-process --concurrency 8 --duration 60
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --ramp --concurrency 32 --duration 120
+    python -m benchmarks.load_test --in-process --stages 10@1,30@8,10@16 --mix compare=4,recommend=4,ner=1
+
+--in-process runs the FastAPI app inside this process (startup hooks included)
+through an ASGI transport, so no server is needed; note that it then shares
+one event loop with the load generator, like a single uvicorn worker would.
+Uploads use the PDFs in test_data/. Reports p50/p95/p99 latency, throughput
+and error rate per endpoint and per stage, optionally as JSON.
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+MERGED_BACKEND = Path(__file__).resolve().parents[1]
+TEST_DATA_DIR = MERGED_BACKEND / "test_data"
+
+if str(MERGED_BACKEND) not in sys.path:
+    sys.path.insert(0, str(MERGED_BACKEND))
+
+COMPARE_PAIRS = [
+    (
+        "We will reduce carbon emissions by 50% by 2030 through renewable energy adoption.",
+        "Our goal is to cut greenhouse gas emissions in half by 2030 using solar and wind power.",
+    ),
+    (
+        "The coastal regions of Colombo and Galle will build sea walls and early warning systems.",
+        "Kandy and Trincomalee will reduce urban heat islands with green roofs and urban forests.",
+    ),
+]
+
+WEATHER_QUERIES = [
+    {"location": "Colombo", "month": 8, "temperature_c": 29.5, "humidity_pct": 78, "wind_kmh": 10.0},
+    {"location": "Kandy", "month": 1, "temperature_c": 24.0, "humidity_pct": 70, "wind_kmh": 6.5},
+    {"location": "Jaffna", "month": 5, "temperature_c": 33.1, "humidity_pct": 82, "wind_kmh": 14.0},
+]
+
+# name -> (path, kind); kind decides how the request body is built
+SCENARIOS = {
+    "full-analysis": ("/api/policy/full-analysis", "upload"),
+    "ner": ("/api/policy/ner", "upload"),
+    "summarize": ("/api/policy/summarize", "upload"),
+    "compare": ("/api/compare_policy", "compare"),
+    "recommend": ("/api/recommendations/", "recommend"),
+}
+
+DEFAULT_MIX = "full-analysis=1,ner=2,summarize=2,compare=3,recommend=4"
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}'. Choose from: {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return {k: v for k, v in weights.items() if v > 0}
+
+
+def parse_stages(spec: str) -> List[Tuple[float, int]]:
+    """'10@1,30@8' -> [(10.0, 1), (30.0, 8)] as (seconds, concurrency)"""
+    stages = []
+    for part in spec.split(","):
+        duration, _, concurrency = part.partition("@")
+        stages.append((float(duration), int(concurrency)))
+    return stages
+
+
+def ramp_stages(max_concurrency: int, duration: float) -> List[Tuple[float, int]]:
+    """Double the concurrency each stage up to max_concurrency, splitting duration evenly"""
+    levels = []
+    level = 1
+    while level < max_concurrency:
+        levels.append(level)
+        level *= 2
+    levels.append(max_concurrency)
+    return [(duration / len(levels), c) for c in levels]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(samples: List[Tuple[str, float, bool]], elapsed: float) -> Dict:
+    latencies = sorted(s[1] for s in samples)
+    errors = sum(1 for s in samples if not s[2])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, weights: Dict[str, float], pdfs: List[Tuple[str, bytes]], seed: int):
+        self.client = client
+        self.names = list(weights)
+        self.weights = [weights[n] for n in self.names]
+        self.pdfs = pdfs
+        self.rng = random.Random(seed)
+        self.error_samples: Dict[str, str] = {}
+
+    def _request_kwargs(self, kind: str) -> Dict:
+        if kind == "upload":
+            filename, data = self.rng.choice(self.pdfs)
+            return {"files": {"file": (filename, data, "application/pdf")}}
+        if kind == "compare":
+            policy1, policy2 = self.rng.choice(COMPARE_PAIRS)
+            return {"json": {"policy1": policy1, "policy2": policy2}}
+        return {"json": self.rng.choice(WEATHER_QUERIES)}
+
+    async def _one_request(self) -> Tuple[str, float, bool]:
+        name = self.rng.choices(self.names, weights=self.weights)[0]
+        path, kind = SCENARIOS[name]
+        kwargs = self._request_kwargs(kind)
+        start = time.perf_counter()
+        try:
+            resp = await self.client.post(path, **kwargs)
+            ok = resp.is_success
+            if not ok:
+                self.error_samples.setdefault(name, f"HTTP {resp.status_code}: {resp.text[:200]}")
+        except httpx.HTTPError as e:
+            ok = False
+            self.error_samples.setdefault(name, repr(e))
+        return name, time.perf_counter() - start, ok
+
+    async def run_stage(self, duration: float, concurrency: int) -> List[Tuple[str, float, bool]]:
+        samples = []
+        deadline = time.perf_counter() + duration
+
+        async def user():
+            while time.perf_counter() < deadline:
+                samples.append(await self._one_request())
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        return samples
+
+
+def load_pdfs() -> List[Tuple[str, bytes]]:
+    pdfs = [(p.name, p.read_bytes()) for p in sorted(TEST_DATA_DIR.glob("*.pdf"))]
+    if not pdfs:
+        raise SystemExit(f"No PDFs found in {TEST_DATA_DIR}")
+    return pdfs
+
+
+async def make_client(args) -> Tuple[httpx.AsyncClient, Optional[object]]:
+    timeout = httpx.Timeout(args.timeout)
+    if args.in_process:
+        from main import app
+        # ASGI transports don't send lifespan events; run the startup hooks ourselves
+        # and wait for the background model warm-up before generating load
+        await app.router.startup()
+        if not await app.state.models.wait_ready():
+            raise SystemExit(f"Models failed to load: {app.state.models.status()}")
+        transport = httpx.ASGITransport(app=app)
+        return httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout), app
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    return httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits), None
+
+
+async def run(args) -> Dict:
+    weights = parse_mix(args.mix)
+    if args.stages:
+        stages = parse_stages(args.stages)
+    elif args.ramp:
+        stages = ramp_stages(args.concurrency, args.duration)
+    else:
+        stages = [(args.duration, args.concurrency)]
+
+    client, app = await make_client(args)
+    load = LoadTest(client, weights, load_pdfs(), args.seed)
+    report = {"config": {
+        "target": "in-process" if args.in_process else args.base_url,
+        "mix": weights,
+        "stages": [{"duration_s": d, "concurrency": c} for d, c in stages],
+    }, "stages": []}
+    all_samples = []
+    try:
+        if args.warmup:
+            await load.run_stage(args.warmup, 1)
+
+        started = time.perf_counter()
+        for duration, concurrency in stages:
+            stage_start = time.perf_counter()
+            samples = await load.run_stage(duration, concurrency)
+            stage_elapsed = time.perf_counter() - stage_start
+            all_samples.extend(samples)
+            stage_report = {"duration_s": duration, "concurrency": concurrency,
+                            **summarize(samples, stage_elapsed)}
+            report["stages"].append(stage_report)
+            print(f"stage {concurrency:>4} users {duration:>6.1f}s | "
+                  f"{stage_report['throughput_rps']:8.2f} req/s | p50 {stage_report['p50_ms']:9.1f} ms | "
+                  f"p95 {stage_report['p95_ms']:9.1f} ms | p99 {stage_report['p99_ms']:9.1f} ms | "
+                  f"errors {stage_report['error_rate'] * 100:5.1f}%")
+        elapsed = time.perf_counter() - started
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+
+    report["overall"] = summarize(all_samples, elapsed)
+    report["endpoints"] = {
+        name: summarize([s for s in all_samples if s[0] == name], elapsed)
+        for name in weights
+    }
+    report["error_samples"] = load.error_samples
+    return report
+
+
+def print_report(report: Dict):
+    print(f"\n{'endpoint':<15}{'requests':>10}{'req/s':>10}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'errors':>9}")
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, r in rows:
+        print(f"{name:<15}{r['requests']:>10}{r['throughput_rps']:>10.2f}{r['p50_ms']:>11.1f}"
+              f"{r['p95_ms']:>11.1f}{r['p99_ms']:>11.1f}{r['error_rate'] * 100:>8.1f}%")
+    for name, sample in report["error_samples"].items():
+        print(f"  first {name} error: {sample}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Climate Policy Analysis API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--in-process", action="store_true", help="Run the app inside this process")
+    target.add_argument("--base-url", default="http://127.0.0.1:8000", help="Server to load (default: %(default)s)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted request mix (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Total seconds of load")
+    parser.add_argument("--ramp", action="store_true", help="Double users from 1 up to --concurrency over --duration")
+    parser.add_argument("--stages", default=None, help="Explicit profile: seconds@users,... e.g. 10@1,30@8")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of single-user warm-up (not reported)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1234, help="Seed for the request mix")
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
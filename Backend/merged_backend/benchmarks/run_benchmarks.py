@@ -0,0 +1,433 @@
+"""
+Micro-benchmarks for the analysis, cleaning and recommendation hot paths.
+
+Run from Backend/merged_backend:
+    python -m benchmarks.run_benchmarks                      # all benchmarks, all sizes
+    python -m benchmarks.run_benchmarks --sizes small,medium --filter clean
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/baseline.json
+
+Results are written as JSON to benchmarks/results/ so runs can be compared.
+Benchmarks whose dependencies (spaCy model, PyMuPDF, ...) are unavailable are
+recorded as skipped, and a benchmark that raises while timed is recorded with
+its error; neither stops the run.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+MERGED_BACKEND = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[3]
+RESULTS_DIR = MERGED_BACKEND / "benchmarks" / "results"
+
+# merged_backend modules import each other as top-level packages (utils.*, models.*);
+# the Dhanaga cleaners are imported through the repo root package path.
+for path in (str(MERGED_BACKEND), str(REPO_ROOT)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from benchmarks import synthetic  # noqa: E402
+
+
+class Benchmark:
+    def __init__(self, name: str, size: str, setup: Callable[[], Callable[[], object]], params: Optional[Dict] = None):
+        self.name = name
+        self.size = size
+        self.setup = setup
+        self.params = params or {}
+
+
+def time_callable(fn: Callable[[], object], repeat: int, min_sample_time: float) -> Dict:
+    """
+    Time fn like timeit: calibrate a loop count so one sample lasts at least
+    min_sample_time, then take `repeat` samples and report per-call seconds.
+    """
+    fn()  # warm-up (lazy imports, caches, first-call allocations)
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample_time or number >= 10_000:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_sample_time / elapsed) + 1))
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    samples.sort()
+    return {
+        "loops": number,
+        "repeat": len(samples),
+        "min_s": samples[0],
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "max_s": samples[-1],
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+# ---- benchmark definitions ----
+
+def _load_nlp():
+    import spacy
+    from utils.nlp_profiles import NlpProfiles
+    return NlpProfiles(spacy.load("en_core_web_sm"))
+
+
+def analysis_benchmarks(sizes: List[str]) -> List[Benchmark]:
+    benches = []
+    loop = asyncio.new_event_loop()
+    state = {}
+
+    def nlp():
+        if "nlp" not in state:
+            state["nlp"] = _load_nlp()
+        return state["nlp"]
+
+    for size in sizes:
+        text = synthetic.policy_text(synthetic.SIZES[size])
+
+        def setup_analyze(text=text):
+            from utils.document_analyzer import analyze_document
+            return lambda: loop.run_until_complete(analyze_document(text, None))
+
+        def setup_split(text=text):
+            from utils.document_analyzer import split_into_policies
+            model = nlp()
+            return lambda: loop.run_until_complete(split_into_policies(text, model))
+
+        params = {"sentences": synthetic.SIZES[size], "chars": len(text)}
+        benches.append(Benchmark("analyze_document", size, setup_analyze, params))
+        benches.append(Benchmark("split_into_policies", size, setup_split, params))
+
+        for profile in ("full", "ner_only"):
+            def setup_profile(text=text, profile=profile):
+                model = nlp()
+                return lambda: model(text, profile=profile)
+
+            benches.append(Benchmark(f"spacy[{profile}]", size, setup_profile, {**params, "profile": profile}))
+    return benches
+
+
+def cleaning_benchmarks(sizes: List[str], workdir: str) -> List[Benchmark]:
+    benches = []
+    for size in sizes:
+        raw = synthetic.raw_extracted_text(synthetic.SIZES[size])
+        params = {"sentences": synthetic.SIZES[size], "chars": len(raw)}
+
+        def setup_full(raw=raw):
+            from Backend.Agents.IT22106056_Dhanaga_Agent.Utils.Utils import DocumentProcessor
+            processor = DocumentProcessor(db_path=os.path.join(workdir, "bench.db"),
+                                          artifact_dir=os.path.join(workdir, "artifacts"))
+            return lambda: processor.clean_and_preprocess(raw)
+
+        benches.append(Benchmark("clean_and_preprocess", size, setup_full, params))
+
+        # Each stage is timed on the output of the previous one, as in the real pipeline
+        for stage in CLEANING_STAGES:
+            def setup_stage(raw=raw, stage=stage):
+                stages = cleaning_stage_callables()
+                text = raw
+                for name, fn in stages:
+                    if name == stage:
+                        return lambda text=text, fn=fn: fn(text)
+                    text = fn(text)
+                raise KeyError(stage)
+
+            benches.append(Benchmark(f"clean.{stage}", size, setup_stage, params))
+    return benches
+
+
+CLEANING_STAGES = [
+    "basic_text_cleaning",
+    "remove_headers_footers",
+    "clean_special_characters",
+    "normalize_numeric_and_dates",
+    "handle_missing_values",
+    "structure_oriented_cleaning",
+    "remove_repeated_paragraphs",
+    "climate_policy_specific_cleaning",
+    "final_cleanup",
+]
+
+
+def cleaning_stage_callables():
+    """The stages of DocumentProcessor.clean_and_preprocess, in order"""
+    from Backend.Agents.IT22106056_Dhanaga_Agent.Utils.text_cleaners import TextCleaners
+    from Backend.Agents.IT22106056_Dhanaga_Agent.Utils.numeric_normalizers import NumericNormalizers
+    from Backend.Agents.IT22106056_Dhanaga_Agent.Utils.structure_cleaners import StructureCleaners
+
+    text_cleaners = TextCleaners()
+    numeric = NumericNormalizers()
+    structure = StructureCleaners()
+    return [
+        ("basic_text_cleaning", text_cleaners.basic_text_cleaning),
+        ("remove_headers_footers", text_cleaners.remove_headers_footers),
+        ("clean_special_characters", text_cleaners.clean_special_characters),
+        ("normalize_numeric_and_dates", numeric.normalize_numeric_and_dates),
+        ("handle_missing_values", numeric.handle_missing_values),
+        ("structure_oriented_cleaning", structure.structure_oriented_cleaning),
+        ("remove_repeated_paragraphs", structure.remove_repeated_paragraphs),
+        ("climate_policy_specific_cleaning", structure.climate_policy_specific_cleaning),
+        ("final_cleanup", structure.final_cleanup),
+    ]
+
+
+def extraction_benchmarks(sizes: List[str]) -> List[Benchmark]:
+    benches = []
+    for size in sizes:
+        text = synthetic.policy_text(synthetic.SIZES[size])
+
+        def setup_pdf(text=text):
+            from utils.document_processor import process_document
+            data = synthetic.pdf_bytes(text)
+            return lambda: process_document(data, "bench.pdf")
+
+        def setup_docx(text=text):
+            from utils.document_processor import process_document
+            data = synthetic.docx_bytes(text)
+            return lambda: process_document(data, "bench.docx")
+
+        params = {"sentences": synthetic.SIZES[size], "chars": len(text)}
+        benches.append(Benchmark("process_document.pdf", size, setup_pdf, params))
+        benches.append(Benchmark("process_document.docx", size, setup_docx, params))
+    return benches
+
+
+def comparator_benchmarks(sizes: List[str]) -> List[Benchmark]:
+    benches = []
+    for size in sizes:
+        n = synthetic.SIZES[size]
+        policy1 = synthetic.policy_text(n, seed=synthetic.SEED)
+        policy2 = synthetic.policy_text(n, seed=synthetic.SEED + 1)
+
+        def setup(policy1=policy1, policy2=policy2):
+            from models.models import ComparatorModel
+            # Overlap extraction never touches the sentence encoder, so skip loading it
+            comparator = ComparatorModel.__new__(ComparatorModel)
+            return lambda: comparator.extract_overlap_unique(policy1, policy2)
+
+        benches.append(Benchmark("ComparatorModel.extract_overlap_unique", size, setup,
+                                 {"sentences": n, "chars": len(policy1) + len(policy2)}))
+
+        def setup_ranked(policy1=policy1, policy2=policy2):
+            from utils.term_stats import CorpusStats, ranked_overlap_unique
+            stats = CorpusStats()
+            return lambda: ranked_overlap_unique(policy1, policy2, top_k=20, stats=stats)
+
+        benches.append(Benchmark("ranked_overlap_unique", size, setup_ranked,
+                                 {"sentences": n, "chars": len(policy1) + len(policy2), "top_k": 20}))
+    return benches
+
+
+def alignment_benchmarks(sizes: List[str]) -> List[Benchmark]:
+    """Tiled sentence x sentence alignment on random unit vectors (no model needed)"""
+    benches = []
+    for size in sizes:
+        n = synthetic.SIZES[size]
+
+        def setup(n=n):
+            import numpy as np
+            from utils.sentence_alignment import align_embeddings
+            rng = np.random.default_rng(synthetic.SEED)
+            emb1 = rng.standard_normal((n, 384), dtype=np.float32)
+            emb2 = rng.standard_normal((n, 384), dtype=np.float32)
+            return lambda: align_embeddings(emb1, emb2, top_k=5)
+
+        benches.append(Benchmark("align_embeddings", size, setup, {"sentences": n, "dim": 384}))
+    return benches
+
+
+# backend name -> (INFERENCE_BACKEND, quantize)
+ENCODER_BACKENDS = {"torch": ("torch", False), "onnx": ("onnx", False), "onnx-int8": ("onnx", True)}
+
+
+def similarity_benchmarks(sizes: List[str]) -> List[Benchmark]:
+    """compute_similarity per inference backend; each encoder is loaded once and shared across sizes"""
+    encoders = {}
+
+    def encoder(name):
+        if name not in encoders:
+            from utils.onnx_backend import OnnxSentenceEncoder, load_sentence_encoder
+            backend, quantize = ENCODER_BACKENDS[name]
+            encoders[name] = OnnxSentenceEncoder(quantize=quantize) if backend == "onnx" else load_sentence_encoder("torch")
+        return encoders[name]
+
+    benches = []
+    for name in ENCODER_BACKENDS:
+        for size in sizes:
+            n = synthetic.SIZES[size]
+            policy1 = synthetic.policy_text(n, seed=synthetic.SEED)
+            policy2 = synthetic.policy_text(n, seed=synthetic.SEED + 1)
+
+            def setup(name=name, policy1=policy1, policy2=policy2):
+                from models.models import ComparatorModel
+                comparator = ComparatorModel.__new__(ComparatorModel)
+                comparator.model = encoder(name)
+                return lambda: comparator.compute_similarity(policy1, policy2)
+
+            benches.append(Benchmark(f"ComparatorModel.compute_similarity[{name}]", size, setup,
+                                     {"sentences": n, "backend": name}))
+    return benches
+
+
+def recommender_benchmarks(sizes: List[str], workdir: str) -> List[Benchmark]:
+    """recommend() per nearest-neighbour index kind (see utils/weather_index.py)"""
+    benches = []
+    for kind in ("exact", "ivf"):
+        for size in sizes:
+            n_rows = synthetic.WEATHER_SIZES[size]
+
+            def setup(size=size, n_rows=n_rows, kind=kind):
+                import pandas as pd
+                from utils.weather_utils import WeatherDataProcessor
+
+                data_dir = os.path.join(workdir, f"weather_{kind}_{size}")
+                os.makedirs(data_dir, exist_ok=True)
+                pd.DataFrame(synthetic.weather_rows(n_rows)).to_csv(
+                    os.path.join(data_dir, "weather_samples.csv"), index=False
+                )
+                processor = WeatherDataProcessor(data_dir=data_dir, artifacts_dir=data_dir, index_kind=kind)
+                processor.fit_and_serialize()
+                return processor
+
+            def setup_single(setup=setup):
+                processor = setup()
+                return lambda: processor.recommend(dict(synthetic.WEATHER_QUERY))
+
+            def setup_batch(setup=setup):
+                processor = setup()
+                queries = [dict(synthetic.WEATHER_QUERY, location=region) for region in synthetic.REGIONS] * 2
+                return lambda: processor.recommend_batch(queries)
+
+            benches.append(Benchmark(f"WeatherDataProcessor.recommend[{kind}]", size, setup_single,
+                                     {"rows": n_rows, "index": kind}))
+            benches.append(Benchmark(f"WeatherDataProcessor.recommend_batch[{kind}]", size, setup_batch,
+                                     {"rows": n_rows, "index": kind, "queries": 2 * len(synthetic.REGIONS)}))
+    return benches
+
+
+# ---- runner ----
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(sizes: List[str], name_filter: Optional[str], repeat: int, min_sample_time: float) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="policy_bench_")
+    benches = (
+        analysis_benchmarks(sizes)
+        + cleaning_benchmarks(sizes, workdir)
+        + extraction_benchmarks(sizes)
+        + comparator_benchmarks(sizes)
+        + similarity_benchmarks(sizes)
+        + alignment_benchmarks(sizes)
+        + recommender_benchmarks(sizes, workdir)
+    )
+    if name_filter:
+        benches = [b for b in benches if name_filter in b.name]
+
+    results = []
+    for bench in benches:
+        entry = {"name": bench.name, "size": bench.size, "params": bench.params}
+        try:
+            fn = bench.setup()
+        except Exception as e:
+            entry["skipped"] = f"{type(e).__name__}: {e}"
+            print(f"  SKIP {bench.name:<48} {bench.size:<7} {entry['skipped']}")
+            results.append(entry)
+            continue
+        try:
+            entry.update(time_callable(fn, repeat, min_sample_time))
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            print(f"  FAIL {bench.name:<48} {bench.size:<7} {entry['error']}")
+            results.append(entry)
+            continue
+        print(f"  {bench.name:<53} {bench.size:<7} median {entry['median_s'] * 1000:10.3f} ms "
+              f"(min {entry['min_s'] * 1000:.3f}, loops {entry['loops']}x{entry['repeat']})")
+        results.append(entry)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "sizes": sizes,
+            "repeat": repeat,
+            "min_sample_time": min_sample_time,
+            "seed": synthetic.SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict):
+    """Print per-benchmark median ratios current / baseline"""
+    base = {(r["name"], r["size"]): r for r in baseline["results"] if "median_s" in r}
+    print(f"\nComparison against {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')}):")
+    for r in current["results"]:
+        old = base.get((r["name"], r["size"]))
+        if "median_s" not in r or not old:
+            continue
+        ratio = r["median_s"] / old["median_s"] if old["median_s"] else float("inf")
+        marker = "  slower" if ratio > 1.1 else ("  faster" if ratio < 0.9 else "")
+        print(f"  {r['name']:<53} {r['size']:<7} {old['median_s'] * 1000:10.3f} -> "
+              f"{r['median_s'] * 1000:10.3f} ms  x{ratio:.2f}{marker}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the policy analysis micro-benchmarks")
+    parser.add_argument("--sizes", default=",".join(synthetic.SIZES), help="Comma-separated: small,medium,large")
+    parser.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed samples per benchmark")
+    parser.add_argument("--min-sample-time", type=float, default=0.2, help="Minimum seconds per sample")
+    parser.add_argument("--output", default=None, help="Result JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline result JSON to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in synthetic.SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes: {', '.join(unknown)}")
+
+    print(f"Running benchmarks (sizes: {', '.join(sizes)})")
+    report = run(sizes, args.filter, max(1, args.repeat), args.min_sample_time)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
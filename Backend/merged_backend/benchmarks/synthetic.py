@@ -0,0 +1,170 @@
+"""
+Deterministic synthetic inputs for the benchmark suite.
+
+Everything here is generated from a fixed seed so runs on different
+machines (or before/after a change) measure exactly the same work.
+"""
+import io
+import random
+from typing import Dict, List
+
+SEED = 1234
+
+# Number of sentences per size; documents are split into paragraphs of ~8 sentences
+SIZES = {
+    "small": 50,
+    "medium": 500,
+    "large": 5000,
+}
+
+# Historical weather rows per size for the recommender
+WEATHER_SIZES = {
+    "small": 300,
+    "medium": 10_000,
+    "large": 100_000,
+}
+
+REGIONS = ["Colombo", "Galle", "Kandy", "Jaffna", "Trincomalee", "Batticaloa", "Matara", "Kurunegala"]
+ORGS = ["Ministry of Environment", "Climate Change Secretariat", "Central Environmental Authority",
+        "UNFCCC", "Green Climate Fund", "Disaster Management Centre"]
+SECTORS = ["energy", "transport", "agriculture", "forestry", "waste", "industry"]
+CONDITIONS = ["Sunny", "Cloudy", "Rainy", "Stormy"]
+
+TEMPLATES = [
+    "The {org} will reduce emissions in the {sector} sector by {pct}% by {year} through renewable energy adoption.",
+    "This policy aims to strengthen resilience and adaptation in {region} against rising sea levels and storms.",
+    "Funding of {amount} million USD will be mobilised for investment in {sector} under the national framework.",
+    "A monitoring, reporting and verification system will track progress towards the {year} targets.",
+    "Coastal protection measures in {region} include sea walls and early warning systems for extreme weather.",
+    "The regulation requires the {org} to publish an annual report on {sector} emissions and energy efficiency.",
+    "International cooperation with the Paris Agreement partners supports technology transfer and innovation.",
+    "Temperature increase of {deg} degrees is projected for {region}, with higher humidity and stronger winds.",
+    "Community-based programmes will protect vulnerable and indigenous groups and improve public health outcomes.",
+    "Research and development in carbon capture and hydrogen will be led by a national council and agency.",
+    "The strategy sets a net zero goal for {year} and phases out coal in the {sector} sector.",
+    "Urban heat islands in {region} will be reduced by planting urban forests and installing green roofs.",
+]
+
+HEADINGS = [
+    "Policy Section {n}: Coastal Protection Strategy",
+    "Policy Section {n}: Urban Climate Resilience Plan",
+    "Policy Section {n}: Renewable Energy Transition Act",
+    "Policy Section {n}: Climate Finance Framework",
+]
+
+
+def _sentence(rng: random.Random) -> str:
+    return rng.choice(TEMPLATES).format(
+        org=rng.choice(ORGS),
+        sector=rng.choice(SECTORS),
+        region=rng.choice(REGIONS),
+        pct=rng.randint(5, 80),
+        year=rng.randint(2025, 2050),
+        amount=rng.randint(1, 900),
+        deg=round(rng.uniform(0.5, 3.5), 1),
+    )
+
+
+def policy_text(n_sentences: int, seed: int = SEED) -> str:
+    """Clean policy prose in paragraphs, as produced by the preprocessing stage"""
+    rng = random.Random(seed)
+    paragraphs = []
+    section = 1
+    sentences: List[str] = []
+    for i in range(n_sentences):
+        sentences.append(_sentence(rng))
+        if len(sentences) == 8 or i == n_sentences - 1:
+            heading = rng.choice(HEADINGS).format(n=section)
+            paragraphs.append(heading + "\n" + " ".join(sentences))
+            sentences = []
+            section += 1
+    return "\n\n".join(paragraphs)
+
+
+def raw_extracted_text(n_sentences: int, seed: int = SEED) -> str:
+    """
+    Text as it comes out of PDF extraction: page headers/footers, page
+    numbers, mixed case, unicode dashes, spelled-out numbers and dates.
+    """
+    rng = random.Random(seed)
+    lines = []
+    page = 1
+    for i in range(n_sentences):
+        sentence = _sentence(rng)
+        if rng.random() < 0.3:
+            sentence = sentence.upper()
+        if rng.random() < 0.2:
+            sentence += f" The deadline is 31st December {rng.randint(2025, 2050)} — see Figure {rng.randint(1, 9)}."
+        if rng.random() < 0.1:
+            sentence += " Emissions fell by twenty percent, around 15% of GHG totals."
+        lines.append(sentence)
+        if rng.random() < 0.15:
+            # OCR duplicates
+            lines.append(sentence)
+        if (i + 1) % 25 == 0:
+            lines.append(f"Page {page} of {n_sentences // 25 + 1}")
+            lines.append("Ministry of Environment Draft 2024")
+            lines.append("")
+            page += 1
+    return "\n".join(lines)
+
+
+def docx_bytes(text: str) -> bytes:
+    import docx
+
+    doc = docx.Document()
+    for paragraph in text.split("\n\n"):
+        doc.add_paragraph(paragraph)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def pdf_bytes(text: str, lines_per_page: int = 45) -> bytes:
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    lines = []
+    for paragraph in text.split("\n\n"):
+        # Wrap at ~90 chars so the text fits an A4 page
+        words = paragraph.split()
+        line = ""
+        for word in words:
+            if len(line) + len(word) + 1 > 90:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.append(line)
+        lines.append("")
+
+    for start in range(0, len(lines), lines_per_page):
+        page = doc.new_page()
+        page.insert_text((50, 60), "\n".join(lines[start:start + lines_per_page]), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def weather_rows(n_rows: int, seed: int = SEED) -> List[Dict]:
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n_rows):
+        rows.append({
+            "location": rng.choice(REGIONS),
+            "month": rng.randint(1, 12),
+            "temperature_c": round(rng.uniform(22, 36), 1),
+            "humidity_pct": rng.randint(55, 98),
+            "wind_kmh": round(rng.uniform(0, 30), 1),
+            "condition": rng.choice(CONDITIONS),
+        })
+    return rows
+
+
+WEATHER_QUERY = {
+    "location": "Colombo",
+    "month": 8,
+    "temperature_c": 28,
+    "humidity_pct": 75,
+    "wind_kmh": 12,
+}
@@ -0,0 +1,57 @@
+"""
+Production serving: one preloading master, N forked uvicorn workers.
+
+    cd Backend/merged_backend
+    gunicorn -c gunicorn_conf.py main:app
+    WEB_CONCURRENCY=8 BIND=0.0.0.0:8000 gunicorn -c gunicorn_conf.py main:app
+
+The master imports main.py with PRELOAD_MODELS=1, so spaCy, BART, MiniLM and
+the weather artifacts are loaded once, switched to inference mode and frozen
+before fork; workers share those pages copy-on-write and only warm up. Check
+GET /memory for per-worker unique (uss) vs shared memory.
+
+Each worker keeps its own metrics; they are combined through snapshot files in
+METRICS_MULTIPROC_DIR (see utils/metrics.py), so /metrics covers every worker
+whichever one answers the scrape.
+"""
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+# Must be set before gunicorn imports the app in the master
+os.environ.setdefault("PRELOAD_MODELS", "1")
+os.environ.setdefault(
+    "METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), f"policy_api_metrics_{os.getpid()}")
+)
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Read by utils/chunked_ner.py to split the cores between the workers' NER pools
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# BART summaries of long documents can take a while on CPU
+timeout = int(os.environ.get("WORKER_TIMEOUT", "300"))
+graceful_timeout = 30
+accesslog = "-"
+
+
+def on_starting(server):
+    # Snapshots from a previous run would be summed into this one's counters
+    metrics_dir = os.environ["METRICS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Split the cores between workers instead of every worker using all of them
+    threads = int(os.environ.get("TORCH_THREADS_PER_WORKER", "0")) or max(
+        1, multiprocessing.cpu_count() // workers
+    )
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    server.log.info(f"Worker {worker.pid} using {threads} inference threads")
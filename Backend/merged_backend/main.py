@@ -1,14 +1,18 @@
 import sys, os
+import time
+import asyncio
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, JSONResponse
 from routes.routes import router
 import uvicorn
 import logging
-import spacy
-from transformers import pipeline
-from models.models import ComparatorModel
-from utils.weather_utils import WeatherDataProcessor
+from utils.metrics import REQUEST_LATENCY, REQUESTS_IN_PROGRESS, render_metrics, start_snapshot_writer
+from utils.model_registry import ModelRegistry
+from utils.memory_report import memory_report, register_memory_gauges
+from utils.profiling import ProfilingMiddleware, build_profile_router
+from utils.compression import CompressionMiddleware
 
 # Logging setup
 os.makedirs("logs", exist_ok=True)
@@ -20,17 +24,91 @@ logging.basicConfig(
 
 app = FastAPI(title="Climate Policy Analysis API", version="1.0.0")
 
+STARTED_AT = time.time()
+WARMUP_TEXT = (
+    "The Ministry of Environment will reduce greenhouse gas emissions in Colombo by 40% by 2030 "
+    "through renewable energy, coastal protection and early warning systems for extreme weather."
+)
+
+# Heavy libraries (spaCy, transformers, sentence-transformers) are imported inside
+# the loaders, so the process can answer /livez before any of them is loaded.
+def load_spacy():
+    import spacy
+    from utils.nlp_profiles import NlpProfiles
+    # One model; call sites pick the components they need (ner_only, sentences, ...)
+    return NlpProfiles(spacy.load("en_core_web_sm"))
+
+def load_summarizer():
+    # torch or ONNX Runtime (INFERENCE_BACKEND), behind a scheduler that batches
+    # concurrent requests of similar length into one pipeline call
+    from utils.onnx_backend import load_summarizer
+    from utils.summarization_scheduler import SummarizationScheduler
+    from utils.metrics import QUEUE_DEPTH, record_batch
+    scheduler = SummarizationScheduler(
+        load_summarizer(),
+        max_batch_size=int(os.environ.get("SUMMARY_MAX_BATCH_SIZE", "8")),
+        max_wait_ms=float(os.environ.get("SUMMARY_MAX_WAIT_MS", "25")),
+        on_batch=lambda size, seconds: record_batch("bart-large-cnn", size),
+    )
+    QUEUE_DEPTH.set_function(lambda: scheduler.pending, queue="summarization")
+    return scheduler
+
+def warm_summarizer(scheduler):
+    from utils.onnx_backend import inference_mode
+    with inference_mode():
+        scheduler.summarizer(WARMUP_TEXT, max_length=20, min_length=5, do_sample=False)
+
+def load_comparator():
+    from models.models import ComparatorModel
+    return ComparatorModel()
+
+def load_weather_processor():
+    from utils.weather_utils import WeatherDataProcessor
+    processor = WeatherDataProcessor()
+    # Pipeline, history and index stay in memory (shared across preforked workers)
+    processor.load_artifacts()
+    return processor
+
+models = ModelRegistry()
+models.register("weather", "weather_processor", load_weather_processor,
+                warmup=lambda m: m.recommend({"location": "Colombo", "month": 8, "temperature_c": 28,
+                                              "humidity_pct": 75, "wind_kmh": 12}))
+models.register("nlp", "nlp", load_spacy, warmup=lambda m: m(WARMUP_TEXT))
+models.register("comparator", "comparator", load_comparator,
+                warmup=lambda m: m.compute_similarity(WARMUP_TEXT, WARMUP_TEXT))
+models.register("summarizer", "summarizer", load_summarizer, warmup=warm_summarizer)
+app.state.models = models
+
+# Production mode (gunicorn -c gunicorn_conf.py main:app): load everything once in
+# the master before workers fork, so the weights stay shared copy-on-write
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS") == "1"
+if PRELOAD_MODELS:
+    models.preload(app)
+    models.prepare_for_fork(app)
+register_memory_gauges()
+
 @app.on_event("startup")
 async def load_models():
-    try:
-        app.state.nlp = spacy.load("en_core_web_sm")
-        app.state.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-        app.state.comparator = ComparatorModel()
-        app.state.weather_processor = WeatherDataProcessor()
-        logging.info("✅ All models loaded successfully")
-    except Exception as e:
-        logging.error(f"❌ Model load error: {str(e)}")
-        raise
+    # Load in the background (or only warm up, if preloaded); /readyz reports progress
+    # and routes answer 503 until ready
+    models.start(app, warmup=os.environ.get("MODEL_WARMUP", "1") != "0")
+    # Multi-worker mode: share this worker's metrics with the others through snapshot files
+    start_snapshot_writer()
+    # Pick up new weather data without a restart (0 disables)
+    interval = float(os.environ.get("WEATHER_RELOAD_INTERVAL", "30"))
+    if interval > 0:
+        app.state.weather_watcher = asyncio.create_task(watch_weather_artifacts(interval))
+    # Corpus term statistics change on every document ingest; reloaded off the request path
+    interval = float(os.environ.get("TERM_STATS_RELOAD_INTERVAL", "30"))
+    if interval > 0:
+        from utils import term_stats
+        app.state.term_stats_watcher = asyncio.create_task(term_stats.watch(interval))
+
+async def watch_weather_artifacts(interval: float):
+    # The weather model may only become ready after a load retry
+    while not models.is_ready("weather"):
+        await asyncio.sleep(interval)
+    await app.state.weather_processor.watch(interval)
 
 # CORS
 app.add_middleware(
@@ -41,12 +119,60 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Opt-in per-request profiling (admin only)
+app.add_middleware(ProfilingMiddleware)
+
+# br/gzip for large JSON responses, negotiated from Accept-Encoding
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.environ.get("COMPRESSION_MIN_BYTES", "1024")))
+
+# Request metrics
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    REQUESTS_IN_PROGRESS.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_PROGRESS.dec()
+        # Label by route template, not raw path, to keep label cardinality bounded
+        route = request.scope.get("route")
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status,
+        )
+
 # Routes
 app.include_router(router, prefix="/api")
+app.include_router(build_profile_router())
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "models_loaded": True}
+    return {"status": "ok", "models_loaded": models.ready, "models": models.status()}
+
+@app.get("/livez")
+async def livez():
+    """Liveness: the process is up and serving, regardless of model state"""
+    return {"status": "alive", "uptime_s": round(time.time() - STARTED_AT, 1)}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 only once every model is loaded and warmed up"""
+    body = {"status": "ready" if models.ready else "not_ready", "models": models.status()}
+    return JSONResponse(status_code=200 if models.ready else 503, content=body)
+
+@app.get("/memory")
+async def memory():
+    """Unique (USS) vs shared memory of this worker, and of all workers when preloaded"""
+    return memory_report(include_siblings=PRELOAD_MODELS)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -1,8 +1,12 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import os
+import asyncio
 import numpy as np
+from utils.metrics import QUEUE_DEPTH, record_batch, record_inference
+from utils.embedding_batcher import EmbeddingBatcher
+from utils.onnx_backend import inference_mode
+from utils.sentence_alignment import alignment_report, split_units
 
 # Policy Analysis Models
 class PolicyAnalysis(BaseModel):
@@ -44,15 +48,81 @@ class RecommendationResponse(BaseModel):
 
 # Policy Comparison Model
 class ComparatorModel:
-    def __init__(self):
-        self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+    def __init__(self, backend: Optional[str] = None):
+        # Imported here so importing the schemas above doesn't pull in torch;
+        # backend is "torch" or "onnx" (default: INFERENCE_BACKEND env var)
+        from utils.onnx_backend import load_sentence_encoder
+        self.model = load_sentence_encoder(backend)
+        # Concurrent requests share batched encodes instead of encoding two texts each
+        self.batcher = EmbeddingBatcher(
+            self._encode,
+            max_batch_size=int(os.environ.get("EMBED_MAX_BATCH_SIZE", "64")),
+            max_wait_ms=float(os.environ.get("EMBED_MAX_WAIT_MS", "5")),
+            on_batch=lambda size, seconds: record_batch("all-MiniLM-L6-v2", size),
+        )
+        QUEUE_DEPTH.set_function(lambda: self.batcher.pending_texts, queue="embedding_batcher")
     
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        # Runs in the batcher's worker thread, where grad mode has to be set
+        with inference_mode():
+            return self.model.encode(texts)
+
     def compute_similarity(self, policy1: str, policy2: str) -> float:
-        embedding = self.model.encode([policy1, policy2])
+        embedding = self._encode([policy1, policy2])
+        record_inference("all-MiniLM-L6-v2", 2)
+        return self._similarity(embedding)
+
+    async def compute_similarity_async(self, policy1: str, policy2: str) -> float:
+        """Same as compute_similarity, but the encode goes through the micro-batcher"""
+        embedding = await self.batcher.encode([policy1, policy2])
+        return self._similarity(embedding)
+
+    async def compare_aligned_async(self, policy1: str, policy2: str, top_k: int = 5, window: int = 1) -> dict:
+        """
+        Long-document comparison: embeds every sentence (or window of `window`
+        sentences) and aligns them, instead of truncating whole policies.
+        """
+        units1, units2 = split_units(policy1, window), split_units(policy2, window)
+        if not units1 or not units2:
+            return alignment_report(units1, units2, None, None, top_k)
+        embeddings = await self._encode_in_chunks(units1 + units2)
+        return await asyncio.to_thread(
+            alignment_report, units1, units2, embeddings[:len(units1)], embeddings[len(units1):], top_k
+        )
+
+    async def similarity_matrix_async(self, texts: List[str]) -> np.ndarray:
+        """N x N cosine similarities; all texts embedded once, in batch-sized chunks"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        embeddings = np.asarray(await self._encode_in_chunks(texts), dtype=np.float32)
+        embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings @ embeddings.T
+
+    async def _encode_in_chunks(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode through the batcher one batch-sized chunk at a time, so other
+        requests' encodes queued meanwhile run between the chunks instead of
+        waiting behind the whole document.
+        """
+        size = self.batcher.max_batch_size
+        chunks = [await self.batcher.encode(texts[i:i + size]) for i in range(0, len(texts), size)]
+        return np.concatenate(chunks)
+
+    @staticmethod
+    def _similarity(embedding) -> float:
+        from sklearn.metrics.pairwise import cosine_similarity
         similarity = cosine_similarity([embedding[0]], [embedding[1]])[0][0]
         return float(similarity)
     
-    def extract_overlap_unique(self, policy1: str, policy2: str) -> dict:
+    def extract_overlap_unique(self, policy1: str, policy2: str, mode: str = "all", top_k: int = 20) -> dict:
+        """
+        mode="all" returns every distinct whitespace token per bucket;
+        mode="ranked" returns the top_k TF-IDF-ranked terms with counts and
+        totals, so the result size no longer grows with document length.
+        """
+        if mode == "ranked":
+            from utils.term_stats import ranked_overlap_unique
+            return ranked_overlap_unique(policy1, policy2, top_k)
         set1 = set(policy1.lower().split())
         set2 = set(policy2.lower().split())
         
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request, Depends
+from pydantic import BaseModel, Field
+from utils.metrics import record_inference
+from utils.model_registry import requires_models
 
 router = APIRouter()
 
@@ -7,21 +9,26 @@ class ComparisonRequest(BaseModel):
     policy1: str
     policy2: str
 
-@router.post("/compare_policy")
-async def compare_policies(request: ComparisonRequest):
+class AlignedComparisonRequest(BaseModel):
+    policy1: str
+    policy2: str
+    top_k: int = Field(5, ge=0, le=100)
+    window: int = Field(1, ge=1, le=10)
+
+@router.post("/compare_policy", dependencies=[Depends(requires_models("nlp"))])
+async def compare_policies(request: ComparisonRequest, http_request: Request):
     try:
         # Basic validation
         if not request.policy1 or not request.policy2:
             raise HTTPException(status_code=400, detail="Both policy texts are required")
         
-        import spacy
-        
-        # Load English language model
-        nlp = spacy.load("en_core_web_sm")
+        # Use the spaCy model loaded at startup
+        nlp = http_request.app.state.nlp
         
-        # Process both texts
-        doc1 = nlp(request.policy1)
-        doc2 = nlp(request.policy2)
+        # Process both texts (entities, tokens and the tok2vec tensors for similarity)
+        doc1 = nlp(request.policy1, profile="full")
+        doc2 = nlp(request.policy2, profile="full")
+        record_inference("spacy", 2)
         
         # Calculate similarity
         similarity = doc1.similarity(doc2)
@@ -45,5 +52,22 @@ async def compare_policies(request: ComparisonRequest):
                 "word_count": len([token for token in doc2 if not token.is_punct])
             }
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/compare_policy/aligned", dependencies=[Depends(requires_models("comparator"))])
+async def compare_policies_aligned(request: AlignedComparisonRequest, http_request: Request):
+    """
+    Sentence-level comparison for long policies: mean best-alignment scores in
+    both directions plus the top_k aligned sentence (or window) pairs.
+    """
+    if not request.policy1 or not request.policy2:
+        raise HTTPException(status_code=400, detail="Both policy texts are required")
+    try:
+        return await http_request.app.state.comparator.compare_aligned_async(
+            request.policy1, request.policy2, top_k=request.top_k, window=request.window
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
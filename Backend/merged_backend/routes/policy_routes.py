@@ -1,17 +1,41 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Depends
 from utils.document_processor import process_document
-from utils.text_utils import sanitize_text
-from utils.document_analyzer import split_into_policies, summarize_text, extract_entities
+from utils.text_utils import sanitize_text, sanitize_document
+from utils.document_analyzer import split_into_policies, split_into_sections, summarize_text, extract_entities
+from utils.metrics import StageTimings
+from utils.model_registry import requires_models
+from utils.response_shaping import ResponseShape, response_shape
+from datetime import date
+from typing import Optional
+import asyncio
 import logging
+import numpy as np
 
 
 policy_router = APIRouter(prefix="/policy", tags=["policy"])
 
+# Named field groups for ?include= on /full-analysis
+FULL_ANALYSIS_GROUPS = {
+    "scores": ["status", "document_name", "similarity_score", "statistics"],
+    "summaries": ["policies.policy1.summary", "policies.policy2.summary"],
+    "keywords": ["policies.policy1.keywords", "policies.policy2.keywords"],
+    "content": ["policies.policy1.content", "policies.policy2.content"],
+    "details": ["details"],
+    "entities": ["entities"],
+    "recommendations": ["recommendations", "regional_recommendations"],
+    "alignment": ["alignment"],
+    "timings": ["timings"],
+}
+
 # -------------------------
 # 📌 Full Analysis Endpoint
 # -------------------------
-@policy_router.post("/full-analysis")
-async def full_analysis(request: Request, file: UploadFile = File(...)):
+@policy_router.post("/full-analysis",
+                    dependencies=[Depends(requires_models("nlp", "comparator", "summarizer", "weather"))])
+async def full_analysis(request: Request, file: UploadFile = File(...), timings: bool = False,
+                        compare_mode: str = "document", terms: str = "all", terms_top_k: int = 20,
+                        month: Optional[int] = None,
+                        shape: ResponseShape = Depends(response_shape(FULL_ANALYSIS_GROUPS))):
     """
     Full pipeline:
     1. Extract + preprocess
@@ -19,44 +43,78 @@ async def full_analysis(request: Request, file: UploadFile = File(...)):
     3. Compare policies
     4. Summaries & Entities
     5. Weather Recommendations
+
+    Pass `timings=true` to get per-stage latencies in the response, and
+    `compare_mode=sentences` to compare long policies sentence by sentence
+    (adds an `alignment` block with the top aligned sentence pairs).
+    `terms=ranked` limits `details` to the top `terms_top_k` TF-IDF-ranked
+    terms per bucket, with their counts and the full bucket totals.
+    `fields=` / `include=` select parts of the response and `max_items=`
+    caps list lengths (see utils/response_shaping.py).
+    `regional_recommendations` holds weather recommendations per region each
+    policy mentions, shifted by its climate impacts, for `month` (default:
+    the current month); `recommendations` is the first one for policy 1.
     """
+    if compare_mode not in ("document", "sentences"):
+        raise HTTPException(status_code=400, detail="compare_mode must be 'document' or 'sentences'")
+    if terms not in ("all", "ranked"):
+        raise HTTPException(status_code=400, detail="terms must be 'all' or 'ranked'")
+    if not 1 <= terms_top_k <= 500:
+        raise HTTPException(status_code=400, detail="terms_top_k must be between 1 and 500")
+    if month is not None and not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="month must be between 1 and 12")
+    stage_timings = StageTimings()
     try:
         # Step 1: Preprocess
         file_bytes = await file.read()
-        doc_result = process_document(file_bytes, file.filename)
-        clean_text = sanitize_text(doc_result["processed_text"])
+        doc_result = process_document(file_bytes, file.filename, stage_timings)
+        # One sentence segmentation shared by the split, analysis and NER stages
+        document = sanitize_document(doc_result["document"])
 
         # Step 2: Split & Analyze
-        extracted = await split_into_policies(clean_text, request.app.state.nlp)
+        with stage_timings.stage("split"):
+            extracted = await split_into_policies(document, request.app.state.nlp)
 
         # Step 3: Compare policies
         comparator = request.app.state.comparator
-        similarity_score = comparator.compute_similarity(
-            extracted.policy1.content, extracted.policy2.content
-        )
-        comparison = comparator.extract_overlap_unique(
-            extracted.policy1.content, extracted.policy2.content
-        )
+        alignment = None
+        with stage_timings.stage("compare"):
+            if compare_mode == "sentences":
+                alignment = await comparator.compare_aligned_async(
+                    extracted.policy1.content, extracted.policy2.content
+                )
+                similarity_score = alignment["similarity_score"]
+            else:
+                similarity_score = await comparator.compute_similarity_async(
+                    extracted.policy1.content, extracted.policy2.content
+                )
+            comparison = comparator.extract_overlap_unique(
+                extracted.policy1.content, extracted.policy2.content, mode=terms, top_k=terms_top_k
+            )
 
         # Step 4: Summaries
-        summary1 = await summarize_text(extracted.policy1.content, request.app.state.summarizer)
-        summary2 = await summarize_text(extracted.policy2.content, request.app.state.summarizer)
+        with stage_timings.stage("summarize"):
+            # Submitted together so both can share one batched summarizer call
+            summary1, summary2 = await asyncio.gather(
+                summarize_text(extracted.policy1.content, request.app.state.summarizer),
+                summarize_text(extracted.policy2.content, request.app.state.summarizer),
+            )
 
         # Step 5: Entities
-        entities = await extract_entities(clean_text, request.app.state.nlp)
+        with stage_timings.stage("ner"):
+            entities = await extract_entities(document, request.app.state.nlp)
 
-        # Step 6: Weather Recommendations (baseline demo)
+        # Step 6: Weather Recommendations per region each policy mentions, in one batch
         rec_engine = request.app.state.weather_processor
-        recs = rec_engine.recommend({
-            "location": "Colombo",
-            "month": 8,
-            "temperature_c": 28,
-            "humidity_pct": 75,
-            "wind_kmh": 12
-        })
+        with stage_timings.stage("recommend"):
+            regional = await asyncio.to_thread(rec_engine.recommend_for_policies, {
+                "policy1": extracted.policy1.climate_factors,
+                "policy2": extracted.policy2.climate_factors,
+            }, month=month or date.today().month)
+            recs = {k: v for k, v in regional["policy1"][0].items() if k not in ("region", "query")}
 
         # ✅ Flatten response so frontend works directly
-        return {
+        response = {
             "status": "success",
             "document_name": doc_result["filename"],
             "statistics": doc_result["statistics"],
@@ -75,38 +133,149 @@ async def full_analysis(request: Request, file: UploadFile = File(...)):
             "similarity_score": similarity_score,
             "details": comparison,
             "entities": entities,
-            "recommendations": recs
+            "recommendations": recs,
+            "regional_recommendations": regional
         }
+        if alignment is not None:
+            response["alignment"] = alignment
+        if timings:
+            response["timings"] = stage_timings.as_dict()
+        return shape.respond(response)
     except Exception as e:
         logging.error(f"Full analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Named field groups for ?include= on /sections-analysis
+SECTIONS_ANALYSIS_GROUPS = {
+    "sections": ["section_count", "sections.index", "sections.title", "sections.word_count"],
+    "summaries": ["sections.index", "sections.summary"],
+    "keywords": ["sections.index", "sections.keywords"],
+    "content": ["sections.index", "sections.content"],
+    "similarity": ["similarity_matrix", "most_similar_pairs"],
+    "recommendations": ["regional_recommendations"],
+    "timings": ["timings"],
+}
+
+# -------------------------
+# 📌 N-way Section Analysis Endpoint
+# -------------------------
+@policy_router.post("/sections-analysis",
+                    dependencies=[Depends(requires_models("nlp", "comparator", "summarizer", "weather"))])
+async def sections_analysis(request: Request, file: UploadFile = File(...), timings: bool = False,
+                            max_sections: int = 50, summaries: bool = True, top_pairs: int = 10,
+                            month: Optional[int] = None,
+                            shape: ResponseShape = Depends(response_shape(SECTIONS_ANALYSIS_GROUPS))):
+    """
+    Split a document into N policy sections (headings, else paragraphs; see
+    utils/policy_sections.py) instead of two, and analyse each one:
+    keywords, climate factors, summary and region-aware recommendations,
+    plus the N x N similarity matrix and the `top_pairs` most similar pairs.
+    Model work is linear in N: one batched encode, one nlp.pipe pass, N
+    summaries through the batching scheduler and one recommendation batch.
+    """
+    if not 2 <= max_sections <= 200:
+        raise HTTPException(status_code=400, detail="max_sections must be between 2 and 200")
+    if month is not None and not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="month must be between 1 and 12")
+    stage_timings = StageTimings()
+    try:
+        file_bytes = await file.read()
+        doc_result = process_document(file_bytes, file.filename, stage_timings)
+
+        # Not doc_result["document"]: headings are found line by line, and preprocess_text has
+        # already collapsed the line breaks of that text. Each section is then cleaned with the
+        # same preprocess_text + sanitize_text as the shared document.
+        with stage_timings.stage("split"):
+            sections = await split_into_sections(doc_result["raw_text"], request.app.state.nlp, max_sections)
+        contents = [section.content for section in sections]
+
+        async def summarize_all():
+            if not summaries:
+                return [None] * len(sections)
+            return await asyncio.gather(*(summarize_text(c, request.app.state.summarizer) for c in contents))
+
+        # Embedding and summaries run concurrently, each batched across sections
+        with stage_timings.stage("compare_and_summarize"):
+            matrix, section_summaries = await asyncio.gather(
+                request.app.state.comparator.similarity_matrix_async(contents), summarize_all()
+            )
+
+        with stage_timings.stage("recommend"):
+            regional = await asyncio.to_thread(
+                request.app.state.weather_processor.recommend_for_policies,
+                {f"section{i + 1}": section.climate_factors for i, section in enumerate(sections)},
+                month=month or date.today().month,
+            ) if sections else {}
+
+        pairs = []
+        if len(sections) > 1:
+            upper_i, upper_j = np.triu_indices(len(sections), k=1)
+            scores = matrix[upper_i, upper_j]
+            for p in np.argsort(-scores, kind="stable")[:max(0, top_pairs)]:
+                pairs.append({"section1": int(upper_i[p]) + 1, "section2": int(upper_j[p]) + 1,
+                              "similarity": float(scores[p])})
+
+        response = {
+            "status": "success",
+            "document_name": doc_result["filename"],
+            "statistics": doc_result["statistics"],
+            "section_count": len(sections),
+            "sections": [
+                {
+                    "index": i + 1,
+                    "title": section.title,
+                    "word_count": len(section.content.split()),
+                    "content": section.content,
+                    "summary": summary,
+                    "keywords": section.keywords,
+                    "climate_factors": {**section.climate_factors,
+                                        "affected_regions": sorted(section.climate_factors["affected_regions"])},
+                }
+                for i, (section, summary) in enumerate(zip(sections, section_summaries))
+            ],
+            "similarity_matrix": np.round(matrix, 4).tolist(),
+            "most_similar_pairs": pairs,
+            "regional_recommendations": regional,
+        }
+        if timings:
+            response["timings"] = stage_timings.as_dict()
+        return shape.respond(response)
+    except Exception as e:
+        logging.error(f"Sections analysis error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # -------------------------
 # 📌 Named Entity Recognition Endpoint
 # -------------------------
-@policy_router.post("/ner")
-async def ner_api(request: Request, file: UploadFile = File(...)):
+@policy_router.post("/ner", dependencies=[Depends(requires_models("nlp"))])
+async def ner_api(request: Request, file: UploadFile = File(...), timings: bool = False,
+                  shape: ResponseShape = Depends(response_shape())):
     """
     Extract named entities (ORG, DATE, GPE, MONEY, etc.)
     from a PDF/DOCX document.
     """
+    stage_timings = StageTimings()
     try:
         # Read file content
         file_bytes = await file.read()
-        doc_result = process_document(file_bytes, file.filename)
+        doc_result = process_document(file_bytes, file.filename, stage_timings)
 
         # Clean text
-        text = sanitize_text(doc_result["processed_text"])
+        document = sanitize_document(doc_result["document"])
 
         # Use spaCy model from app.state
-        entities = await extract_entities(text, nlp=request.app.state.nlp)
+        with stage_timings.stage("ner"):
+            entities = await extract_entities(document, nlp=request.app.state.nlp)
 
-        return {
+        response = {
             "status": "success",
             "filename": doc_result["filename"],
             "entities": entities
         }
+        if timings:
+            response["timings"] = stage_timings.as_dict()
+        return shape.respond(response)
 
     except Exception as e:
         logging.error(f"NER error: {str(e)}")
@@ -116,23 +285,28 @@ async def ner_api(request: Request, file: UploadFile = File(...)):
 # -------------------------
 # 📌 Summarization Endpoint
 # -------------------------
-@policy_router.post("/summarize")
-async def summarize_api(request: Request, file: UploadFile = File(...)):
+@policy_router.post("/summarize", dependencies=[Depends(requires_models("summarizer"))])
+async def summarize_api(request: Request, file: UploadFile = File(...), timings: bool = False):
     """
     Generate a concise summary of the document.
     """
+    stage_timings = StageTimings()
     try:
         file_bytes = await file.read()
-        doc_result = process_document(file_bytes, file.filename)
+        doc_result = process_document(file_bytes, file.filename, stage_timings)
         text = sanitize_text(doc_result["processed_text"])
 
-        summary = await summarize_text(text, request.app.state.summarizer)
+        with stage_timings.stage("summarize"):
+            summary = await summarize_text(text, request.app.state.summarizer)
 
-        return {
+        response = {
             "status": "success",
             "filename": doc_result["filename"],
             "summary": summary
         }
+        if timings:
+            response["timings"] = stage_timings.as_dict()
+        return response
     except Exception as e:
         logging.error(f"Summarization error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -142,20 +316,24 @@ async def summarize_api(request: Request, file: UploadFile = File(...)):
 # 📌 Simple Analysis Endpoint
 # -------------------------
 @policy_router.post("/analyze")
-async def analyze_document(file: UploadFile = File(...)):
+async def analyze_document(file: UploadFile = File(...), timings: bool = False):
     """
     Extract + preprocess only (lightweight analysis).
     """
+    stage_timings = StageTimings()
     try:
         file_bytes = await file.read()
-        doc_result = process_document(file_bytes, file.filename)
+        doc_result = process_document(file_bytes, file.filename, stage_timings)
 
-        return {
+        response = {
             "status": "success",
             "filename": doc_result["filename"],
             "text": doc_result["processed_text"],
             "statistics": doc_result["statistics"]
         }
+        if timings:
+            response["timings"] = stage_timings.as_dict()
+        return response
     except Exception as e:
         logging.error(f"Analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
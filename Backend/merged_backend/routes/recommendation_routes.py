@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Request, Depends, Header, Query
+from models.models import WeatherQuery, RecommendationResponse
+from utils.model_registry import requires_models
+from utils.profiling import is_admin
+import asyncio
+import logging
+
+# Each evaluation query also runs an exact search over every row
+MAX_EVALUATION_QUERIES = 1000
+
+recommendation_router = APIRouter(prefix="/recommendations", tags=["recommendations"])
+
+@recommendation_router.post("/", response_model=RecommendationResponse,
+                            dependencies=[Depends(requires_models("weather"))])
+async def get_recommendations(q: WeatherQuery, request: Request):
+    """
+    Weather-based recommendations for a single query.
+    """
+    try:
+        return request.app.state.weather_processor.recommend(q.dict(), top_n=5)
+    except Exception as e:
+        logging.error(f"Recommendation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@recommendation_router.get("/index", dependencies=[Depends(requires_models("weather"))])
+async def recommendation_index(request: Request, evaluate: bool = False,
+                               n_queries: int = Query(200, ge=1, le=MAX_EVALUATION_QUERIES),
+                               x_admin_token: str = Header("")):
+    """
+    Size and layout of the nearest-neighbour index; with evaluate=true (admin
+    only, X-Admin-Token as for profiling) also recall@5 against exact search
+    and search latency.
+    """
+    processor = request.app.state.weather_processor
+    if evaluate:
+        if not is_admin(x_admin_token):
+            raise HTTPException(status_code=403, detail="Valid X-Admin-Token required for evaluate=true")
+        return await asyncio.to_thread(processor.evaluate_index, n_queries=n_queries)
+    return processor.index_stats()
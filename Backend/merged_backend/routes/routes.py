@@ -1,7 +1,11 @@
 from fastapi import APIRouter
 from .document_routes import document_router
 from .policy_routes import policy_router
+from .compare_routes import router as compare_router
+from .recommendation_routes import recommendation_router
 
 router = APIRouter()
 router.include_router(document_router)
 router.include_router(policy_router)
+router.include_router(compare_router, tags=["compare"])
+router.include_router(recommendation_router)
@@ -0,0 +1,68 @@
+"""
+Unit tests for the chunk planning and span merging of utils/chunked_ner.py
+(no spaCy model needed).
+
+    pytest test_chunked_ner.py
+"""
+from utils.chunked_ner import merge_spans, plan_chunks
+from utils.document_model import Document
+
+
+def sentences_text(n: int) -> str:
+    return " ".join(f"Sentence number {i} is here." for i in range(n))
+
+
+def test_short_text_is_one_chunk():
+    document = Document("One sentence. Another one.  ")
+    assert plan_chunks(document, 1000) == [(0, len("One sentence. Another one."))]
+    assert plan_chunks(Document(""), 1000) == []
+
+
+def test_chunks_are_whole_sentences_within_the_limit():
+    document = Document(sentences_text(60))
+    chunks = plan_chunks(document, 200, overlap=1)
+    assert len(chunks) > 1
+    starts, ends = set(document.starts.tolist()), set(document.ends.tolist())
+    for start, end in chunks:
+        assert end - start <= 200
+        assert start in starts and end in ends
+    assert chunks[0][0] == document.starts[0] and chunks[-1][1] == document.ends[-1]
+
+
+def test_consecutive_chunks_share_overlap_sentences():
+    document = Document(sentences_text(60))
+    for overlap in (0, 1, 2):
+        chunks = plan_chunks(document, 200, overlap=overlap)
+        for (_, prev_end), (start, _) in zip(chunks, chunks[1:]):
+            shared = [i for i in range(len(document)) if start <= document.starts[i] and document.ends[i] <= prev_end]
+            assert len(shared) == overlap
+        # Every sentence is in some chunk
+        for i in range(len(document)):
+            assert any(s <= document.starts[i] and document.ends[i] <= e for s, e in chunks)
+
+
+def test_overlong_sentence_is_cut_at_whitespace():
+    long_sentence = " ".join(["word"] * 100) + "."
+    document = Document(f"Short one. {long_sentence} Short two.")
+    chunks = plan_chunks(document, 120)
+    for start, end in chunks:
+        assert end - start <= 120
+    pieces = [(s, e) for s, e in chunks if document.text[s:e] in long_sentence]
+    assert "".join(document.text[s:e] for s, e in pieces) == long_sentence
+    for start, _ in pieces[1:]:
+        assert document.text[start] == " "
+
+
+def test_merge_spans_drops_duplicates_and_sorts():
+    spans = [(30, 40, "GPE"), (0, 5, "ORG"), (30, 40, "GPE"), (10, 20, "DATE")]
+    assert merge_spans(spans) == [(0, 5, "ORG"), (10, 20, "DATE"), (30, 40, "GPE")]
+
+
+def test_merge_spans_keeps_earlier_longer_span():
+    # The same entity seen whole in one chunk and cut at the seam in the next
+    assert merge_spans([(10, 30, "ORG"), (10, 18, "ORG"), (18, 30, "ORG")]) == [(10, 30, "ORG")]
+    # Overlapping spans: the one starting first wins
+    assert merge_spans([(12, 25, "GPE"), (10, 20, "ORG")]) == [(10, 20, "ORG")]
+    # Adjacent spans both stay
+    assert merge_spans([(0, 5, "ORG"), (5, 9, "GPE")]) == [(0, 5, "ORG"), (5, 9, "GPE")]
+    assert merge_spans([]) == []
@@ -0,0 +1,66 @@
+"""
+The reduced spaCy profiles (utils/nlp_profiles.py) must give the same
+results as the full pipeline for the parts they cover:
+
+    ner_only     same entities (offsets and labels)
+    tokens_only  same tokens and lexical attributes
+    sentences    same sentence boundaries, up to senter vs parser disagreements
+
+    pytest test_nlp_profiles.py
+
+Skipped when en_core_web_sm is not installed.
+"""
+import pytest
+
+from utils.nlp_profiles import PROFILES, NlpProfiles
+
+en_core_web_sm = pytest.importorskip("en_core_web_sm")
+
+TEXTS = [
+    "We will reduce carbon emissions by 50% by 2030 through renewable energy adoption. "
+    "The Ministry of Environment in Colombo will report progress every year.",
+    "The coastal regions of Colombo and Galle will build sea walls and early warning systems. "
+    "Kandy and Trincomalee will reduce urban heat islands with green roofs and urban forests. "
+    "The Green Climate Fund committed USD 20 million in March 2024.",
+    "Farmers will receive subsidies for drought-resistant seeds. Drip irrigation is funded too!",
+]
+# senter is a lighter model than the parser; allow it to place a few boundaries differently
+MIN_SENTENCE_BOUNDARY_F1 = 0.9
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    return NlpProfiles(en_core_web_sm.load())
+
+
+@pytest.fixture(scope="module")
+def full_docs(nlp):
+    return list(nlp.pipe(TEXTS, profile="full"))
+
+
+def test_every_profile_runs(nlp):
+    for profile in PROFILES:
+        assert len(nlp(TEXTS[0], profile=profile)) > 0
+    with pytest.raises(ValueError):
+        nlp(TEXTS[0], profile="parser_only")
+
+
+def test_ner_only_matches_full(nlp, full_docs):
+    for doc, full in zip(nlp.pipe(TEXTS, profile="ner_only"), full_docs):
+        assert [(e.start_char, e.end_char, e.label_) for e in doc.ents] == \
+               [(e.start_char, e.end_char, e.label_) for e in full.ents]
+
+
+def test_tokens_only_matches_full(nlp, full_docs):
+    for doc, full in zip(nlp.pipe(TEXTS, profile="tokens_only"), full_docs):
+        assert [(t.idx, t.text, t.is_punct, t.like_num) for t in doc] == \
+               [(t.idx, t.text, t.is_punct, t.like_num) for t in full]
+
+
+def test_sentences_match_full(nlp, full_docs):
+    found = expected = agreed = 0
+    for doc, full in zip(nlp.pipe(TEXTS, profile="sentences"), full_docs):
+        starts = {s.start_char for s in doc.sents}
+        full_starts = {s.start_char for s in full.sents}
+        found, expected, agreed = found + len(starts), expected + len(full_starts), agreed + len(starts & full_starts)
+    assert 2 * agreed / (found + expected) >= MIN_SENTENCE_BOUNDARY_F1
@@ -0,0 +1,92 @@
+"""
+Parity check between the torch and ONNX Runtime backends.
+
+    python test_onnx_parity.py            # fp32 ONNX vs torch
+    python test_onnx_parity.py --quantize # int8 ONNX vs torch (looser tolerances)
+    RUN_ONNX_PARITY=1 pytest test_onnx_parity.py   # both modes
+
+Exports the models on first run (see utils/onnx_backend.py), which downloads
+MiniLM and BART, so under pytest the checks are skipped unless
+RUN_ONNX_PARITY=1 is set.
+"""
+import os
+import sys
+import difflib
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    os.environ.get("RUN_ONNX_PARITY") != "1",
+    reason="downloads and exports MiniLM and BART; set RUN_ONNX_PARITY=1 to run",
+)
+QUANTIZE_MODES = pytest.mark.parametrize("quantize", [False, True], ids=["fp32", "int8"])
+
+
+def tolerances(quantize: bool):
+    """(max similarity difference, min summary token match ratio)"""
+    # fp32 graphs should match torch almost exactly; int8 trades a little accuracy for speed
+    return (0.03, 0.6) if quantize else (1e-3, 0.9)
+
+POLICY_PAIRS = [
+    ("We will reduce carbon emissions by 50% by 2030 through renewable energy adoption.",
+     "Our goal is to cut greenhouse gas emissions in half by 2030 using solar and wind power."),
+    ("The coastal regions of Colombo and Galle will build sea walls and early warning systems.",
+     "Kandy and Trincomalee will reduce urban heat islands with green roofs and urban forests."),
+    ("Farmers will receive subsidies for drought-resistant seeds and drip irrigation.",
+     "The ministry will fund drought-tolerant crop varieties and efficient irrigation for farmers."),
+]
+
+SUMMARY_TEXT = (
+    "The coastal regions of Colombo and Galle face increasing risks due to climate change. This policy "
+    "aims to implement protective measures against rising sea levels and extreme weather events. We project "
+    "a temperature increase of 2°C by 2030 in these coastal areas, with increased humidity levels during "
+    "monsoon seasons. The policy recommends strengthening coastal infrastructure to withstand stronger winds "
+    "and more frequent storms. Key measures include building sea walls in Colombo harbor, implementing early "
+    "warning systems for extreme weather and installing wind barriers in high-risk zones."
+)
+
+
+def cosine(a, b) -> float:
+    return float((a @ b) / ((a @ a) ** 0.5 * (b @ b) ** 0.5))
+
+
+@QUANTIZE_MODES
+def test_similarity_parity(quantize):
+    from utils.onnx_backend import OnnxSentenceEncoder, load_sentence_encoder
+    similarity_tolerance, _ = tolerances(quantize)
+    torch_encoder = load_sentence_encoder("torch")
+    onnx_encoder = OnnxSentenceEncoder(quantize=quantize)
+    print(f"\n=== Similarity parity ({'int8' if quantize else 'fp32'}) ===")
+    worst = 0.0
+    for policy1, policy2 in POLICY_PAIRS:
+        t = torch_encoder.encode([policy1, policy2])
+        o = onnx_encoder.encode([policy1, policy2])
+        torch_score, onnx_score = cosine(t[0], t[1]), cosine(o[0], o[1])
+        diff = abs(torch_score - onnx_score)
+        worst = max(worst, diff)
+        print(f"torch {torch_score:.4f} | onnx {onnx_score:.4f} | diff {diff:.5f}")
+    print(f"Worst diff: {worst:.5f} (tolerance {similarity_tolerance})")
+    assert worst <= similarity_tolerance
+
+
+@QUANTIZE_MODES
+def test_summary_parity(quantize):
+    from utils.onnx_backend import load_onnx_summarizer, load_summarizer
+    _, summary_min_ratio = tolerances(quantize)
+    kwargs = {"max_length": 120, "min_length": 40, "do_sample": False}
+    torch_summary = load_summarizer("torch")(SUMMARY_TEXT, **kwargs)[0]["summary_text"]
+    onnx_summary = load_onnx_summarizer(quantize=quantize)(SUMMARY_TEXT, **kwargs)[0]["summary_text"]
+    ratio = difflib.SequenceMatcher(None, torch_summary.split(), onnx_summary.split()).ratio()
+    print(f"\n=== Summary parity ({'int8' if quantize else 'fp32'}) ===")
+    print(f"torch: {torch_summary}")
+    print(f"onnx:  {onnx_summary}")
+    print(f"Token match ratio: {ratio:.3f} (minimum {summary_min_ratio})")
+    assert ratio >= summary_min_ratio
+
+
+if __name__ == "__main__":
+    quantize = "--quantize" in sys.argv
+    print("Starting ONNX parity tests...")
+    test_similarity_parity(quantize)
+    test_summary_parity(quantize)
+    print("\nAll parity checks passed")
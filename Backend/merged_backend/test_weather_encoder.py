@@ -0,0 +1,83 @@
+"""
+Unit tests for the incremental weather feature encoder (utils/weather_encoder.py).
+
+    pytest test_weather_encoder.py
+"""
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from utils.weather_encoder import CAT_FEATURES, NUM_FEATURES, IncrementalWeatherEncoder
+
+
+def weather_rows(n: int, locations=("Colombo", "Kandy", "Galle"), shift: float = 0.0, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "location": rng.choice(list(locations), size=n),
+        "month": rng.integers(1, 13, size=n),
+        "temperature_c": rng.normal(28 + shift, 2, size=n),
+        "humidity_pct": rng.normal(75 + shift, 8, size=n),
+        "wind_kmh": rng.normal(12 + shift, 4, size=n),
+    })
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return a @ b.T
+
+
+def test_matches_one_hot_and_scaler_similarities():
+    rows = weather_rows(300)
+    encoder = IncrementalWeatherEncoder().fit(rows)
+    reference = ColumnTransformer([
+        ("num", StandardScaler(), NUM_FEATURES),
+        ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), CAT_FEATURES),
+    ]).fit(rows)
+    ours, theirs = encoder.transform(rows[:50]), reference.transform(rows[:50])
+    assert ours.shape == theirs.shape
+    assert np.allclose(cosine(ours, ours), cosine(theirs, theirs), atol=1e-5)
+
+
+def test_fit_on_chunks_equals_fit_on_frame():
+    rows = weather_rows(300)
+    whole = IncrementalWeatherEncoder().fit(rows)
+    chunked = IncrementalWeatherEncoder().fit(rows.iloc[i:i + 64] for i in range(0, len(rows), 64))
+    assert chunked.rows_seen == whole.rows_seen == 300
+    assert np.allclose(chunked.transform(rows), whole.transform(rows), atol=1e-5)
+
+
+def test_new_categories_get_slots_at_the_end():
+    encoder = IncrementalWeatherEncoder().fit(weather_rows(200))
+    old_dim = encoder.dim
+    before = encoder.transform(weather_rows(20, seed=1))
+
+    encoder.partial_fit(weather_rows(10, locations=("Jaffna",), seed=2))
+    assert encoder.dim == old_dim + 1
+    assert encoder.slots["location"]["Jaffna"] == old_dim
+
+    # Existing slots keep their columns, so older vectors stay valid after zero-padding
+    after = encoder.transform(weather_rows(20, seed=1))
+    assert np.array_equal(after[:, len(NUM_FEATURES):old_dim], before[:, len(NUM_FEATURES):])
+    assert not after[:, old_dim:].any()
+
+
+def test_unseen_category_encodes_as_zeros():
+    encoder = IncrementalWeatherEncoder().fit(weather_rows(200))
+    vectors = encoder.transform(weather_rows(5, locations=("Atlantis",)))
+    location_slots = list(encoder.slots["location"].values())
+    assert not vectors[:, location_slots].any()
+    assert vectors.shape == (5, encoder.dim)
+
+
+def test_drift():
+    encoder = IncrementalWeatherEncoder()
+    assert encoder.drift() == 0.0
+    encoder.fit(weather_rows(500))
+    assert encoder.drift() == 0.0
+
+    encoder.partial_fit(weather_rows(500, shift=10.0, seed=3))
+    assert encoder.drift() > 0.5
+    encoder.mark_encoded()
+    assert encoder.drift() == 0.0
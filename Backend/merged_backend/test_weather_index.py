@@ -0,0 +1,129 @@
+"""
+Unit tests for the weather nearest-neighbour indexes (utils/weather_index.py).
+
+    pytest test_weather_index.py
+"""
+import pickle
+
+import numpy as np
+
+from utils.weather_index import ExactIndex, IVFIndex, build_index, evaluate_recall, normalize_rows
+
+
+def clustered_vectors(n: int = 4000, dim: int = 12, clusters: int = 20, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(clusters, size=n)] + 0.1 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def brute_force(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = normalize_rows(vectors) @ normalize_rows(query)[0]
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+def test_exact_index_matches_brute_force():
+    vectors = clustered_vectors()
+    index = build_index(vectors, kind="exact")
+    assert isinstance(index, ExactIndex) and index.size == len(vectors)
+    for query in vectors[:20]:
+        ids, scores = index.search(query, 5)
+        assert ids.tolist() == brute_force(vectors, query, 5).tolist()
+        assert np.all(np.diff(scores) <= 0)
+
+
+def test_search_batch_matches_search():
+    vectors = clustered_vectors()
+    for kind in ("exact", "ivf"):
+        index = build_index(vectors, kind=kind)
+        queries = vectors[:15] + 0.05
+        for (batch_ids, batch_scores), query in zip(index.search_batch(queries, 5), queries):
+            ids, scores = index.search(query, 5)
+            assert batch_ids.tolist() == ids.tolist()
+            assert np.allclose(batch_scores, scores, atol=1e-6)
+
+
+def test_ivf_index_assigns_every_row_once():
+    vectors = clustered_vectors()
+    index = build_index(vectors, kind="ivf", n_probe=4)
+    assert isinstance(index, IVFIndex) and index.trained
+    assert index.size == len(vectors)
+    stored = np.concatenate([ids.view() for ids in index._list_ids])
+    assert sorted(stored.tolist()) == list(range(len(vectors)))
+
+
+def test_ivf_full_probe_is_exact():
+    vectors = clustered_vectors()
+    index = build_index(vectors, kind="ivf")
+    for query in vectors[:20]:
+        ids, _ = index.exact_search(query, 5)
+        assert set(ids.tolist()) == set(brute_force(vectors, query, 5).tolist())
+
+
+def test_ivf_recall_on_clustered_data():
+    vectors = clustered_vectors()
+    index = build_index(vectors, kind="ivf", n_probe=8)
+    report = evaluate_recall(index, vectors[:100] + 0.02, k=5)
+    assert report["queries"] == 100
+    assert report["recall_at_k"] >= 0.9
+
+
+def test_evaluate_recall_of_exact_index_is_one():
+    vectors = clustered_vectors(n=500)
+    report = evaluate_recall(build_index(vectors, kind="exact"), vectors[:30], k=5)
+    assert report["recall_at_k"] == 1.0
+
+
+def test_evaluate_recall_counts_misses():
+    class Shuffled:
+        """Returns the worst rows instead of the best ones"""
+
+        def __init__(self, exact):
+            self.exact = exact
+
+        def search(self, query, k):
+            ids, scores = self.exact.search(-normalize_rows(query)[0], k)
+            return ids, -scores
+
+        def exact_search(self, query, k):
+            return self.exact.search(query, k)
+
+        def stats(self):
+            return {}
+
+    vectors = clustered_vectors(n=500)
+    report = evaluate_recall(Shuffled(build_index(vectors, kind="exact")), vectors[:10], k=5)
+    assert report["recall_at_k"] == 0.0
+
+
+def test_incremental_add_and_widen():
+    vectors = clustered_vectors(n=1000)
+    for kind in ("exact", "ivf"):
+        index = build_index(vectors[:800], kind=kind)
+        ids = index.add(vectors[800:])
+        assert ids.tolist() == list(range(800, 1000))
+        assert index.size == 1000
+
+        index.widen(vectors.shape[1] + 3)
+        assert index.dim == vectors.shape[1] + 3
+        # A row with the new columns set only matches through the old ones
+        query = np.concatenate([vectors[900], np.zeros(3, dtype=np.float32)])
+        found, _ = index.search(query, 1)
+        assert found[0] == 900
+
+
+def test_pickle_keeps_only_filled_rows():
+    vectors = clustered_vectors(n=1000)
+    for kind in ("exact", "ivf"):
+        index = build_index(vectors[:17], kind=kind)
+        index.add(vectors[17:40])
+        restored = pickle.loads(pickle.dumps(index))
+        assert restored.size == 40
+        for query in vectors[:5]:
+            assert restored.search(query, 3)[0].tolist() == index.search(query, 3)[0].tolist()
+        restored.add(vectors[40:60])
+        assert restored.size == 60
+
+    index = build_index(vectors[:500], kind="exact")
+    index.add(vectors[500:600])
+    assert index._vectors.data.shape[0] > 600  # spare capacity after doubling
+    assert pickle.loads(pickle.dumps(index))._vectors.data.shape[0] == 600
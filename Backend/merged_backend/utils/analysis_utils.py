@@ -1,11 +1,33 @@
 import re
-import spacy
-from transformers import pipeline
+import threading
 from models.models import PolicyAnalysis
 
-# Load NLP models once
-nlp = spacy.load("en_core_web_sm")
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+# NLP models are loaded once, on first use, so importing this module stays cheap
+_nlp = None
+_summarizer = None
+# Requests run these from worker threads; the lock keeps two of them from loading a model twice
+_load_lock = threading.Lock()
+
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        with _load_lock:
+            if _nlp is None:
+                import spacy
+                from utils.nlp_profiles import NlpProfiles
+                _nlp = NlpProfiles(spacy.load("en_core_web_sm"))
+    return _nlp
+
+
+def get_summarizer():
+    global _summarizer
+    if _summarizer is None:
+        with _load_lock:
+            if _summarizer is None:
+                from utils.onnx_backend import load_summarizer
+                _summarizer = load_summarizer()
+    return _summarizer
 
 
 def analyze_document(text: str) -> PolicyAnalysis:
@@ -70,13 +92,15 @@ def summarize_text(text: str, max_length: int = 120, min_length: int = 40) -> st
 
     # Truncate if text is very long
     text = text[:2000]
-    result = summarizer(text, max_length=max_length, min_length=min_length, do_sample=False)
+    from utils.onnx_backend import inference_mode
+    with inference_mode():
+        result = get_summarizer()(text, max_length=max_length, min_length=min_length, do_sample=False)
     return result[0]['summary_text']
 
 
 def extract_entities(text: str):
 
-    doc = nlp(text)
+    doc = get_nlp()(text, profile="ner_only")
     entities = []
     for ent in doc.ents:
         entities.append({"text": ent.text, "label": ent.label_})
@@ -0,0 +1,169 @@
+"""
+Named entities for documents of any length.
+
+Each text is cut into chunks of whole sentences (at most NER_CHUNK_CHARS
+characters, never beyond nlp.max_length) that overlap by NER_OVERLAP_SENTENCES
+sentences, so an entity at a seam is seen whole in at least one chunk. All
+chunks of all texts go through one nlp.pipe pass with the `ner_only` spaCy
+profile: in this process for up to a chunk's worth of text, otherwise spread
+over a pool of NER_PROCESSES worker processes (default: the cores divided
+between the WEB_CONCURRENCY server workers, as each has its own pool) that
+each load the model once and are reused across requests. If the pool breaks
+(a worker killed, e.g. out of memory) the request falls back to this process
+and the next one starts a new pool. Entities come back with
+global character offsets; duplicates from the overlaps are dropped and, where
+chunks disagree at a seam, the earlier, longer span wins.
+"""
+import os
+import asyncio
+import atexit
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Sequence, Tuple, Union
+
+from utils.document_model import Document, as_document
+from utils.metrics import record_batch
+from utils.nlp_profiles import NlpProfiles
+
+NER_CHUNK_CHARS = int(os.environ.get("NER_CHUNK_CHARS", "20000"))
+NER_OVERLAP_SENTENCES = int(os.environ.get("NER_OVERLAP_SENTENCES", "1"))
+NER_PROCESSES = int(os.environ.get("NER_PROCESSES", "0")) or max(
+    1, (os.cpu_count() or 1) // max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+)
+
+# (start, end, label) with offsets into the text the chunk came from
+Span = Tuple[int, int, str]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_model: Optional[str] = None
+_worker_nlp = None
+
+
+def plan_chunks(document: Document, max_chars: int, overlap: int = 1) -> List[Tuple[int, int]]:
+    """(start, end) character ranges of whole sentences, consecutive ranges sharing `overlap` sentences"""
+    text_end = len(document.text.rstrip())
+    if text_end <= max_chars or len(document) == 0:
+        return [(0, text_end)] if text_end else []
+    chunks = []
+    first = 0
+    while first < len(document):
+        start = int(document.starts[first])
+        last = first
+        while last + 1 < len(document) and document.ends[last + 1] - start <= max_chars:
+            last += 1
+        end = int(document.ends[last])
+        if end - start > max_chars:
+            # One sentence longer than a chunk: cut it at whitespace
+            chunks.extend(_hard_split(document.text, start, end, max_chars))
+        else:
+            chunks.append((start, end))
+        if last + 1 >= len(document):
+            break
+        first = max(first + 1, last + 1 - overlap)
+    return chunks
+
+
+def _hard_split(text: str, start: int, end: int, max_chars: int) -> List[Tuple[int, int]]:
+    pieces = []
+    while end - start > max_chars:
+        cut = text.rfind(" ", start + max_chars // 2, start + max_chars)
+        cut = cut if cut > start else start + max_chars
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
+
+
+def merge_spans(spans: List[Span]) -> List[Span]:
+    """Drop duplicates from overlapping chunks; of overlapping spans keep the earlier, longer one"""
+    merged: List[Span] = []
+    for span in sorted(set(spans), key=lambda s: (s[0], -(s[1] - s[0]))):
+        if merged and span[0] < merged[-1][1]:
+            continue
+        merged.append(span)
+    return merged
+
+
+def _init_worker(model_name: str):
+    global _worker_nlp
+    import spacy
+    _worker_nlp = NlpProfiles(spacy.load(model_name))
+
+
+def _entities(nlp: NlpProfiles, texts: List[str]) -> List[List[Span]]:
+    return [[(e.start_char, e.end_char, e.label_) for e in doc.ents] for doc in nlp.pipe(texts, profile="ner_only")]
+
+
+def _worker_entities(texts: List[str]) -> List[List[Span]]:
+    return _entities(_worker_nlp, texts)
+
+
+def _get_pool(nlp: NlpProfiles) -> Optional[ProcessPoolExecutor]:
+    global _pool, _pool_model
+    if NER_PROCESSES <= 1:
+        return None
+    model_name = f"{nlp.meta.get('lang', 'en')}_{nlp.meta.get('name', 'core_web_sm')}"
+    if _pool is None or _pool_model != model_name:
+        # spawn, not fork: the API process runs threads (event loop, torch, batchers)
+        _pool = ProcessPoolExecutor(max_workers=NER_PROCESSES, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=_init_worker, initargs=(model_name,))
+        _pool_model = model_name
+    return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    global _pool, _pool_model
+    if _pool is pool:
+        _pool, _pool_model = None, None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def find_entities_many(texts: Sequence[Union[str, Document]], nlp: NlpProfiles) -> List[List[Span]]:
+    """Entity spans for each text, with offsets into that text"""
+    documents = [as_document(t) for t in texts]
+    max_chars = min(NER_CHUNK_CHARS, nlp.max_length - 1)
+    owners, offsets, chunk_texts = [], [], []
+    for i, document in enumerate(documents):
+        for start, end in plan_chunks(document, max_chars, NER_OVERLAP_SENTENCES):
+            owners.append(i)
+            offsets.append(start)
+            chunk_texts.append(document.text[start:end])
+
+    # Worker processes only pay off once there is more than a chunk's worth of text
+    total_chars = sum(len(t) for t in chunk_texts)
+    pool = _get_pool(nlp) if len(chunk_texts) > 1 and total_chars > NER_CHUNK_CHARS else None
+    if pool is None:
+        chunk_spans = await asyncio.to_thread(_entities, nlp, chunk_texts) if chunk_texts else []
+    else:
+        # Contiguous groups, one per worker, each a single nlp.pipe call
+        n = min(NER_PROCESSES, len(chunk_texts))
+        bounds = [len(chunk_texts) * k // n for k in range(n + 1)]
+        loop = asyncio.get_running_loop()
+        try:
+            groups = await asyncio.gather(*(
+                loop.run_in_executor(pool, _worker_entities, chunk_texts[bounds[k]:bounds[k + 1]]) for k in range(n)
+            ))
+            chunk_spans = [spans for group in groups for spans in group]
+        except BrokenProcessPool:
+            logging.warning("NER worker pool broke; running this request in-process and starting a new pool next time")
+            _discard_pool(pool)
+            chunk_spans = await asyncio.to_thread(_entities, nlp, chunk_texts)
+    if chunk_texts:
+        record_batch("spacy", len(chunk_texts))
+
+    per_text: List[List[Span]] = [[] for _ in documents]
+    for owner, offset, spans in zip(owners, offsets, chunk_spans):
+        per_text[owner].extend((start + offset, end + offset, label) for start, end, label in spans)
+    return [merge_spans(spans) for spans in per_text]
+
+
+async def find_entities(text: Union[str, Document], nlp: NlpProfiles) -> List[Span]:
+    return (await find_entities_many([text], nlp))[0]
@@ -0,0 +1,102 @@
+"""
+Negotiated response compression (br or gzip).
+
+Pure ASGI middleware: a response is compressed when the client accepts br
+(brotli package installed) or gzip, the body arrives in one message, is at
+least `minimum_size` bytes and has a text/JSON content type. Streaming and
+already-encoded responses (file downloads, NDJSON streams) pass through.
+"""
+import gzip
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding from an Accept-Encoding header, honouring q=0"""
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            offered[name.strip().lower()] = q
+    for coding in (("br",) if brotli is not None else ()) + ("gzip",):
+        q = offered.get(coding, offered.get("*", 0.0))
+        if q > 0:
+            return coding
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope.get("headers", ()):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        coding = choose_encoding(accept) if accept else None
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            # First body message decides: compress a complete, compressible body or pass through
+            headers = {k.lower(): v for k, v in start_message.get("headers", [])}
+            body = message.get("body", b"")
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            if (message.get("more_body", False) or b"content-encoding" in headers
+                    or len(body) < self.minimum_size
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self._compress(body, coding)
+            new_headers = [(k, v) for k, v in start_message.get("headers", [])
+                           if k.lower() not in (b"content-length", b"vary")]
+            vary = headers.get(b"vary")
+            new_headers += [
+                (b"content-encoding", coding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": new_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
@@ -1,12 +1,25 @@
 from models.models import PolicyAnalysis
-from typing import List, Dict, Tuple
+from utils.metrics import record_inference
+from utils.onnx_backend import inference_mode
+from utils.policy_sections import POLICY_KEYWORDS, split_sections
+from utils.text_utils import sanitize_text
+from utils.summarization_scheduler import SummarizationScheduler
+from utils.term_stats import top_keywords
+from utils.chunked_ner import find_entities, find_entities_many
+from utils.document_model import Document, as_document
+from typing import List, Dict, Tuple, Union
+import asyncio
+import os
 import re
 
+KEYWORD_TOP_K = int(os.environ.get("KEYWORD_TOP_K", "25"))
+YEAR_PATTERN = re.compile(r"\b(20[2-5][0-9])\b")
+
 class PolicySection:
     def __init__(self):
         self.title = ""
         self.content = ""
-        self.keywords = set()
+        self.keywords: List[str] = []  # most distinctive first
         self.topics = []
         self.climate_factors = {
             'temperature_impact': 0.0,  # -1 to 1 scale
@@ -22,19 +35,48 @@ class ExtractedPolicies:
         self.shared_keywords: List[str] = []
         self.analysis: PolicyAnalysis = PolicyAnalysis()
 
-async def split_into_policies(text: str, nlp) -> ExtractedPolicies:
+def analyze_climate_factors(policy: PolicySection, entities: List[Tuple[str, str]]):
+    """Climate impacts from keyword cues; regions and key entities from (text, label) pairs"""
+    content = policy.content.lower()
+    # Extract temperature impact
+    if any(word in content for word in ['temperature', 'warming', 'heat', 'cooling', 'thermal']):
+        temp_indicators = sum(1 for word in ['increase', 'rise', 'higher', 'hot'] if word in content)
+        temp_indicators -= sum(1 for word in ['decrease', 'reduce', 'lower', 'cool'] if word in content)
+        policy.climate_factors['temperature_impact'] = max(min(temp_indicators / 3, 1.0), -1.0)
+
+    # Extract humidity impact
+    if any(word in content for word in ['humidity', 'moisture', 'precipitation', 'rainfall']):
+        humid_indicators = sum(1 for word in ['increase', 'more', 'higher', 'wet'] if word in content)
+        humid_indicators -= sum(1 for word in ['decrease', 'less', 'lower', 'dry'] if word in content)
+        policy.climate_factors['humidity_impact'] = max(min(humid_indicators / 3, 1.0), -1.0)
+
+    # Extract wind impact
+    if any(word in content for word in ['wind', 'breeze', 'gust', 'storm']):
+        wind_indicators = sum(1 for word in ['increase', 'strong', 'higher', 'severe'] if word in content)
+        wind_indicators -= sum(1 for word in ['decrease', 'weak', 'lower', 'mild'] if word in content)
+        policy.climate_factors['wind_impact'] = max(min(wind_indicators / 3, 1.0), -1.0)
+
+    # Extract affected regions, and add key entities to the keywords
+    seen = set(policy.keywords)
+    for text, label in entities:
+        if label == 'GPE':  # Geographical/Political Entity
+            policy.climate_factors['affected_regions'].add(text)
+        if label in ['ORG', 'GPE', 'DATE', 'MONEY'] and text.lower() not in seen:
+            seen.add(text.lower())
+            policy.keywords.append(text.lower())
+
+async def split_into_policies(document: Union[str, Document], nlp) -> ExtractedPolicies:
     """
     Split a document into two distinct policy sections and analyze them.
     """
     result = ExtractedPolicies()
+    text = document.text if isinstance(document, Document) else document
     sections = text.split('\n\n')  # Split by double newline to separate major sections
     
     # Find sections that look like policy statements
     policy_sections = []
     for section in sections:
-        if any(keyword in section.lower() for keyword in [
-            'policy', 'regulation', 'law', 'act', 'strategy', 'plan',
-            'framework', 'guidance', 'directive', 'measure']):
+        if any(keyword in section.lower() for keyword in POLICY_KEYWORDS):
             policy_sections.append(section)
     
     # If we found policy sections, use them; otherwise split the text in half
@@ -43,60 +85,67 @@ async def split_into_policies(text: str, nlp) -> ExtractedPolicies:
         result.policy2.content = '\n'.join(policy_sections[1:])
     else:
         # Split text roughly in half at sentence boundary
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        mid = len(sentences) // 2
-        result.policy1.content = ' '.join(sentences[:mid])
-        result.policy2.content = ' '.join(sentences[mid:])
+        document = as_document(document)
+        mid = len(document) // 2
+        result.policy1.content = document.span_text(0, mid)
+        result.policy2.content = document.span_text(mid, len(document))
     
-    # Extract keywords and topics for each policy
+    # Extract keywords: the most distinctive terms by corpus TF-IDF, no parse needed
     for policy in [result.policy1, result.policy2]:
-        doc = nlp(policy.content)
-        # Extract key phrases and entities
-        policy.keywords = {token.text.lower() for token in doc if not token.is_stop and token.is_alpha}
-        for ent in doc.ents:
-            if ent.label_ in ['ORG', 'GPE', 'DATE', 'MONEY']:
-                policy.keywords.add(ent.text.lower())
+        policy.keywords = top_keywords(policy.content, KEYWORD_TOP_K)
     
-    # Find shared keywords
-    result.shared_keywords = list(result.policy1.keywords & result.policy2.keywords)
+    # Analyze climate impacts for each policy (chunked NER, both policies in one pass)
+    policies = [result.policy1, result.policy2]
+    spans = await find_entities_many([p.content for p in policies], nlp)
+    for policy, policy_spans in zip(policies, spans):
+        analyze_climate_factors(policy, [(policy.content[s:e], label) for s, e, label in policy_spans])
     
-    # Analyze climate impacts for each policy
-    for policy in [result.policy1, result.policy2]:
-        # Extract temperature impact
-        if any(word in policy.content.lower() for word in ['temperature', 'warming', 'heat', 'cooling', 'thermal']):
-            temp_indicators = sum(1 for word in ['increase', 'rise', 'higher', 'hot'] if word in policy.content.lower())
-            temp_indicators -= sum(1 for word in ['decrease', 'reduce', 'lower', 'cool'] if word in policy.content.lower())
-            policy.climate_factors['temperature_impact'] = max(min(temp_indicators / 3, 1.0), -1.0)
-
-        # Extract humidity impact
-        if any(word in policy.content.lower() for word in ['humidity', 'moisture', 'precipitation', 'rainfall']):
-            humid_indicators = sum(1 for word in ['increase', 'more', 'higher', 'wet'] if word in policy.content.lower())
-            humid_indicators -= sum(1 for word in ['decrease', 'less', 'lower', 'dry'] if word in policy.content.lower())
-            policy.climate_factors['humidity_impact'] = max(min(humid_indicators / 3, 1.0), -1.0)
-
-        # Extract wind impact
-        if any(word in policy.content.lower() for word in ['wind', 'breeze', 'gust', 'storm']):
-            wind_indicators = sum(1 for word in ['increase', 'strong', 'higher', 'severe'] if word in policy.content.lower())
-            wind_indicators -= sum(1 for word in ['decrease', 'weak', 'lower', 'mild'] if word in policy.content.lower())
-            policy.climate_factors['wind_impact'] = max(min(wind_indicators / 3, 1.0), -1.0)
-
-        # Extract affected regions
-        doc = nlp(policy.content)
-        for ent in doc.ents:
-            if ent.label_ == 'GPE':  # Geographical/Political Entity
-                policy.climate_factors['affected_regions'].add(ent.text)
+    # Find shared keywords
+    result.shared_keywords = sorted(set(result.policy1.keywords) & set(result.policy2.keywords))
     
     # Analyze the complete document
-    result.analysis = await analyze_document(text, nlp)
+    result.analysis = await analyze_document(document, nlp)
     
     return result
 
-async def analyze_document(text: str, nlp) -> PolicyAnalysis:
+def _prepare_sections(raw_text: str, max_sections: int) -> List[PolicySection]:
+    # Imported here so the analyzer doesn't need the PDF/DOCX readers
+    from utils.document_processor import preprocess_text
+    sections = []
+    for title, content in split_sections(raw_text, max_sections=max_sections):
+        section = PolicySection()
+        section.title = title
+        section.content = sanitize_text(preprocess_text(content))
+        if section.content:
+            section.keywords = top_keywords(section.content, KEYWORD_TOP_K)
+            sections.append(section)
+    return sections
+
+async def split_into_sections(raw_text: str, nlp, max_sections: int = 50) -> List[PolicySection]:
+    """
+    N-way split (utils/policy_sections.py) of the extracted text, before line
+    breaks are collapsed. Each section is cleaned like the full document and
+    analysed like split_into_policies, with one nlp.pipe pass over all sections.
+    """
+    # Splitting, cleaning and keyword ranking are linear in the document: off the event loop
+    sections = await asyncio.to_thread(_prepare_sections, raw_text, max_sections)
+    spans = await find_entities_many([s.content for s in sections], nlp)
+    for section, section_spans in zip(sections, spans):
+        analyze_climate_factors(section, [(section.content[s:e], label) for s, e, label in section_spans])
+    return sections
+
+async def analyze_document(document: Union[str, Document], nlp) -> PolicyAnalysis:
     analysis = PolicyAnalysis()
-    sentences = re.split(r'(?<=[.!?])\s+', text)
+    document = as_document(document)
+    # Lowercase once and slice, unless lowercasing changes lengths (some non-ASCII letters)
+    lower = document.text.lower()
+    if len(lower) != len(document.text):
+        lower = None
+    # One scan of the whole text instead of one search per sentence
+    timeline_sentences = {document.sentence_at(m.start()) for m in YEAR_PATTERN.finditer(document.text)}
 
-    for sentence in sentences:
-        s_lower = sentence.lower()
+    for i, sentence in enumerate(document.sentences()):
+        s_lower = lower[document.starts[i]:document.ends[i]] if lower is not None else sentence.lower()
 
         # Mitigation Targets
         if any(word in s_lower for word in ["reduce emissions", "carbon neutral", "renewable", "net zero"]):
@@ -119,7 +168,7 @@ async def analyze_document(text: str, nlp) -> PolicyAnalysis:
             analysis.Stakeholders.append(sentence)
 
         # Targets & Timelines
-        if re.search(r"\b(20[2-5][0-9])\b", sentence):
+        if i in timeline_sentences:
             analysis.Targets_Timelines.append(sentence)
 
         # Sectors Covered
@@ -154,15 +203,22 @@ async def summarize_text(text: str, summarizer, max_length: int = 120, min_lengt
     """
     # Truncate if text is very long
     text = text[:4000]  # Allow longer input for better context
-    result = summarizer(text, max_length=max_length, min_length=min_length, do_sample=False)
+    if isinstance(summarizer, SummarizationScheduler):
+        # Batched with other waiting requests; the scheduler records the inference
+        return await summarizer.summarize(text, max_length=max_length, min_length=min_length)
+    with inference_mode():
+        result = summarizer(text, max_length=max_length, min_length=min_length, do_sample=False)
+    record_inference("bart-large-cnn")
     return result[0]['summary_text']
 
-async def extract_entities(text: str, nlp) -> list:
+async def extract_entities(document: Union[str, Document], nlp) -> list:
     """
-    Extract named entities like Dates, Orgs, Countries, Numbers, etc.
+    Extract named entities like Dates, Orgs, Countries, Numbers, etc.,
+    with the index of the sentence each one occurs in.
     """
-    doc = nlp(text)
+    document = as_document(document)
     entities = []
-    for ent in doc.ents:
-        entities.append({"text": ent.text, "label": ent.label_})
+    # Chunked on sentence boundaries, so any length works (utils/chunked_ner.py)
+    for start, end, label in await find_entities(document, nlp):
+        entities.append({"text": document.text[start:end], "label": label, "sentence": document.sentence_at(start)})
     return entities
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""
+One sentence segmentation per document, as offsets into the original string.
+
+A Document keeps the text once plus two int arrays (sentence start / end
+offsets). Stages iterate sentences or take contiguous ranges as single
+slices instead of re-splitting with their own regexes, and refer to
+sentences by index, so sentence ids mean the same thing in every part of a
+response (e.g. the `sentence` of an entity).
+
+A sentence ends at . ! or ? followed by whitespace, or at a line break.
+Surrounding whitespace is not part of a sentence.
+"""
+import re
+from typing import Iterator, Union
+
+import numpy as np
+
+_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+
+
+class Document:
+    __slots__ = ("text", "starts", "ends")
+
+    def __init__(self, text: str):
+        self.text = text
+        starts, ends = [], []
+        position = len(text) - len(text.lstrip())
+        for match in _BOUNDARY.finditer(text, position):
+            if match.start() > position:
+                starts.append(position)
+                ends.append(match.start())
+            position = match.end()
+        end = len(text.rstrip())
+        if end > position:
+            starts.append(position)
+            ends.append(end)
+        self.starts = np.array(starts, dtype=np.int64)
+        self.ends = np.array(ends, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def sentence(self, i: int) -> str:
+        return self.text[self.starts[i]:self.ends[i]]
+
+    def sentences(self, start: int = 0, stop: int = None) -> Iterator[str]:
+        """Sentence strings, sliced one at a time"""
+        for i in range(start, len(self) if stop is None else min(stop, len(self))):
+            yield self.text[self.starts[i]:self.ends[i]]
+
+    def span_text(self, start: int, stop: int) -> str:
+        """Sentences start..stop-1 as one slice of the original text"""
+        stop = min(stop, len(self))
+        if start >= stop:
+            return ""
+        return self.text[self.starts[start]:self.ends[stop - 1]]
+
+    def sentence_at(self, offset: int) -> int:
+        """Index of the sentence containing (or preceding) a character offset"""
+        return max(0, int(np.searchsorted(self.starts, offset, side="right")) - 1)
+
+
+def as_document(text: Union[str, Document]) -> Document:
+    return text if isinstance(text, Document) else Document(text)
@@ -1,9 +1,11 @@
 import fitz  # PyMuPDF
 import docx
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 from io import BytesIO
+from utils.metrics import StageTimings
+from utils.document_model import Document
 
 def extract_text_from_docx(file_bytes: bytes) -> str:
     """Extract text from a DOCX file"""
@@ -33,28 +35,34 @@ def preprocess_text(text: str) -> str:
     
     return text
 
-def process_document(file_bytes: bytes, filename: str) -> Dict[str, Any]:
+def process_document(file_bytes: bytes, filename: str, timings: Optional[StageTimings] = None) -> Dict[str, Any]:
     """Process document and return structured information"""
+    timings = timings or StageTimings()
     try:
         # Extract text based on file type
-        if filename.lower().endswith('.pdf'):
-            raw_text = extract_text_from_pdf(file_bytes)
-        elif filename.lower().endswith(('.docx', '.doc')):
-            raw_text = extract_text_from_docx(file_bytes)
-        else:
-            raise ValueError("Unsupported file format")
+        with timings.stage("extract"):
+            if filename.lower().endswith('.pdf'):
+                raw_text = extract_text_from_pdf(file_bytes)
+            elif filename.lower().endswith(('.docx', '.doc')):
+                raw_text = extract_text_from_docx(file_bytes)
+            else:
+                raise ValueError("Unsupported file format")
 
         # Preprocess the extracted text
-        processed_text = preprocess_text(raw_text)
+        with timings.stage("clean"):
+            processed_text = preprocess_text(raw_text)
 
         # Basic document statistics
+        # Segmented once; later stages reuse the sentence offsets
+        document = Document(processed_text)
         word_count = len(processed_text.split())
-        sentence_count = len(re.split(r'[.!?]+', processed_text))
+        sentence_count = len(document)
         
         return {
             "filename": filename,
             "raw_text": raw_text,
             "processed_text": processed_text,
+            "document": document,
             "statistics": {
                 "word_count": word_count,
                 "sentence_count": sentence_count,
@@ -0,0 +1,111 @@
+"""
+Dynamic micro-batching for sentence-embedding requests.
+
+Concurrent callers `await batcher.encode(texts)`. A single background task
+collects requests for up to `max_wait_ms` (or until `max_batch_size` texts are
+waiting), sorts the texts by length so padded batches stay short, runs one
+batched `encode` in a worker thread and hands each caller its own rows back.
+While a batch is encoding the next one fills up, so throughput under load
+follows the batch size instead of the request count.
+"""
+import time
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0, on_batch: Optional[Callable[[int, float], None]] = None):
+        """
+        `encode_fn(texts)` must return one embedding row per text, e.g.
+        SentenceTransformer.encode. `on_batch(size, seconds)` is called after
+        every batch, for metrics.
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.on_batch = on_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pending_texts = 0
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self.pending_texts += len(texts)
+        await self._queue.put((list(texts), future))
+        return await future
+
+    def _ensure_worker(self):
+        # The queue and task belong to one event loop; recreate them if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            if self._queue is not None:
+                self._fail_queued(RuntimeError("Embedding batcher restarted; request dropped"))
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    def _fail_queued(self, error: Exception):
+        """Fail requests left in a queue no worker will drain any more"""
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future_loop = future.get_loop()
+            if not future.done() and not future_loop.is_closed():
+                future_loop.call_soon_threadsafe(_set_exception, future, error)
+        self.pending_texts = 0
+
+    async def _collect(self) -> List[Tuple[List[str], asyncio.Future]]:
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            texts = [t for item_texts, _ in batch for t in item_texts]
+            self.pending_texts -= len(texts)
+            # Longest first, so each internal encode chunk pads to similar lengths
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+            start = time.perf_counter()
+            try:
+                encoded = await asyncio.to_thread(self.encode_fn, [texts[i] for i in order])
+            except Exception as e:
+                logging.error(f"Embedding batch of {len(texts)} texts failed: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if self.on_batch is not None:
+                self.on_batch(len(texts), time.perf_counter() - start)
+
+            embeddings = np.empty_like(encoded)
+            embeddings[order] = encoded
+            offset = 0
+            for item_texts, future in batch:
+                # A caller may have gone away (client disconnect cancels its task)
+                if not future.done():
+                    future.set_result(embeddings[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+def _set_exception(future: asyncio.Future, error: Exception):
+    if not future.done():
+        future.set_exception(error)
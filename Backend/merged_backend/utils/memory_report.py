@@ -0,0 +1,90 @@
+"""
+Per-process memory split into unique and shared pages (Linux /proc).
+
+USS (private pages) is what each extra worker really costs; pages shared
+copy-on-write with the preloading master show up in `shared` and are only
+counted once in PSS. Used by GET /memory and the process_memory_bytes gauge.
+"""
+import os
+from typing import Dict, List, Optional
+
+from utils.metrics import Gauge
+
+PROCESS_MEMORY = Gauge(
+    "process_memory_bytes", "Memory of this worker process by kind (rss, pss, uss, shared)", ("kind",)
+)
+
+_SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+
+def process_memory(pid="self") -> Optional[Dict[str, int]]:
+    """rss / pss / uss / shared in bytes from smaps_rollup, or None if unavailable"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in _SMAPS_FIELDS:
+                    values[_SMAPS_FIELDS[name]] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError):
+        return None
+    return {
+        "rss": values.get("rss", 0),
+        "pss": values.get("pss", 0),
+        "uss": values.get("private_clean", 0) + values.get("private_dirty", 0),
+        "shared": values.get("shared_clean", 0) + values.get("shared_dirty", 0),
+    }
+
+
+def child_pids(parent: int) -> List[int]:
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields after ')' are fixed
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == parent:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def memory_report(include_siblings: bool = False) -> Dict:
+    """
+    This process's memory; with include_siblings (workers forked from a
+    preloading master) also the master and every worker, plus totals.
+    """
+    report = {"pid": os.getpid(), "worker": process_memory()}
+    if not include_siblings:
+        return report
+
+    master = os.getppid()
+    workers = []
+    for pid in child_pids(master):
+        memory = process_memory(pid)
+        if memory is not None:
+            workers.append({"pid": pid, **memory})
+    report["master"] = {"pid": master, **(process_memory(master) or {})}
+    report["workers"] = workers
+    report["totals"] = {
+        "workers": len(workers),
+        "rss": sum(w["rss"] for w in workers),
+        "pss": sum(w["pss"] for w in workers) + report["master"].get("pss", 0),
+        "uss": sum(w["uss"] for w in workers),
+    }
+    return report
+
+
+def register_memory_gauges():
+    for kind in ("rss", "pss", "uss", "shared"):
+        PROCESS_MEMORY.set_function(lambda kind=kind: (process_memory() or {}).get(kind, 0), kind=kind)
@@ -0,0 +1,398 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are kept in a module-level registry and
+rendered by the /metrics endpoint. StageTimings measures pipeline stages,
+feeding the stage histogram and the optional `timings` block of responses.
+
+Multi-worker mode (gunicorn_conf.py sets METRICS_MULTIPROC_DIR): every worker
+writes a snapshot of its metrics to `<dir>/<pid>.json` every
+METRICS_FLUSH_INTERVAL seconds (default 5), at exit and whenever it serves a
+scrape, and /metrics renders all snapshots combined, so any worker answers
+for the whole server. Counters and histograms are summed over every worker
+that ever ran (so they never go backwards when one is replaced); gauges
+combine the live workers by their `multiprocess_mode`: "sum", "max", or
+"all" (one series per worker, with a `worker` label set to its pid).
+Other workers' numbers are up to one flush interval old.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR", "").strip()
+FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self, entries: Optional[List] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples(self.state() if entries is None else entries))
+        return lines
+
+    def state(self) -> List:
+        """JSON-serialisable samples of this process: [[label values], value, ...]"""
+        raise NotImplementedError
+
+    def merge(self, snapshots: List[Tuple[int, bool, List]]) -> List:
+        """Combine (pid, alive, state) of every worker into one state"""
+        raise NotImplementedError
+
+    def _samples(self, entries: List) -> List[str]:
+        raise NotImplementedError
+
+
+def _sum_entries(snapshots: List[Tuple[int, bool, List]]) -> List:
+    totals: Dict[Tuple, float] = {}
+    for _, _, entries in snapshots:
+        for labels, value in entries:
+            key = tuple(labels)
+            totals[key] = totals.get(key, 0.0) + value
+    return [[list(k), v] for k, v in totals.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def state(self):
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+    def merge(self, snapshots):
+        return _sum_entries(snapshots)
+
+    def _samples(self, entries):
+        return [f"{self.name}{_format_labels(self.labelnames, tuple(k))} {_format_value(v)}" for k, v in entries]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, multiprocess_mode: str = "all", **kwargs):
+        super().__init__(*args, **kwargs)
+        if multiprocess_mode not in ("all", "sum", "max"):
+            raise ValueError(f"Unknown multiprocess_mode '{multiprocess_mode}'. Use 'all', 'sum' or 'max'.")
+        self.multiprocess_mode = multiprocess_mode
+        self._values: Dict[Tuple, float] = {}
+        self._functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        """Report fn() at scrape time, e.g. the current size of a queue"""
+        with self._lock:
+            self._functions[self._key(labels)] = fn
+
+    def state(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, fn in functions:
+            try:
+                values[key] = float(fn())
+            except Exception:
+                continue
+        return [[list(k), v] for k, v in values.items()]
+
+    def merge(self, snapshots):
+        live = [snapshot for snapshot in snapshots if snapshot[1]]
+        if self.multiprocess_mode == "sum":
+            return _sum_entries(live)
+        if self.multiprocess_mode == "max":
+            highest: Dict[Tuple, float] = {}
+            for _, _, entries in live:
+                for labels, value in entries:
+                    key = tuple(labels)
+                    highest[key] = max(highest.get(key, value), value)
+            return [[list(k), v] for k, v in highest.items()]
+        return [[labels + [str(pid)], value] for pid, _, entries in live for labels, value in entries]
+
+    def _samples(self, entries):
+        lines = []
+        for labels, value in entries:
+            # Combined "all" mode entries carry the worker pid as an extra label
+            names = self.labelnames + ("worker",) if len(labels) > len(self.labelnames) else self.labelnames
+            lines.append(f"{self.name}{_format_labels(names, tuple(labels))} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: Dict[Tuple, List[int]] = {}
+        self._sums: Dict[Tuple, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def state(self):
+        with self._lock:
+            return [[list(k), list(c), self._sums[k]] for k, c in self._counts.items()]
+
+    def merge(self, snapshots):
+        merged: Dict[Tuple, List] = {}
+        for _, _, entries in snapshots:
+            for labels, counts, total in entries:
+                key = tuple(labels)
+                if key not in merged:
+                    merged[key] = [[0] * len(self.buckets), 0.0]
+                merged[key][0] = [a + b for a, b in zip(merged[key][0], counts)]
+                merged[key][1] += total
+        return [[list(k), counts, total] for k, (counts, total) in merged.items()]
+
+    def _samples(self, entries):
+        lines = []
+        for key, counts, total in entries:
+            key = tuple(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    if MULTIPROC_DIR:
+        return _render_all_workers()
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---- multi-worker aggregation ----
+
+def write_snapshot():
+    """Write this worker's metrics to METRICS_MULTIPROC_DIR/<pid>.json (atomically)"""
+    if not MULTIPROC_DIR:
+        return
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    pid = os.getpid()
+    path = os.path.join(MULTIPROC_DIR, f"{pid}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"pid": pid, "metrics": {m.name: m.state() for m in _registry}}, f)
+    os.replace(tmp, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_snapshots() -> List[Dict]:
+    snapshots = []
+    for name in os.listdir(MULTIPROC_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(MULTIPROC_DIR, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # a worker replacing its file, or a torn write from a crash
+    return snapshots
+
+
+def _render_all_workers() -> str:
+    write_snapshot()
+    snapshots = _read_snapshots()
+    own = os.getpid()
+    alive = {s["pid"]: s["pid"] == own or _pid_alive(s["pid"]) for s in snapshots}
+    lines = []
+    for metric in _registry:
+        states = [(s["pid"], alive[s["pid"]], s["metrics"].get(metric.name, [])) for s in snapshots]
+        lines.extend(metric.render(metric.merge(states)))
+    return "\n".join(lines) + "\n"
+
+
+_writer: Optional[threading.Thread] = None
+
+
+def start_snapshot_writer(interval: float = FLUSH_INTERVAL):
+    """Flush this worker's snapshot every `interval` seconds and at exit (no-op outside multi-worker mode)"""
+    global _writer
+    if not MULTIPROC_DIR or _writer is not None:
+        return
+
+    def loop():
+        while True:
+            try:
+                write_snapshot()
+            except Exception:
+                pass  # metrics must never take the worker down; the next flush retries
+            time.sleep(interval)
+
+    _writer = threading.Thread(target=loop, name="metrics-snapshot", daemon=True)
+    _writer.start()
+    atexit.register(write_snapshot)
+
+
+# ---- metrics shared across the API ----
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests currently being handled", multiprocess_mode="sum"
+)
+REQUESTS_IN_PROGRESS.set(0)
+STAGE_LATENCY = Histogram(
+    "pipeline_stage_duration_seconds", "Latency of analysis pipeline stages", ("stage",)
+)
+QUEUE_DEPTH = Gauge(
+    "queue_depth", "Items waiting in internal queues", ("queue",), multiprocess_mode="sum"
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result")
+)
+CACHE_HIT_RATIO = Gauge(
+    "cache_hit_ratio", "Share of cache lookups that were hits", ("cache",)
+)
+MODEL_INFERENCES = Counter(
+    "model_inference_total", "Model inference calls by model", ("model",)
+)
+MODEL_INFERENCE_ITEMS = Counter(
+    "model_inference_items_total", "Texts or rows processed by model inference calls", ("model",)
+)
+ARTIFACT_RELOADS = Counter(
+    "artifact_reloads_total", "Artifacts swapped in at runtime by artifact and outcome (loaded/rebuilt)",
+    ("artifact", "outcome")
+)
+
+INFERENCE_BATCH_SIZE = Histogram(
+    "model_inference_batch_size", "Texts per batched model call", ("model",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    hits = CACHE_REQUESTS.value(cache=cache, result="hit")
+    total = hits + CACHE_REQUESTS.value(cache=cache, result="miss")
+    CACHE_HIT_RATIO.set(hits / total if total else 0.0, cache=cache)
+
+
+def record_inference(model: str, items: int = 1):
+    MODEL_INFERENCES.inc(model=model)
+    MODEL_INFERENCE_ITEMS.inc(items, model=model)
+
+
+def record_batch(model: str, items: int):
+    """One batched inference call, e.g. from the embedding micro-batcher"""
+    record_inference(model, items)
+    INFERENCE_BATCH_SIZE.observe(items, model=model)
+
+
+class StageTimings:
+    """
+    Collects per-stage wall time for one request.
+
+        timings = StageTimings()
+        with timings.stage("extract"):
+            ...
+        timings.as_dict()  # {"extract_ms": 12.3, "total_ms": 12.3}
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stages[name] = self._stages.get(name, 0.0) + elapsed
+            STAGE_LATENCY.observe(elapsed, stage=name)
+
+    def as_dict(self) -> Dict[str, float]:
+        result = {f"{name}_ms": round(seconds * 1000, 2) for name, seconds in self._stages.items()}
+        result["total_ms"] = round(sum(self._stages.values()) * 1000, 2)
+        return result
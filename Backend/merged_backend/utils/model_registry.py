@@ -0,0 +1,248 @@
+"""
+Background model loading and per-model readiness.
+
+Models are registered with a loader and an optional warm-up (one dummy
+inference). `load_all` runs them one after another in a worker thread, so
+the API can answer liveness probes while heavy libraries import, and routes
+declare the models they need with `Depends(requires_models(...))`.
+
+A model that fails to load is retried in the background with exponential
+backoff (MODEL_RETRY_BACKOFF_BASE / MODEL_RETRY_BACKOFF_MAX seconds, default
+5 / 300), so readiness recovers from a transient failure without a restart.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+
+from utils.metrics import Gauge
+
+MODEL_LOAD_SECONDS = Gauge(
+    "model_load_seconds", "Time spent loading and warming up each model", ("model", "phase")
+)
+MODEL_READY = Gauge(
+    "model_ready", "1 when the model is loaded and warmed up", ("model",)
+)
+
+
+class ModelState:
+    def __init__(self, name: str, attr: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], Any]]):
+        self.name = name
+        self.attr = attr
+        self.loader = loader
+        self.warmup = warmup
+        self.status = "pending"  # pending -> loading -> warming -> ready | failed
+        self.load_ms: Optional[float] = None
+        self.warmup_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.next_retry_at: Optional[float] = None
+
+    def as_dict(self) -> Dict:
+        return {
+            "status": self.status,
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+            "error": self.error,
+            "attempts": self.attempts,
+            "next_retry_at": self.next_retry_at,
+        }
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._models: Dict[str, ModelState] = {}
+        self._lock = threading.Lock()
+        self._done: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.retry_base = float(os.environ.get("MODEL_RETRY_BACKOFF_BASE", "5"))
+        self.retry_max = float(os.environ.get("MODEL_RETRY_BACKOFF_MAX", "300"))
+
+    def register(self, name: str, attr: str, loader: Callable[[], Any],
+                 warmup: Optional[Callable[[Any], Any]] = None):
+        """
+        Register a model stored on `app.state.<attr>` once loaded.
+        `warmup(model)` runs one dummy inference so the first real request
+        doesn't pay for lazy initialisation.
+        """
+        self._models[name] = ModelState(name, attr, loader, warmup)
+        MODEL_READY.set(0, model=name)
+
+    @property
+    def ready(self) -> bool:
+        return all(m.status == "ready" for m in self._models.values())
+
+    def is_ready(self, name: str) -> bool:
+        model = self._models.get(name)
+        return model is not None and model.status == "ready"
+
+    def status(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: m.as_dict() for name, m in self._models.items()}
+
+    def start(self, app, warmup: bool = True) -> asyncio.Task:
+        """
+        Start loading every registered model without blocking startup. Models
+        preloaded in a forking master are only warmed up, in this worker.
+        """
+        self._done = asyncio.Event()
+        if self.ready:
+            self._task = asyncio.create_task(self.warm_all(app) if warmup else self._finish())
+        else:
+            self._task = asyncio.create_task(self.load_all(app, warmup))
+        return self._task
+
+    def preload(self, app):
+        """
+        Load every model synchronously, without warm-up, before workers are
+        forked. Warm-up runs per worker: inference in the master would start
+        native thread pools that do not survive fork().
+        """
+        for model in self._models.values():
+            self._load_one(app, model, warmup=False)
+
+    def prepare_for_fork(self, app):
+        """
+        Put loaded models in eval mode with frozen parameters and move every
+        live object to the GC's permanent generation, so forked workers keep the
+        pages shared. (Grad mode is per thread; inference call sites enter
+        torch.inference_mode themselves, see utils.onnx_backend.inference_mode.)
+        """
+        import gc
+        try:
+            import torch
+        except ImportError:
+            torch = None
+        if torch is not None:
+            for model in self._models.values():
+                instance = getattr(app.state, model.attr, None)
+                for module in _torch_modules(instance, torch):
+                    module.eval()
+                    module.requires_grad_(False)
+        gc.collect()
+        gc.freeze()
+
+    async def _finish(self):
+        if self._done is not None:
+            self._done.set()
+
+    async def warm_all(self, app):
+        try:
+            for model in self._models.values():
+                instance = getattr(app.state, model.attr, None)
+                if instance is not None and model.warmup is not None:
+                    await asyncio.to_thread(self._warm_one, model, instance)
+        finally:
+            await self._finish()
+
+    def _warm_one(self, model: ModelState, instance):
+        try:
+            start = time.perf_counter()
+            model.warmup(instance)
+            warmup_s = time.perf_counter() - start
+            self._set(model, warmup_ms=round(warmup_s * 1000, 1))
+            MODEL_LOAD_SECONDS.set(warmup_s, model=model.name, phase="warmup")
+        except Exception as e:
+            # The model itself loaded fine; a failed warm-up only costs the first request
+            logging.error(f"❌ Model warm-up error ({model.name}): {str(e)}")
+
+    async def load_all(self, app, warmup: bool = True):
+        try:
+            for model in self._models.values():
+                if model.status == "ready":
+                    # Preloaded in the master; only the models that failed there are loaded again
+                    if warmup and model.warmup is not None:
+                        await asyncio.to_thread(self._warm_one, model, getattr(app.state, model.attr))
+                    continue
+                await asyncio.to_thread(self._load_one, app, model, warmup)
+        finally:
+            await self._finish()
+        await self._retry_failed(app, warmup)
+
+    async def _retry_failed(self, app, warmup: bool):
+        """Reload failed models with exponential backoff and full jitter until all are ready"""
+        delay = self.retry_base
+        while True:
+            failed = [m for m in self._models.values() if m.status == "failed"]
+            if not failed:
+                return
+            wait_s = random.uniform(delay / 2, delay)
+            for model in failed:
+                self._set(model, next_retry_at=time.time() + wait_s)
+            logging.warning(f"Retrying model load ({', '.join(m.name for m in failed)}) in {wait_s:.0f}s")
+            await asyncio.sleep(wait_s)
+            for model in failed:
+                await asyncio.to_thread(self._load_one, app, model, warmup)
+            delay = min(self.retry_max, delay * 2)
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait until loading finished; True when every model is ready"""
+        if self._done is not None:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        return self.ready
+
+    def _load_one(self, app, model: ModelState, warmup: bool):
+        try:
+            self._set(model, status="loading", attempts=model.attempts + 1, next_retry_at=None)
+            start = time.perf_counter()
+            instance = model.loader()
+            load_s = time.perf_counter() - start
+            self._set(model, load_ms=round(load_s * 1000, 1))
+            MODEL_LOAD_SECONDS.set(load_s, model=model.name, phase="load")
+
+            if warmup and model.warmup is not None:
+                self._set(model, status="warming")
+                start = time.perf_counter()
+                model.warmup(instance)
+                warmup_s = time.perf_counter() - start
+                self._set(model, warmup_ms=round(warmup_s * 1000, 1))
+                MODEL_LOAD_SECONDS.set(warmup_s, model=model.name, phase="warmup")
+
+            # Publish only after warm-up so routes never see a half-initialised model
+            setattr(app.state, model.attr, instance)
+            self._set(model, status="ready", error=None)
+            MODEL_READY.set(1, model=model.name)
+            logging.info(f"✅ {model.name} ready (load {model.load_ms} ms, warmup {model.warmup_ms} ms)")
+        except Exception as e:
+            self._set(model, status="failed", error=str(e))
+            logging.error(f"❌ Model load error ({model.name}): {str(e)}")
+
+    def _set(self, model: ModelState, **fields):
+        with self._lock:
+            for key, value in fields.items():
+                setattr(model, key, value)
+
+    def require(self, names: List[str]):
+        missing = [n for n in names if not self.is_ready(n)]
+        if missing:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Models not ready yet: {', '.join(missing)}",
+                headers={"Retry-After": "5"},
+            )
+
+
+def _torch_modules(instance, torch) -> List:
+    """torch modules held by a loaded model: itself, .model, or a wrapped pipeline's .model"""
+    candidates = [instance, getattr(instance, "model", None)]
+    for attr in ("summarizer", "model"):
+        inner = getattr(instance, attr, None)
+        candidates.append(getattr(inner, "model", None))
+    seen, modules = set(), []
+    for candidate in candidates:
+        if isinstance(candidate, torch.nn.Module) and id(candidate) not in seen:
+            seen.add(id(candidate))
+            modules.append(candidate)
+    return modules
+
+
+def requires_models(*names: str):
+    """Route dependency answering 503 until the named models are ready"""
+    def dependency(request: Request):
+        request.app.state.models.require(list(names))
+    return dependency
@@ -0,0 +1,70 @@
+"""
+Task-specific views of one loaded spaCy pipeline.
+
+en_core_web_sm runs tok2vec, tagger, parser, attribute_ruler, lemmatizer
+and ner on every call. Each call site names the profile it needs and the
+other components are skipped for that call (`disable=`, so concurrent
+requests using different profiles don't interfere):
+
+    ner_only     entities (ner, plus tok2vec only if ner listens to it)
+    tokens_only  tokenizer only: tokens and lexical attributes (is_punct, ...)
+    sentences    sentence boundaries from the small `senter` component
+                 (parser as a fallback when the package has no senter)
+    full         every component enabled by default in the package
+
+    nlp = NlpProfiles(spacy.load("en_core_web_sm"))
+    doc = nlp(text, profile="ner_only")
+    docs = nlp.pipe(texts, profile="ner_only")
+"""
+from typing import Dict, Iterable, List, Tuple
+
+PROFILE_COMPONENTS: Dict[str, Tuple[str, ...]] = {
+    "ner_only": ("ner",),
+    "tokens_only": (),
+    "sentences": ("senter",),
+}
+PROFILES = ("full",) + tuple(PROFILE_COMPONENTS)
+
+
+class NlpProfiles:
+    def __init__(self, nlp):
+        self.nlp = nlp
+        default = list(nlp.pipe_names)
+        # senter ships disabled; enabled here so the sentences profile can use it
+        if "senter" in getattr(nlp, "disabled", ()):
+            nlp.enable_pipe("senter")
+        self._disable: Dict[str, List[str]] = {"full": [p for p in nlp.pipe_names if p not in default]}
+        for profile, components in PROFILE_COMPONENTS.items():
+            if profile == "sentences" and "senter" not in nlp.pipe_names:
+                components = ("parser",)
+            keep = set(components)
+            for name in components:
+                keep.update(self._listened_to(name))
+            self._disable[profile] = [p for p in nlp.pipe_names if p not in keep]
+
+    def _listened_to(self, component: str) -> List[str]:
+        """Shared embedding components (tok2vec) that `component` reads from"""
+        sources = []
+        for name, pipe in self.nlp.pipeline:
+            if component in getattr(pipe, "listening_components", ()):
+                sources.append(name)
+        return sources
+
+    def disabled(self, profile: str) -> List[str]:
+        if profile not in self._disable:
+            raise ValueError(f"Unknown spaCy profile '{profile}'. Use one of: {', '.join(PROFILES)}")
+        return self._disable[profile]
+
+    def __call__(self, text: str, profile: str = "full"):
+        return self.nlp(text, disable=self.disabled(profile))
+
+    def pipe(self, texts: Iterable[str], profile: str = "full", **kwargs):
+        return self.nlp.pipe(texts, disable=self.disabled(profile), **kwargs)
+
+    @property
+    def meta(self):
+        return self.nlp.meta
+
+    @property
+    def max_length(self) -> int:
+        return self.nlp.max_length
@@ -0,0 +1,182 @@
+"""
+Optional ONNX Runtime backend for the two models that dominate CPU cost:
+all-MiniLM-L6-v2 (policy similarity) and bart-large-cnn (summaries).
+
+Selected with INFERENCE_BACKEND=onnx (default: torch). Models are exported
+once with optimum into ONNX_MODEL_DIR (default: artifacts/onnx) and, with
+ONNX_QUANTIZE=1, dynamically quantized to int8. The wrappers keep the
+interfaces the routes already use: `encode(texts)` like SentenceTransformer
+and a summarization pipeline called as `summarizer(text, max_length=...)`.
+
+Export ahead of time (otherwise it happens on first load):
+    python -m utils.onnx_backend --export [--quantize]
+"""
+import os
+import sys
+import shutil
+import logging
+import argparse
+import contextlib
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+
+MINILM_ID = "sentence-transformers/all-MiniLM-L6-v2"
+BART_ID = "facebook/bart-large-cnn"
+DEFAULT_MODEL_DIR = Path(__file__).resolve().parents[1] / "artifacts" / "onnx"
+
+
+def inference_backend() -> str:
+    backend = os.environ.get("INFERENCE_BACKEND", "torch").strip().lower()
+    if backend not in ("torch", "onnx"):
+        raise ValueError(f"Unsupported INFERENCE_BACKEND '{backend}'. Use 'torch' or 'onnx'.")
+    return backend
+
+
+def inference_mode():
+    """
+    torch.inference_mode() for the calling thread, or a no-op when torch isn't
+    loaded (ONNX backend). Grad mode is thread-local, so it has to be entered
+    in the worker thread that runs the model, not once at startup.
+    """
+    torch = sys.modules.get("torch")
+    return torch.inference_mode() if torch is not None else contextlib.nullcontext()
+
+
+def quantize_enabled() -> bool:
+    return os.environ.get("ONNX_QUANTIZE", "0") not in ("0", "", "false")
+
+
+def model_dir() -> Path:
+    return Path(os.environ.get("ONNX_MODEL_DIR", DEFAULT_MODEL_DIR))
+
+
+def _export_path(model_id: str, quantize: bool, root: Optional[Path] = None) -> Path:
+    name = model_id.split("/")[-1] + ("-int8" if quantize else "")
+    return (root or model_dir()) / name
+
+
+def _session_options():
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    threads = int(os.environ.get("ONNX_INTRA_OP_THREADS", "0"))
+    if threads > 0:
+        options.intra_op_num_threads = threads
+    return options
+
+
+def _quantize_dir(src: Path, dst: Path):
+    """Copy an exported model dir, replacing every .onnx graph with a dynamic int8 one"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    dst.mkdir(parents=True, exist_ok=True)
+    for path in src.iterdir():
+        if path.suffix == ".onnx":
+            quantize_dynamic(str(path), str(dst / path.name), weight_type=QuantType.QInt8)
+        elif path.is_file() and not path.name.endswith(".onnx_data"):
+            shutil.copy2(path, dst / path.name)
+
+
+def export_model(model_id: str, ort_class, quantize: bool = False, root: Optional[Path] = None) -> Path:
+    """Export `model_id` to ONNX (and int8) once; later calls return the existing dir"""
+    from transformers import AutoTokenizer
+    fp32_dir = _export_path(model_id, False, root)
+    if not (fp32_dir / "config.json").exists():
+        logging.info(f"Exporting {model_id} to ONNX in {fp32_dir}")
+        tmp_dir = fp32_dir.with_name(fp32_dir.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        ort_class.from_pretrained(model_id, export=True).save_pretrained(tmp_dir)
+        AutoTokenizer.from_pretrained(model_id).save_pretrained(tmp_dir)
+        tmp_dir.replace(fp32_dir)
+    if not quantize:
+        return fp32_dir
+
+    int8_dir = _export_path(model_id, True, root)
+    if not (int8_dir / "config.json").exists():
+        logging.info(f"Quantizing {model_id} to int8 in {int8_dir}")
+        tmp_dir = int8_dir.with_name(int8_dir.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        _quantize_dir(fp32_dir, tmp_dir)
+        tmp_dir.replace(int8_dir)
+    return int8_dir
+
+
+class OnnxSentenceEncoder:
+    """all-MiniLM-L6-v2 under ONNX Runtime: mean pooling + L2 norm, as sentence-transformers does"""
+
+    def __init__(self, quantize: Optional[bool] = None, root: Optional[Path] = None):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+        quantize = quantize_enabled() if quantize is None else quantize
+        path = export_model(MINILM_ID, ORTModelForFeatureExtraction, quantize, root)
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            path, provider="CPUExecutionProvider", session_options=_session_options()
+        )
+        self.max_seq_length = 256
+        self.quantized = quantize
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="np",
+            )
+            hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, 384), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+def load_onnx_summarizer(quantize: Optional[bool] = None, root: Optional[Path] = None):
+    """bart-large-cnn as a regular transformers summarization pipeline backed by ONNX Runtime"""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer, pipeline
+    quantize = quantize_enabled() if quantize is None else quantize
+    path = export_model(BART_ID, ORTModelForSeq2SeqLM, quantize, root)
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        path, provider="CPUExecutionProvider", session_options=_session_options()
+    )
+    return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(path))
+
+
+def load_sentence_encoder(backend: Optional[str] = None):
+    """MiniLM encoder for the configured backend; both expose `encode(texts)`"""
+    if (backend or inference_backend()) == "onnx":
+        return OnnxSentenceEncoder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MINILM_ID)
+
+
+def load_summarizer(backend: Optional[str] = None):
+    if (backend or inference_backend()) == "onnx":
+        return load_onnx_summarizer()
+    from transformers import pipeline
+    return pipeline("summarization", model=BART_ID)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export MiniLM and BART to ONNX for INFERENCE_BACKEND=onnx")
+    parser.add_argument("--export", action="store_true", help="Export both models (no-op if already exported)")
+    parser.add_argument("--quantize", action="store_true", help="Also write dynamic int8 versions")
+    parser.add_argument("--output", default=None, help="Export directory (default: ONNX_MODEL_DIR or artifacts/onnx)")
+    args = parser.parse_args(argv)
+    if not args.export:
+        parser.print_help()
+        return
+
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTModelForSeq2SeqLM
+    root = Path(args.output) if args.output else None
+    for model_id, ort_class in ((MINILM_ID, ORTModelForFeatureExtraction), (BART_ID, ORTModelForSeq2SeqLM)):
+        print(f"{model_id} -> {export_model(model_id, ort_class, args.quantize, root)}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,86 @@
+"""
+Split a document into N policy sections.
+
+Works on the extracted text *before* preprocess_text collapses line breaks:
+a new section starts at a heading line, i.e. a short line that is numbered
+("3.", "2.1", "Article 4", "Section 5") or matches the policy document
+headings shared with the Dhanaga cleaner (utils/section_headers.py),
+including the "=== heading ===" markers it adds. Documents without headings
+fall back to paragraphs. Sections are then kept when they contain a policy
+keyword, and fragments too short to analyse are merged into the previous
+section.
+"""
+import re
+from typing import List, Optional, Tuple
+
+from utils.section_headers import SECTION_HEADERS
+
+POLICY_KEYWORDS = ['policy', 'regulation', 'law', 'act', 'strategy', 'plan',
+                   'framework', 'guidance', 'directive', 'measure']
+
+_HEADING = re.compile("|".join(f"^\\s*{p}" for p in SECTION_HEADERS), re.IGNORECASE)
+# "Article 4", "Section 2", "3.", "4)", "2.1" -- but not a sentence starting with a year or amount
+_NUMBERED = re.compile(r"^\s*(?:(?:article|section|chapter|part|measure)\s+\w+|\d{1,2}(?:[.)]|(?:\.\d{1,2})+\.?))(?:\s|$)",
+                       re.IGNORECASE)
+_MARKER = re.compile(r"^\s*===\s*(.+?)\s*===\s*$")
+MAX_HEADING_WORDS = 12
+
+
+def heading_title(line: str) -> Optional[str]:
+    """The heading text if `line` looks like a section heading, else None"""
+    marker = _MARKER.match(line)
+    if marker:
+        return marker.group(1).strip()
+    stripped = line.strip()
+    if not stripped or len(stripped.split()) > MAX_HEADING_WORDS or stripped.endswith((",", ";")):
+        return None
+    if _NUMBERED.match(stripped) or _HEADING.match(stripped):
+        return stripped.rstrip(":.").strip()
+    return None
+
+
+def _by_headings(text: str) -> List[Tuple[str, str]]:
+    sections: List[Tuple[str, List[str]]] = []
+    title, lines = "", []
+    for line in text.splitlines():
+        heading = heading_title(line)
+        if heading is not None:
+            if any(l.strip() for l in lines):
+                sections.append((title, lines))
+            title, lines = heading, []
+        else:
+            lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append((title, lines))
+    return [(t, "\n".join(ls).strip()) for t, ls in sections]
+
+
+def _by_paragraphs(text: str) -> List[Tuple[str, str]]:
+    return [("", p.strip()) for p in re.split(r"\n\s*\n", text) if p.strip()]
+
+
+def split_sections(text: str, max_sections: int = 50, min_words: int = 25) -> List[Tuple[str, str]]:
+    """
+    (title, content) per policy section, in document order, at most
+    `max_sections` (the remainder is merged into the last one).
+    """
+    sections = _by_headings(text)
+    if len(sections) < 2:
+        sections = _by_paragraphs(text)
+
+    policy = [(t, c) for t, c in sections if any(k in c.lower() for k in POLICY_KEYWORDS)]
+    if len(policy) >= 2:
+        sections = policy
+
+    merged: List[Tuple[str, str]] = []
+    for title, content in sections:
+        if merged and len(content.split()) < min_words:
+            prev_title, prev_content = merged[-1]
+            merged[-1] = (prev_title, f"{prev_content}\n{content}")
+        else:
+            merged.append((title, content))
+
+    if len(merged) > max_sections:
+        tail = "\n".join(c for _, c in merged[max_sections - 1:])
+        merged = merged[:max_sections - 1] + [(merged[max_sections - 1][0], tail)]
+    return merged
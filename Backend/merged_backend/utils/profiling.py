@@ -0,0 +1,174 @@
+"""
+Opt-in, admin-gated profiling of single requests.
+
+A request is profiled when it carries `X-Profile: 1` (or `?profile=1`) and an
+`X-Admin-Token` matching the PROFILING_ADMIN_TOKEN env var. It then runs under
+cProfile; the stats are saved under logs/profiles/ and the response carries an
+`X-Profile-Id` header for the retrieval endpoints:
+
+    GET /admin/profiles                     list stored profiles
+    GET /admin/profiles/{id}?format=text    top functions by cumulative time
+    GET /admin/profiles/{id}?format=prof    raw cProfile stats (snakeviz, flameprof, ...)
+
+Requests without the flag only pay for one header lookup; the flag is
+ignored (the request is served unprofiled) without a valid admin token. cProfile sees the
+whole event-loop thread, so concurrent requests can show up in a profile;
+only one request is profiled at a time.
+"""
+import io
+import os
+import re
+import hmac
+import json
+import time
+import uuid
+import pstats
+import asyncio
+import logging
+import cProfile
+import threading
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+
+PROFILE_DIR = os.path.join("logs", "profiles")
+_PROFILE_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+_profile_lock = threading.Lock()
+
+
+def _admin_token() -> str:
+    return os.environ.get("PROFILING_ADMIN_TOKEN", "").strip()
+
+
+def is_admin(token: str) -> bool:
+    expected = _admin_token()
+    return bool(expected) and hmac.compare_digest(token.encode(), expected.encode())
+
+
+def _wants_profile(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile":
+            return value.strip().lower() in (b"1", b"true", b"yes")
+    if b"profile=" in scope.get("query_string", b""):
+        values = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [])
+        return any(v.lower() in ("1", "true", "yes") for v in values)
+    return False
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware so unprofiled requests skip any extra wrapping"""
+
+    def __init__(self, app, profile_dir: str = PROFILE_DIR):
+        self.app = app
+        self.profile_dir = profile_dir
+
+    async def __call__(self, scope, receive, send):
+        # Without a valid admin token the flag is ignored and the request runs normally
+        if (scope["type"] != "http" or not _wants_profile(scope)
+                or not is_admin(_header(scope, b"x-admin-token"))):
+            await self.app(scope, receive, send)
+            return
+
+        if not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, _with_headers(send, [(b"x-profile-status", b"busy")]))
+            return
+
+        profile_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        profiler = cProfile.Profile()
+        status = {"code": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, _with_headers(send_wrapper, [(b"x-profile-id", profile_id.encode())]))
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            _profile_lock.release()
+            # Off the event loop, and never in place of the route's own response or exception
+            try:
+                await asyncio.to_thread(self._save, profile_id, profiler, scope, status["code"], elapsed)
+            except Exception:
+                logging.exception(f"Could not save profile {profile_id} to {self.profile_dir}")
+
+    def _save(self, profile_id: str, profiler: cProfile.Profile, scope, status_code, elapsed: float):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, profile_id)
+        profiler.dump_stats(base + ".prof")
+        with open(base + ".json", "w") as f:
+            json.dump({
+                "profile_id": profile_id,
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "status": status_code,
+                "duration_ms": round(elapsed * 1000, 2),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            }, f)
+
+
+def _with_headers(send, headers):
+    async def wrapper(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": list(message.get("headers", [])) + headers}
+        await send(message)
+    return wrapper
+
+
+def build_profile_router(profile_dir: str = PROFILE_DIR) -> APIRouter:
+    router = APIRouter(prefix="/admin/profiles", tags=["admin"])
+
+    def require_admin(token: str):
+        if not is_admin(token):
+            raise HTTPException(status_code=403, detail="Valid X-Admin-Token required")
+
+    def profile_path(profile_id: str, ext: str) -> str:
+        if not _PROFILE_ID.match(profile_id):
+            raise HTTPException(status_code=400, detail="Invalid profile id")
+        path = os.path.join(profile_dir, profile_id + ext)
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return path
+
+    @router.get("")
+    async def list_profiles(x_admin_token: str = Header("")):
+        require_admin(x_admin_token)
+        profiles = []
+        if os.path.isdir(profile_dir):
+            for name in sorted(os.listdir(profile_dir), reverse=True):
+                if name.endswith(".json"):
+                    with open(os.path.join(profile_dir, name)) as f:
+                        profiles.append(json.load(f))
+        return {"profiles": profiles}
+
+    @router.get("/{profile_id}")
+    async def get_profile(profile_id: str, format: str = "text", limit: int = 50,
+                          sort: str = "cumulative", x_admin_token: str = Header("")):
+        require_admin(x_admin_token)
+        path = profile_path(profile_id, ".prof")
+        if format == "prof":
+            return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+        if format != "text":
+            raise HTTPException(status_code=400, detail="Unsupported format. Use 'text' or 'prof'.")
+        if sort not in ("cumulative", "tottime", "ncalls"):
+            raise HTTPException(status_code=400, detail="Unsupported sort. Use 'cumulative', 'tottime' or 'ncalls'.")
+
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return PlainTextResponse(out.getvalue())
+
+    return router
@@ -0,0 +1,128 @@
+"""
+Field selection, list caps and fast JSON rendering for large analysis responses.
+
+    ?fields=similarity_score,policies.policy1.summary   keep only these dotted paths
+    ?include=scores,summaries                           named groups of paths (per endpoint)
+    ?max_items=20                                       cap every list; original lengths
+                                                        are reported under "_truncated"
+
+Without any of them the payload is returned unchanged, so existing clients
+see the same response. Paths through a list apply to each element, e.g.
+`fields=entities.text`. Responses are rendered with orjson when installed.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Query
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+
+_LEAF = object()
+
+
+def _default(obj):
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "tolist"):  # numpy arrays and scalars
+        return obj.tolist()
+    if hasattr(obj, "dict"):  # pydantic models
+        return obj.dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson (numpy-aware), skipping FastAPI's jsonable_encoder pass"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default,
+                                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _path_tree(paths: List[str]) -> Dict:
+    tree: Dict = {}
+    for path in paths:
+        node = tree
+        parts = path.split(".")
+        for part in parts[:-1]:
+            child = node.get(part)
+            if child is _LEAF:
+                break  # a parent path already selects everything below
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = _LEAF
+    return tree
+
+
+def _project(value: Any, tree: Dict) -> Any:
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    out = {}
+    for key, sub in tree.items():
+        if key in value:
+            out[key] = value[key] if sub is _LEAF else _project(value[key], sub)
+    return out
+
+
+def _cap(value: Any, max_items: int, path: str, truncated: Dict[str, int]) -> Any:
+    if isinstance(value, dict):
+        return {k: _cap(v, max_items, f"{path}.{k}" if path else str(k), truncated) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = list(value)
+        if len(items) > max_items:
+            truncated[path] = len(items)
+            items = items[:max_items]
+        return [_cap(v, max_items, path, truncated) for v in items]
+    return value
+
+
+class ResponseShape:
+    def __init__(self, paths: Optional[List[str]] = None, max_items: Optional[int] = None):
+        self.tree = _path_tree(paths) if paths else None
+        self.max_items = max_items
+
+    def apply(self, payload: Dict) -> Dict:
+        if self.tree is not None:
+            payload = _project(payload, self.tree)
+        if self.max_items is not None:
+            truncated: Dict[str, int] = {}
+            payload = _cap(payload, self.max_items, "", truncated)
+            if truncated:
+                payload["_truncated"] = truncated
+        return payload
+
+    def respond(self, payload: Dict, status_code: int = 200) -> FastJSONResponse:
+        return FastJSONResponse(self.apply(payload), status_code=status_code)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def response_shape(groups: Optional[Dict[str, List[str]]] = None):
+    """
+    Route dependency parsing fields / include / max_items into a ResponseShape.
+    `groups` maps the names accepted by `include` to dotted paths.
+    """
+    groups = groups or {}
+
+    def dependency(
+        fields: Optional[str] = Query(None, description="Comma-separated dotted paths to return"),
+        include: Optional[str] = Query(None, description=f"Named field groups: {', '.join(groups) or 'none'}"),
+        max_items: Optional[int] = Query(None, ge=0, description="Maximum items per list"),
+    ) -> ResponseShape:
+        paths = _split(fields)
+        for name in _split(include):
+            if name not in groups:
+                raise HTTPException(status_code=400, detail=f"Unknown include group '{name}'. Choose from: {', '.join(groups)}")
+            paths.extend(groups[name])
+        return ResponseShape(paths or None, max_items)
+
+    return dependency
@@ -0,0 +1,16 @@
+"""
+Headings that open a section of a climate policy document, shared by the
+Dhanaga cleaner (StructureCleaners._section_splitting marks them with
+"=== heading ===") and the N-way section splitter (utils/policy_sections.py),
+so both agree on where a section starts. Dependency-free so the Dhanaga agent
+can import it.
+"""
+
+SECTION_HEADERS = [
+    r'\b(introduction|executive\s+summary)\b',
+    r'\b(objectives?|goals?|targets?)\b',
+    r'\b(mitigation|adaptation)\b',
+    r'\b(implementation|monitoring)\b',
+    r'\b(conclusion|summary)\b',
+    r'\b(annex|appendix)\b'
+]
@@ -0,0 +1,103 @@
+"""
+Sentence-level alignment between two long documents.
+
+MiniLM truncates its input at 256 word pieces, so embedding a whole policy
+compares only its opening. Here each document is split into sentences (or
+sliding windows of sentences), every unit is embedded in batches, and the
+sentence x sentence cosine matrix is computed tile by tile so memory stays
+bounded (a 1024 x 1024 float32 tile is 4 MB) even for 5,000-sentence inputs.
+"""
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from utils.document_model import Document, as_document
+
+MIN_WORDS = 3
+DEFAULT_TILE_SIZE = 1024
+
+
+def split_units(text: Union[str, Document], window: int = 1) -> List[str]:
+    """Sentences of at least MIN_WORDS words, joined into sliding windows when window > 1"""
+    sentences = [s for s in as_document(text or "").sentences() if len(s.split()) >= MIN_WORDS]
+    if window <= 1:
+        return sentences
+    if len(sentences) <= window:
+        return [" ".join(sentences)] if sentences else []
+    return [" ".join(sentences[i:i + window]) for i in range(len(sentences) - window + 1)]
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.clip(norms, 1e-12, None)
+
+
+def align_embeddings(emb1: np.ndarray, emb2: np.ndarray, top_k: int = 5,
+                     tile_size: int = DEFAULT_TILE_SIZE) -> Tuple[np.ndarray, np.ndarray, List[Tuple[int, int, float]]]:
+    """
+    Best match per row of emb1, best match per row of emb2 and the top_k
+    (i, j, cosine) pairs overall, without materialising the full matrix.
+    """
+    a, b = _normalize(emb1), _normalize(emb2)
+    best1 = np.full(len(a), -1.0, dtype=np.float32)
+    best2 = np.full(len(b), -1.0, dtype=np.float32)
+    top_scores = np.empty(0, dtype=np.float32)
+    top_rows = np.empty(0, dtype=np.int64)
+    top_cols = np.empty(0, dtype=np.int64)
+
+    for i0 in range(0, len(a), tile_size):
+        a_tile = a[i0:i0 + tile_size]
+        for j0 in range(0, len(b), tile_size):
+            scores = a_tile @ b[j0:j0 + tile_size].T
+            np.maximum(best1[i0:i0 + len(scores)], scores.max(axis=1), out=best1[i0:i0 + len(scores)])
+            np.maximum(best2[j0:j0 + scores.shape[1]], scores.max(axis=0), out=best2[j0:j0 + scores.shape[1]])
+
+            if top_k > 0:
+                flat = scores.ravel()
+                k = min(top_k, flat.size)
+                idx = np.argpartition(flat, -k)[-k:]
+                top_scores = np.concatenate([top_scores, flat[idx]])
+                top_rows = np.concatenate([top_rows, i0 + idx // scores.shape[1]])
+                top_cols = np.concatenate([top_cols, j0 + idx % scores.shape[1]])
+                if len(top_scores) > top_k:
+                    keep = np.argpartition(top_scores, -top_k)[-top_k:]
+                    top_scores, top_rows, top_cols = top_scores[keep], top_rows[keep], top_cols[keep]
+
+    order = np.argsort(-top_scores)
+    pairs = [(int(top_rows[n]), int(top_cols[n]), float(top_scores[n])) for n in order]
+    return best1, best2, pairs
+
+
+def alignment_report(units1: List[str], units2: List[str], emb1: np.ndarray, emb2: np.ndarray,
+                     top_k: int = 5, tile_size: int = DEFAULT_TILE_SIZE, threshold: float = 0.7) -> Dict:
+    """
+    Document-level scores as the mean of best alignments in each direction,
+    their average as `similarity_score`, and the top_k aligned pairs.
+    """
+    if not units1 or not units2:
+        return {
+            "similarity_score": 0.0,
+            "policy1_to_policy2": 0.0,
+            "policy2_to_policy1": 0.0,
+            "policy1_coverage": 0.0,
+            "policy2_coverage": 0.0,
+            "units": {"policy1": len(units1), "policy2": len(units2)},
+            "top_pairs": [],
+        }
+    best1, best2, pairs = align_embeddings(emb1, emb2, top_k, tile_size)
+    forward, backward = float(best1.mean()), float(best2.mean())
+    return {
+        "similarity_score": (forward + backward) / 2,
+        "policy1_to_policy2": forward,
+        "policy2_to_policy1": backward,
+        # Share of units with a counterpart at or above `threshold`
+        "policy1_coverage": float((best1 >= threshold).mean()),
+        "policy2_coverage": float((best2 >= threshold).mean()),
+        "units": {"policy1": len(units1), "policy2": len(units2)},
+        "top_pairs": [
+            {"policy1_index": i, "policy2_index": j, "score": score,
+             "policy1_text": units1[i], "policy2_text": units2[j]}
+            for i, j, score in pairs
+        ],
+    }
@@ -0,0 +1,131 @@
+"""
+Batched, length-bucketed scheduling for the BART summarizer.
+
+Callers from every request `await scheduler.summarize(text)`. Requests are
+grouped by input length (token buckets) and generation settings; a bucket is
+dispatched as one `summarizer(texts, batch_size=n)` call once it holds
+`max_batch_size` requests or its oldest request has waited `max_wait_ms`.
+Similar lengths keep padding, and therefore wasted encoder/decoder work, low.
+One batch runs at a time in a worker thread; the next ones fill meanwhile.
+"""
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.onnx_backend import inference_mode
+
+DEFAULT_BUCKET_EDGES = (64, 128, 256, 512, 1024)
+
+
+class _Pending:
+    __slots__ = ("text", "future", "enqueued")
+
+    def __init__(self, text: str, future: asyncio.Future):
+        self.text = text
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class SummarizationScheduler:
+    def __init__(self, summarizer, max_batch_size: int = 8, max_wait_ms: float = 25.0,
+                 bucket_edges: Tuple[int, ...] = DEFAULT_BUCKET_EDGES,
+                 on_batch: Optional[Callable[[int, float], None]] = None):
+        """
+        `summarizer` is a transformers summarization pipeline. `on_batch(size,
+        seconds)` is called after every batch, for metrics.
+        """
+        self.summarizer = summarizer
+        self.tokenizer = getattr(summarizer, "tokenizer", None)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.bucket_edges = tuple(sorted(bucket_edges))
+        self.on_batch = on_batch
+        # (length bucket, max_length, min_length) -> waiting requests, oldest first
+        self._buckets: Dict[Tuple[int, int, int], List[_Pending]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pending(self) -> int:
+        return sum(len(b) for b in self._buckets.values())
+
+    async def summarize(self, text: str, max_length: int = 120, min_length: int = 40) -> str:
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        key = (self._bucket(text), max_length, min_length)
+        self._buckets.setdefault(key, []).append(_Pending(text, future))
+        self._wakeup.set()
+        return await future
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+
+    def _bucket(self, text: str) -> int:
+        if self.tokenizer is not None:
+            length = len(self.tokenizer(text, truncation=True, max_length=self.bucket_edges[-1])["input_ids"])
+        else:
+            length = len(text) // 4  # rough chars-per-token fallback
+        return self.bucket_edges[min(bisect_left(self.bucket_edges, length), len(self.bucket_edges) - 1)]
+
+    def _next_ready(self) -> Tuple[Optional[Tuple[int, int, int]], Optional[float]]:
+        """A bucket to run now, else how long until the oldest request's wait expires"""
+        now = time.perf_counter()
+        oldest_key, oldest = None, None
+        for key, waiting in self._buckets.items():
+            if len(waiting) >= self.max_batch_size:
+                return key, None
+            if oldest is None or waiting[0].enqueued < oldest:
+                oldest_key, oldest = key, waiting[0].enqueued
+        if oldest is None:
+            return None, None
+        remaining = oldest + self.max_wait - now
+        return (oldest_key, None) if remaining <= 0 else (None, remaining)
+
+    async def _run(self):
+        while True:
+            key, wait = self._next_ready()
+            if key is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            waiting = self._buckets[key]
+            batch = [p for p in waiting[:self.max_batch_size] if not p.future.done()]
+            del waiting[:self.max_batch_size]
+            if not waiting:
+                del self._buckets[key]
+            if batch:
+                await self._run_batch(key, batch)
+
+    def _summarize_batch(self, texts: List[str], max_length: int, min_length: int):
+        with inference_mode():
+            return self.summarizer(texts, max_length=max_length, min_length=min_length,
+                                   do_sample=False, truncation=True, batch_size=len(texts))
+
+    async def _run_batch(self, key: Tuple[int, int, int], batch: List[_Pending]):
+        _, max_length, min_length = key
+        texts = [p.text for p in batch]
+        start = time.perf_counter()
+        try:
+            results = await asyncio.to_thread(self._summarize_batch, texts, max_length, min_length)
+        except Exception as e:
+            logging.error(f"Summarization batch of {len(texts)} failed: {str(e)}")
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(e)
+            return
+        if self.on_batch is not None:
+            self.on_batch(len(texts), time.perf_counter() - start)
+        for p, result in zip(batch, results):
+            if not p.future.done():
+                p.future.set_result(result["summary_text"])
@@ -0,0 +1,9 @@
+"""
+The term tokenizer shared by the writer of the corpus statistics (the Dhanaga
+document store, on every ingest) and their reader (utils/term_stats.py), so
+document frequencies are counted over exactly the terms they are looked up
+with. Dependency-free so the Dhanaga agent can import it.
+"""
+import re
+
+TERM_PATTERN = re.compile(r"[a-z][a-z0-9]*(?:[-'][a-z0-9]+)*|\d+(?:\.\d+)?%?")
@@ -0,0 +1,249 @@
+"""
+Ranked overlap/unique terms between two policies.
+
+Both texts are tokenized once (lowercase words, stopwords dropped) into one
+interned vocabulary; the set algebra then runs on sorted integer id arrays and
+terms are ranked by count x IDF from a corpus statistics table, so only the
+top-k terms per bucket (with counts and totals) are returned.
+
+The same statistics drive `top_keywords`, the per-policy keyword extraction.
+
+The corpus table is read from the Dhanaga document store when TERM_STATS_DB
+points at its SQLite file (kept up to date on every ingest), otherwise from a
+JSON file (TERM_STATS_PATH, default
+artifacts/term_stats.json) built from a folder of policies:
+    python -m utils.term_stats build test_data/ data/policies/
+Without either every IDF is 1 and terms rank by raw count. The table is
+loaded on first use; `watch()` (started by main.py) reloads it in a worker
+thread when its file changes and swaps it in, so requests never wait for a
+reload.
+"""
+import os
+import json
+import asyncio
+import logging
+import math
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from utils.term_pattern import TERM_PATTERN
+
+DEFAULT_STATS_PATH = Path(__file__).resolve().parents[1] / "artifacts" / "term_stats.json"
+_stop_words: Optional[frozenset] = None
+_corpus_stats: Optional["CorpusStats"] = None
+_corpus_source = {"mtime": None}
+
+
+def stop_words() -> frozenset:
+    global _stop_words
+    if _stop_words is None:
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+        _stop_words = frozenset(ENGLISH_STOP_WORDS)
+    return _stop_words
+
+
+def tokenize(text: str) -> List[str]:
+    stops = stop_words()
+    return [t for t in TERM_PATTERN.findall((text or "").lower()) if len(t) > 1 and t not in stops]
+
+
+class CorpusStats:
+    """Document frequencies over a reference corpus, for smoothed IDF"""
+
+    def __init__(self, documents: int = 0, document_frequency: Optional[Dict[str, int]] = None):
+        self.documents = documents
+        self.document_frequency = document_frequency or {}
+
+    @classmethod
+    def load(cls, path) -> "CorpusStats":
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data.get("documents", 0), data.get("document_frequency", {}))
+
+    @classmethod
+    def from_sqlite(cls, db_path) -> "CorpusStats":
+        """Read the term statistics tables of the Dhanaga document store"""
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM corpus_counters WHERE name = 'documents'").fetchone()
+            frequencies = dict(conn.execute("SELECT term, df FROM term_document_frequency"))
+        finally:
+            conn.close()
+        return cls(row[0] if row else 0, frequencies)
+
+    def save(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"documents": self.documents, "document_frequency": self.document_frequency}, f)
+        os.replace(tmp, path)
+
+    def add_document(self, text: str):
+        self.documents += 1
+        for term in set(tokenize(text)):
+            self.document_frequency[term] = self.document_frequency.get(term, 0) + 1
+
+    def idf(self, terms: Iterable[str]) -> np.ndarray:
+        # Same smoothing as scikit-learn: ln((1 + N) / (1 + df)) + 1
+        n = self.documents
+        df = self.document_frequency
+        return np.array([math.log((1 + n) / (1 + df.get(t, 0))) + 1 for t in terms], dtype=np.float64)
+
+
+def get_corpus_stats() -> CorpusStats:
+    """The current corpus table, loaded on first use and replaced by watch() when its file changes"""
+    if _corpus_stats is None:
+        reload_corpus_stats()
+    return _corpus_stats
+
+
+def reload_corpus_stats() -> bool:
+    """
+    Load the corpus table if its file changed since the last load. The new
+    table is built aside and swapped in with one assignment, so readers see
+    either the old or the new table. Returns True when it was replaced.
+    """
+    global _corpus_stats
+    db_path = os.environ.get("TERM_STATS_DB", "").strip()
+    path = db_path or os.environ.get("TERM_STATS_PATH", str(DEFAULT_STATS_PATH))
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    if _corpus_stats is not None and mtime == _corpus_source["mtime"]:
+        return False
+    try:
+        stats = CorpusStats.from_sqlite(path) if db_path and mtime else CorpusStats.load(path)
+    except sqlite3.Error as e:
+        # Keep the current table; the next check retries
+        logging.error(f"Term statistics load error ({path}): {str(e)}")
+        if _corpus_stats is None:
+            _corpus_stats = CorpusStats()
+        return False
+    _corpus_stats = stats
+    _corpus_source["mtime"] = mtime
+    return True
+
+
+async def watch(interval: float):
+    """Check the corpus table every `interval` seconds and reload it in a worker thread"""
+    from utils.metrics import ARTIFACT_RELOADS
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            reloaded = await asyncio.to_thread(reload_corpus_stats)
+        except Exception:
+            logging.exception("Term statistics reload failed; keeping the current table")
+            continue
+        if reloaded:
+            ARTIFACT_RELOADS.inc(artifact="term_stats", outcome="loaded")
+            logging.info(f"Term statistics reloaded: {_corpus_stats.documents} documents")
+
+
+def _term_counts(tokens: List[str]):
+    """Intern tokens to int ids (first-appearance order); returns (vocab, counts per id)"""
+    index: Dict[str, int] = {}
+    ids = np.fromiter((index.setdefault(t, len(index)) for t in tokens), dtype=np.int64, count=len(tokens))
+    return np.array(list(index), dtype=object), np.bincount(ids, minlength=len(index))
+
+
+def top_keywords(text: str, top_k: int = 25, stats: Optional[CorpusStats] = None) -> List[str]:
+    """
+    The top_k most distinctive terms of `text`: sublinear term frequency
+    (1 + ln tf) times corpus IDF, computed over the document's own vocabulary.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return []
+    vocab, counts = _term_counts(tokens)
+    scores = (1 + np.log(counts)) * (stats or get_corpus_stats()).idf(vocab)
+    return vocab[_top(np.arange(len(vocab)), scores, top_k)].tolist()
+
+
+def _top(ids: np.ndarray, scores: np.ndarray, top_k: int) -> np.ndarray:
+    """ids ordered by descending score (ties: first appearance), cut to top_k"""
+    if top_k <= 0:
+        return ids[:0]
+    if len(ids) > top_k:
+        keep = np.argpartition(-scores[ids], top_k - 1)[:top_k]
+        ids = ids[keep]
+    return ids[np.lexsort((ids, -scores[ids]))]
+
+
+def ranked_overlap_unique(policy1: str, policy2: str, top_k: int = 20,
+                          stats: Optional[CorpusStats] = None) -> Dict:
+    """
+    Top-k overlap / unique terms with counts. The three term lists keep the
+    shape of the plain word-set comparison; `counts` holds matching per-term
+    counts and `totals` the full bucket sizes before the top-k cut.
+    """
+    tokens1, tokens2 = tokenize(policy1), tokenize(policy2)
+    if not tokens1 and not tokens2:
+        empty = {"overlap": [], "unique_policy1": [], "unique_policy2": []}
+        return {**empty, "counts": dict(empty), "totals": {k: 0 for k in empty}, "mode": "ranked"}
+
+    # Intern every token to an int id (first-appearance order) in one pass
+    index: Dict[str, int] = {}
+    ids = np.fromiter((index.setdefault(t, len(index)) for t in tokens1 + tokens2),
+                      dtype=np.int64, count=len(tokens1) + len(tokens2))
+    vocab = np.array(list(index), dtype=object)
+    ids1, ids2 = ids[:len(tokens1)], ids[len(tokens1):]
+    counts1 = np.bincount(ids1, minlength=len(vocab))
+    counts2 = np.bincount(ids2, minlength=len(vocab))
+    present1, present2 = np.flatnonzero(counts1), np.flatnonzero(counts2)
+
+    overlap = np.intersect1d(present1, present2, assume_unique=True)
+    only1 = np.setdiff1d(present1, present2, assume_unique=True)
+    only2 = np.setdiff1d(present2, present1, assume_unique=True)
+
+    idf = (stats or get_corpus_stats()).idf(vocab)
+    top_overlap = _top(overlap, (counts1 + counts2) * idf, top_k)
+    top_only1 = _top(only1, counts1 * idf, top_k)
+    top_only2 = _top(only2, counts2 * idf, top_k)
+
+    return {
+        "overlap": vocab[top_overlap].tolist(),
+        "unique_policy1": vocab[top_only1].tolist(),
+        "unique_policy2": vocab[top_only2].tolist(),
+        "counts": {
+            "overlap": [[int(counts1[i]), int(counts2[i])] for i in top_overlap],
+            "unique_policy1": counts1[top_only1].tolist(),
+            "unique_policy2": counts2[top_only2].tolist(),
+        },
+        "totals": {"overlap": len(overlap), "unique_policy1": len(only1), "unique_policy2": len(only2)},
+        "mode": "ranked",
+    }
+
+
+def _read_text(path: Path) -> str:
+    if path.suffix.lower() == ".txt":
+        return path.read_text(errors="ignore")
+    from utils.document_processor import process_document
+    return process_document(path.read_bytes(), path.name)["processed_text"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the corpus term statistics used to rank policy terms")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Count document frequencies over .txt/.pdf/.docx files")
+    build.add_argument("paths", nargs="+", help="Files or directories")
+    build.add_argument("--output", default=os.environ.get("TERM_STATS_PATH", str(DEFAULT_STATS_PATH)))
+    build.add_argument("--append", action="store_true", help="Add to an existing table instead of replacing it")
+    args = parser.parse_args(argv)
+
+    stats = CorpusStats.load(args.output) if args.append else CorpusStats()
+    for root in map(Path, args.paths):
+        files = sorted(root.rglob("*")) if root.is_dir() else [root]
+        for path in files:
+            if path.suffix.lower() in (".txt", ".pdf", ".docx"):
+                stats.add_document(_read_text(path))
+                print(f"  {path}")
+    stats.save(args.output)
+    print(f"{stats.documents} documents, {len(stats.document_frequency)} terms -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 import re
+from utils.document_model import Document
 
 def sanitize_text(text: str) -> str:
 
     return re.sub(r'[^a-zA-Z0-9\s.,;:!?()-]', '', text)
 
+def sanitize_document(document: Document) -> Document:
+    """sanitize_text for a segmented document; reuses its sentence offsets when nothing was removed"""
+    text = sanitize_text(document.text)
+    return document if text == document.text else Document(text)
+
 def validate_policy_input(text: str) -> bool:
     
     if not text or len(text.strip()) < 10:
@@ -0,0 +1,93 @@
+"""
+Incrementally updatable feature encoder for weather rows.
+
+Replaces the OneHotEncoder + StandardScaler ColumnTransformer with the same
+features (cosine similarities are unchanged) laid out so that new data can
+be folded in without touching the history:
+
+    [ scaled numeric features | one-hot slots in order of first appearance ]
+
+- `partial_fit(chunk)` updates the StandardScaler statistics
+  (StandardScaler.partial_fit) and appends unseen categories as new slots at
+  the end, so vectors encoded earlier stay valid after zero-padding.
+- `drift()` reports how far the scaler moved since the history was last
+  fully encoded; rows encoded before that use the older statistics until the
+  next full refit.
+"""
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+CAT_FEATURES = ["location", "month"]
+NUM_FEATURES = ["temperature_c", "humidity_pct", "wind_kmh"]
+
+
+class IncrementalWeatherEncoder:
+    def __init__(self):
+        self.scaler = StandardScaler()
+        self.slots: Dict[str, Dict] = {col: {} for col in CAT_FEATURES}
+        self.n_slots = 0
+        self._encoded_mean = None
+        self._encoded_scale = None
+
+    @property
+    def dim(self) -> int:
+        return len(NUM_FEATURES) + self.n_slots
+
+    @property
+    def rows_seen(self) -> int:
+        return int(getattr(self.scaler, "n_samples_seen_", 0))
+
+    def partial_fit(self, rows: pd.DataFrame) -> "IncrementalWeatherEncoder":
+        if len(rows) == 0:
+            return self
+        self.scaler.partial_fit(rows[NUM_FEATURES].to_numpy(dtype=np.float64))
+        for col in CAT_FEATURES:
+            slots = self.slots[col]
+            for value in pd.unique(rows[col]):
+                if value not in slots:
+                    slots[value] = len(NUM_FEATURES) + self.n_slots
+                    self.n_slots += 1
+        return self
+
+    def fit(self, chunks) -> "IncrementalWeatherEncoder":
+        """Fit on a DataFrame or an iterable of chunks (pd.read_csv(..., chunksize=n))"""
+        for chunk in ([chunks] if isinstance(chunks, pd.DataFrame) else chunks):
+            self.partial_fit(chunk)
+        self.mark_encoded()
+        return self
+
+    def mark_encoded(self):
+        """Record the statistics the whole history is currently encoded with"""
+        self._encoded_mean = self.scaler.mean_.copy()
+        self._encoded_scale = self.scaler.scale_.copy()
+
+    def transform(self, rows: pd.DataFrame) -> np.ndarray:
+        """Dense float32 vectors; categories not seen yet encode as all zeros"""
+        out = np.zeros((len(rows), self.dim), dtype=np.float32)
+        out[:, :len(NUM_FEATURES)] = self.scaler.transform(rows[NUM_FEATURES].to_numpy(dtype=np.float64))
+        positions = np.arange(len(rows))
+        for col in CAT_FEATURES:
+            slots = self.slots[col]
+            columns = np.fromiter((slots.get(v, -1) for v in rows[col]), dtype=np.int64, count=len(rows))
+            known = columns >= 0
+            out[positions[known], columns[known]] = 1.0
+        return out
+
+    def drift(self) -> float:
+        """Largest mean shift (in current standard deviations) or relative scale change since mark_encoded"""
+        if self._encoded_mean is None or self.rows_seen == 0:
+            return 0.0
+        mean_shift = np.abs(self.scaler.mean_ - self._encoded_mean) / self.scaler.scale_
+        scale_change = np.abs(self.scaler.scale_ / self._encoded_scale - 1.0)
+        return float(max(mean_shift.max(), scale_change.max()))
+
+    def stats(self) -> Dict:
+        return {
+            "rows_seen": self.rows_seen,
+            "dim": self.dim,
+            "categories": {col: len(slots) for col, slots in self.slots.items()},
+            "drift": self.drift(),
+        }
@@ -0,0 +1,315 @@
+"""
+Nearest-neighbour indexes over encoded weather rows (cosine similarity).
+
+Vectors are L2-normalised once, so cosine similarity is a dot product.
+
+- ExactIndex: one contiguous float32 matrix, brute-force matrix-vector
+  product plus argpartition. Fine up to a few hundred thousand rows.
+- IVFIndex: spherical k-means coarse quantiser (MiniBatchKMeans) with an
+  inverted list per centroid; a query scans only the `n_probe` lists whose
+  centroids are closest. Training uses a sample, so building and searching
+  stay fast at tens of millions of rows.
+
+Both support incremental `add`, `widen` for trailing feature columns added
+later (new categories) and report their size; `evaluate_recall`
+compares an index against exact search on the same vectors.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+IVF_MIN_ROWS = 100_000
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    if hasattr(vectors, "toarray"):  # scipy sparse from the one-hot encoder
+        vectors = vectors.toarray()
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class _GrowableMatrix:
+    """Row-appendable float32 matrix with amortised O(1) appends"""
+
+    def __init__(self, dim: int, capacity: int = 0):
+        self.data = np.empty((max(capacity, 16), dim), dtype=np.float32)
+        self.size = 0
+
+    def append(self, rows: np.ndarray):
+        needed = self.size + len(rows)
+        if needed > len(self.data):
+            grown = np.empty((max(needed, 2 * len(self.data)), self.data.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = rows
+        self.size = needed
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+    # Pickle only the filled rows, not the spare capacity
+    def __getstate__(self):
+        return {"data": self.view().copy()}
+
+    def __setstate__(self, state):
+        self.data = state["data"]
+        self.size = len(self.data)
+
+    def widen(self, dim: int):
+        """Zero-pad every row to `dim` columns"""
+        if dim > self.data.shape[1]:
+            widened = np.zeros((len(self.data), dim), dtype=np.float32)
+            widened[:self.size, :self.data.shape[1]] = self.data[:self.size]
+            self.data = widened
+
+
+class _GrowableIds:
+    def __init__(self, capacity: int = 0):
+        self.data = np.empty(max(capacity, 16), dtype=np.int64)
+        self.size = 0
+
+    def append(self, ids: np.ndarray):
+        needed = self.size + len(ids)
+        if needed > len(self.data):
+            grown = np.empty(max(needed, 2 * len(self.data)), dtype=np.int64)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = ids
+        self.size = needed
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+    def __getstate__(self):
+        return {"data": self.view().copy()}
+
+    def __setstate__(self, state):
+        self.data = state["data"]
+        self.size = len(self.data)
+
+
+def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Per-row positions of the k highest scores of a 2-D array, best first"""
+    if scores.shape[1] > k:
+        candidates = np.argpartition(scores, -k, axis=1)[:, -k:]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first"""
+    if len(scores) > k:
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class ExactIndex:
+    kind = "exact"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._vectors = _GrowableMatrix(dim)
+
+    @property
+    def size(self) -> int:
+        return self._vectors.size
+
+    def add(self, vectors) -> np.ndarray:
+        """Append rows; ids are their insertion positions"""
+        vectors = normalize_rows(vectors)
+        start = self.size
+        self._vectors.append(vectors)
+        return np.arange(start, start + len(vectors))
+
+    def widen(self, dim: int):
+        """New trailing feature columns (e.g. new one-hot categories); existing rows get zeros"""
+        self._vectors.widen(dim)
+        self.dim = max(self.dim, dim)
+
+    def search(self, query, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        q = normalize_rows(query)[0]
+        scores = self._vectors.view() @ q
+        top = _top_k(scores, k)
+        return top, scores[top]
+
+    def search_batch(self, queries, k: int, max_scores: int = 1 << 24) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """search() for many queries as one matrix product (chunked to bound the score matrix)"""
+        queries = normalize_rows(queries)
+        vectors = self._vectors.view()
+        step = max(1, max_scores // max(1, len(vectors)))
+        results = []
+        for start in range(0, len(queries), step):
+            scores = queries[start:start + step] @ vectors.T
+            top = _top_k_rows(scores, k)
+            results.extend(zip(top, np.take_along_axis(scores, top, axis=1)))
+        return results
+
+    def stats(self) -> Dict:
+        return {"kind": self.kind, "rows": self.size, "dim": self.dim}
+
+
+class IVFIndex:
+    kind = "ivf"
+
+    def __init__(self, dim: int, n_lists: Optional[int] = None, n_probe: int = 8, seed: int = 42):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[_GrowableMatrix] = []
+        self._list_ids: List[_GrowableIds] = []
+        self._size = 0
+        self._kmeans = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors, sample_per_list: int = 64):
+        """Fit the coarse quantiser on (a sample of) the vectors"""
+        from sklearn.cluster import MiniBatchKMeans
+        vectors = normalize_rows(vectors)
+        if self.n_lists is None:
+            self.n_lists = int(np.clip(np.sqrt(len(vectors)), 1, 65536))
+        n_lists = min(self.n_lists, len(vectors))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), n_lists * sample_per_list)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)] if sample_size < len(vectors) else vectors
+        self._kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=self.seed, batch_size=4096, n_init=3)
+        self._kmeans.fit(sample)
+        self.centroids = normalize_rows(self._kmeans.cluster_centers_)
+        self.n_lists = n_lists
+        self._lists = [_GrowableMatrix(self.dim) for _ in range(n_lists)]
+        self._list_ids = [_GrowableIds() for _ in range(n_lists)]
+        self._size = 0
+
+    def _assign(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[i:i + chunk] @ self.centroids.T, axis=1)
+            for i in range(0, len(vectors), chunk)
+        ]) if len(vectors) else np.empty(0, dtype=np.int64)
+
+    def add(self, vectors, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Append rows to their nearest lists; ids default to insertion positions"""
+        vectors = normalize_rows(vectors)
+        if not self.trained:
+            self.train(vectors)
+        if ids is None:
+            ids = np.arange(self._size, self._size + len(vectors))
+        assignments = self._assign(vectors)
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(self.n_lists + 1))
+        for list_no in np.flatnonzero(np.diff(bounds)):
+            members = order[bounds[list_no]:bounds[list_no + 1]]
+            self._lists[list_no].append(vectors[members])
+            self._list_ids[list_no].append(ids[members])
+        self._size += len(vectors)
+        return ids
+
+    def widen(self, dim: int):
+        """New trailing feature columns; centroids and stored rows get zeros"""
+        if dim <= self.dim:
+            return
+        if self.trained:
+            centroids = np.zeros((len(self.centroids), dim), dtype=np.float32)
+            centroids[:, :self.dim] = self.centroids
+            self.centroids = centroids
+        for lst in self._lists:
+            lst.widen(dim)
+        self.dim = dim
+
+    def search(self, query, k: int, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        q = normalize_rows(query)[0]
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probes = _top_k(self.centroids @ q, n_probe)
+        scores = [self._lists[p].view() @ q for p in probes]
+        ids = [self._list_ids[p].view() for p in probes]
+        scores = np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+        top = _top_k(scores, k)
+        return ids[top], scores[top]
+
+    def search_batch(self, queries, k: int, n_probe: Optional[int] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """search() for many queries; centroid scoring is one matrix product"""
+        queries = normalize_rows(queries)
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probes = _top_k_rows(queries @ self.centroids.T, n_probe)
+        results = []
+        for q, q_probes in zip(queries, probes):
+            scores = np.concatenate([self._lists[p].view() @ q for p in q_probes])
+            ids = np.concatenate([self._list_ids[p].view() for p in q_probes])
+            top = _top_k(scores, k)
+            results.append((ids[top], scores[top]))
+        return results
+
+    def exact_search(self, query, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute force over every list, for recall measurements"""
+        return self.search(query, k, n_probe=self.n_lists)
+
+    def stats(self) -> Dict:
+        sizes = np.array([lst.size for lst in self._lists]) if self._lists else np.zeros(1)
+        return {
+            "kind": self.kind,
+            "rows": self.size,
+            "dim": self.dim,
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "largest_list": int(sizes.max()),
+            "mean_list": float(sizes.mean()),
+        }
+
+
+def build_index(vectors, kind: str = "auto", n_probe: int = 8):
+    """'exact', 'ivf', or 'auto' (IVF from IVF_MIN_ROWS rows up)"""
+    vectors = normalize_rows(vectors)
+    if kind == "auto":
+        kind = "ivf" if len(vectors) >= IVF_MIN_ROWS else "exact"
+    if kind == "ivf":
+        index = IVFIndex(vectors.shape[1], n_probe=n_probe)
+        index.train(vectors)
+    elif kind == "exact":
+        index = ExactIndex(vectors.shape[1])
+    else:
+        raise ValueError(f"Unknown index kind '{kind}'. Use 'auto', 'exact' or 'ivf'.")
+    index.add(vectors)
+    return index
+
+
+def evaluate_recall(index, queries, k: int = 5) -> Dict:
+    """recall@k of index.search against exact search, with per-query latencies"""
+    queries = normalize_rows(queries)
+    exact_search = getattr(index, "exact_search", index.search)
+    hits, approx_ms, exact_ms = 0, [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, approx_scores = index.search(q, k)
+        approx_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        exact_ids, exact_scores = exact_search(q, k)
+        exact_ms.append((time.perf_counter() - start) * 1000)
+        # Returned scores are exact cosines, and ties at the k-th score make
+        # any of the tied rows a correct answer
+        kth = exact_scores[-1] if len(exact_scores) else 0.0
+        hits += min(len(exact_ids), int(np.sum(approx_scores >= kth - 1e-6)))
+    return {
+        "index": index.stats(),
+        "queries": len(queries),
+        "k": k,
+        "recall_at_k": hits / max(1, len(queries) * k),
+        "search_ms_p50": float(np.percentile(approx_ms, 50)) if approx_ms else 0.0,
+        "search_ms_p99": float(np.percentile(approx_ms, 99)) if approx_ms else 0.0,
+        "exact_ms_p50": float(np.percentile(exact_ms, 50)) if exact_ms else 0.0,
+    }
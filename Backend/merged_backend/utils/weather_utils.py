@@ -1,80 +1,336 @@
+"""
+Weather history, feature encoder and nearest-neighbour recommender.
+
+New observations are added without a full refit:
+    python -m utils.weather_utils ingest new_day.csv [more.csv ...]
+and the encoder and index are rebuilt over the whole history with:
+    python -m utils.weather_utils refit
+Both write a new version under artifacts/weather_versions/ (CURRENT names the
+live one); the API's watcher loads it, or when the source CSV changes one
+worker rebuilds under a lock on that directory and the others load its
+version, and swaps the in-memory artifacts without a restart.
+"""
 import os
+import json
+import copy
+import time
+import fcntl
 import pickle
+import asyncio
+import logging
+import argparse
+import threading
 import pandas as pd
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import Dict, List
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from utils.metrics import ARTIFACT_RELOADS, record_cache
+from utils.weather_encoder import IncrementalWeatherEncoder
+from utils.weather_index import build_index, evaluate_recall
 
 # Constants
 FEATURES = ["location", "month", "temperature_c", "humidity_pct", "wind_kmh"]
 TARGET = "condition"
+# Numeric feature -> PolicySection.climate_factors impact key
+IMPACT_FEATURES = {"temperature_c": "temperature_impact", "humidity_pct": "humidity_impact", "wind_kmh": "wind_impact"}
+DEFAULT_QUERY = {"location": "Colombo", "month": 8, "temperature_c": 28, "humidity_pct": 75, "wind_kmh": 12}
 
 class WeatherDataProcessor:
-    def __init__(self, data_dir: str = "data", artifacts_dir: str = "artifacts"):
+    def __init__(self, data_dir: str = "data", artifacts_dir: str = "artifacts", index_kind: str = None):
         self.data_dir = data_dir
         self.artifacts_dir = artifacts_dir
         self.data_path = os.path.join(data_dir, "weather_samples.csv")
+        # Legacy single artifact, used until the first versioned one is written
         self.art_path = os.path.join(artifacts_dir, "weather_data.pkl")
+        self.versions_dir = os.path.join(artifacts_dir, "weather_versions")
+        self.current_path = os.path.join(self.versions_dir, "CURRENT")
+        # flock held by whichever process writes versions: the ingest CLI for the
+        # whole ingest, a worker while it rebuilds, the refit CLI
+        self.lock_path = os.path.join(self.versions_dir, ".lock")
+        self.keep_versions = int(os.environ.get("WEATHER_KEEP_VERSIONS", "3"))
+        # "auto" (IVF from weather_index.IVF_MIN_ROWS rows), "exact" or "ivf"
+        self.index_kind = index_kind or os.environ.get("WEATHER_INDEX", "auto")
+        self.n_probe = int(os.environ.get("WEATHER_IVF_NPROBE", "8"))
+        # Swapped as a whole on reload; requests keep the dict they started with
+        self._artifacts = None
+        self._reload_lock = threading.Lock()
+
+    @staticmethod
+    def encode(pipe, rows: pd.DataFrame):
+        return pipe.transform(rows[FEATURES])
+
+    def source_signature(self) -> Optional[str]:
+        try:
+            st = os.stat(self.data_path)
+        except OSError:
+            return None
+        return f"{st.st_mtime_ns}-{st.st_size}"
 
-    def fit_and_serialize(self, data_path: str = None, out_path: str = None):
+    def _build(self, data_path: str = None, chunksize: int = 50_000) -> Dict:
         data_path = data_path or self.data_path
-        out_path = out_path or self.art_path
+        source = self.source_signature() if data_path == self.data_path else None
+        df = pd.concat(pd.read_csv(data_path, chunksize=chunksize), ignore_index=True)
+        encoder = IncrementalWeatherEncoder().fit(df)
+        index = build_index(self.encode(encoder, df), self.index_kind, self.n_probe)
+        return {"pipeline": encoder, "raw_df": df, "index": index, "source": source}
 
-        df = pd.read_csv(data_path)
-        X = df[FEATURES]
-        y = df[TARGET]
+    def fit_and_serialize(self, data_path: str = None, out_path: str = None, chunksize: int = 50_000):
+        """
+        Full refit: encoder statistics and index over the whole history. Written
+        as a new version and swapped in, unless an explicit out_path is given.
+        """
+        if out_path:
+            self._save(self._build(data_path, chunksize), out_path)
+            return out_path
+        with self._versions_lock():
+            art = self._build(data_path, chunksize)
+            out_path = self._write_version(art)
+        self._artifacts = art
+        return out_path
 
-        cat_features = ["location", "month"]
-        num_features = ["temperature_c", "humidity_pct", "wind_kmh"]
+    @staticmethod
+    def _save(art: Dict, out_path: str):
+        # Write then rename, so a reader never sees a half-written pickle
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(art, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, out_path)
 
-        pre = ColumnTransformer([
-            ("cat", OneHotEncoder(handle_unknown="ignore"), cat_features),
-            ("num", StandardScaler(), num_features),
-        ])
+    def _write_version(self, art: Dict) -> str:
+        """Save as versions/<timestamp>.<ns>-<pid>.pkl, point CURRENT at it and prune old versions"""
+        now = time.time_ns()
+        art["version"] = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now // 10**9))}.{now % 10**9:09d}-{os.getpid()}"
+        path = os.path.join(self.versions_dir, f"{art['version']}.pkl")
+        self._save(art, path)
+        tmp_current = f"{self.current_path}.{os.getpid()}.tmp"
+        with open(tmp_current, "w") as f:
+            f.write(art["version"])
+        os.replace(tmp_current, self.current_path)
 
-        pipe = Pipeline([("pre", pre)]).fit(X)
+        versions = sorted(name for name in os.listdir(self.versions_dir) if name.endswith(".pkl"))
+        for name in versions[:-max(1, self.keep_versions)]:
+            try:
+                os.remove(os.path.join(self.versions_dir, name))
+            except OSError:
+                pass
+        return path
 
-        # Save artifacts
-        os.makedirs(os.path.dirname(out_path), exist_ok=True)
-        with open(out_path, "wb") as f:
-            pickle.dump({
-                "pipeline": pipe,
-                "raw_df": df
-            }, f)
+    @contextmanager
+    def _versions_lock(self, blocking: bool = True):
+        """
+        Exclusive lock on the versions directory, shared by every process
+        using it; yields False when blocking=False and another process holds it.
+        """
+        os.makedirs(self.versions_dir, exist_ok=True)
+        with open(self.lock_path, "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
 
-        return out_path
+    def _current_version(self) -> Optional[str]:
+        try:
+            with open(self.current_path) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
 
-    def load_artifacts(self, path: str = None):
-        path = path or self.art_path
-        if not os.path.exists(path):
-            self.fit_and_serialize()
+    def _load_current(self) -> bool:
+        """Load the version CURRENT names, if it is not the one in memory"""
+        version = self._current_version()
+        current = self._artifacts
+        if not version or (current is not None and version == current.get("version")):
+            return False
+        try:
+            self._artifacts = self._read(os.path.join(self.versions_dir, f"{version}.pkl"))
+        except FileNotFoundError:
+            # Pruned by a newer write since CURRENT was read; that one is loaded next time
+            return False
+        return True
+
+    def _read(self, path: str) -> Dict:
         with open(path, "rb") as f:
-            return pickle.load(f)
+            art = pickle.load(f)
+        if not isinstance(art["pipeline"], IncrementalWeatherEncoder) or "index" not in art:
+            # Artifacts from the ColumnTransformer pipeline, before incremental ingestion
+            art["pipeline"] = IncrementalWeatherEncoder().fit(art["raw_df"])
+            art["index"] = build_index(self.encode(art["pipeline"], art["raw_df"]), self.index_kind, self.n_probe)
+        return art
 
-    def recommend(self, query: Dict, top_n: int = 5) -> Dict:
+    def load_artifacts(self, path: str = None):
+        """Encoder, history and search index of the current version; kept in memory"""
+        if path:
+            return self._read(path)
+        cached = self._artifacts is not None
+        record_cache("weather_artifacts", cached)
+        if cached:
+            return self._artifacts
+        with self._reload_lock:
+            if self._artifacts is None and not self._load_current():
+                if self._current_version() is None and os.path.exists(self.art_path):
+                    self._artifacts = self._read(self.art_path)
+                else:
+                    with self._versions_lock():
+                        # Another worker may have written the first version meanwhile
+                        if not self._load_current():
+                            art = self._build()
+                            self._write_version(art)
+                            self._artifacts = art
+        return self._artifacts
+
+    def check_for_updates(self, settle_s: float = 5.0) -> str:
+        """
+        Off the request path: load a newer version written elsewhere (another
+        worker, the ingest CLI) or rebuild when the source CSV changed, then
+        swap. Returns "unchanged", "loaded" or "rebuilt".
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return "unchanged"
+        try:
+            if self._load_current():
+                return "loaded"
+
+            current = self._artifacts
+            source = self.source_signature()
+            if current is None or source is None or source == current.get("source"):
+                return "unchanged"
+            # Wait for other writers of the CSV to finish
+            if time.time() - os.stat(self.data_path).st_mtime < settle_s:
+                return "unchanged"
+            # One process rebuilds; the others (and any process while an ingest
+            # runs) pick up the version it writes on a later poll
+            with self._versions_lock(blocking=False) as locked:
+                if not locked:
+                    return "unchanged"
+                # The rebuild may have finished between reading CURRENT and locking
+                if self._load_current():
+                    return "loaded"
+                art = self._build()
+                self._write_version(art)
+            self._artifacts = art
+            return "rebuilt"
+        finally:
+            self._reload_lock.release()
+
+    async def watch(self, interval: float):
+        """Poll check_for_updates every `interval` seconds in a worker thread"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                outcome = await asyncio.to_thread(self.check_for_updates)
+            except Exception:
+                logging.exception("Weather artifact reload failed; keeping the current version")
+                continue
+            if outcome != "unchanged":
+                ARTIFACT_RELOADS.inc(artifact="weather", outcome=outcome)
+                logging.info(f"Weather artifacts {outcome}: version {self._artifacts.get('version')}")
+
+    def _fold_rows(self, art: Dict, rows: pd.DataFrame):
+        """
+        Fold rows into an artifact's encoder and index without re-encoding
+        existing rows: scaler statistics are updated with partial_fit and new
+        categories become new (zero-padded) columns. The caller extends raw_df.
+        """
+        encoder, index = art["pipeline"], art["index"]
+        encoder.partial_fit(rows)
+        art.pop("_region_profiles", None)
+        index.widen(encoder.dim)
+        index.add(self.encode(encoder, rows))
+
+    def ingest(self, paths, chunksize: int = 50_000, append_to_source: bool = True) -> Dict:
+        """
+        Add new observation CSVs chunk by chunk and write a new artifact
+        version, which running servers pick up through their watcher.
+
+        Only the new rows are encoded. With append_to_source the rows are also
+        appended to the source CSV so the next full refit includes them. When
+        drift exceeds WEATHER_REFIT_DRIFT, refit_recommended is set: older rows
+        are still encoded with the earlier scaler statistics.
+
+        The versions lock is held throughout, so watchers do not start a full
+        rebuild for the CSV that is being appended to; they load the version
+        written here instead. Rows are folded into a copy of the artifacts,
+        swapped in once the version is written, so requests in flight finish
+        on the old version and a failed ingest leaves it untouched.
+        """
+        paths = [paths] if isinstance(paths, str) else list(paths)
+        self.load_artifacts()
+        with self._versions_lock():
+            # A version written while waiting for the lock
+            self._load_current()
+            art = copy.deepcopy(self._artifacts)
+            columns = list(art["raw_df"].columns)
+            # Check every file before appending anything to the source CSV
+            for path in paths:
+                missing = [c for c in columns if c not in pd.read_csv(path, nrows=0).columns]
+                if missing:
+                    raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+            chunks = []
+            for path in paths:
+                for chunk in pd.read_csv(path, chunksize=chunksize):
+                    chunk = chunk[columns]
+                    self._fold_rows(art, chunk)
+                    if append_to_source:
+                        chunk.to_csv(self.data_path, mode="a", header=not os.path.exists(self.data_path), index=False)
+                    chunks.append(chunk)
+
+            rows_added = sum(len(chunk) for chunk in chunks)
+            if chunks:
+                # One concat for the whole ingest instead of one per chunk
+                art["raw_df"] = pd.concat([art["raw_df"], *chunks], ignore_index=True)
+            art["source"] = self.source_signature() if append_to_source else art.get("source")
+            self._write_version(art)
+            self._artifacts = art
+        drift = art["pipeline"].drift()
+        return {
+            "rows_added": rows_added,
+            "rows_total": len(art["raw_df"]),
+            "encoder": art["pipeline"].stats(),
+            "index": art["index"].stats(),
+            "refit_recommended": drift > float(os.environ.get("WEATHER_REFIT_DRIFT", "0.25")),
+        }
+
+    def index_stats(self) -> Dict:
+        art = self.load_artifacts()
+        return {**art["index"].stats(), "version": art.get("version")}
+
+    def evaluate_index(self, n_queries: int = 200, top_n: int = 5, seed: int = 42) -> Dict:
+        """recall@top_n of the index against exact search, on jittered historical rows"""
         art = self.load_artifacts()
-        pipe = art["pipeline"]
         df = art["raw_df"]
+        rng = np.random.default_rng(seed)
+        queries = df.iloc[rng.choice(len(df), min(n_queries, len(df)), replace=False)][FEATURES].copy()
+        for col, scale in (("temperature_c", 1.5), ("humidity_pct", 5.0), ("wind_kmh", 2.0)):
+            queries[col] = queries[col] + rng.normal(0, scale, len(queries))
+        return evaluate_recall(art["index"], self.encode(art["pipeline"], queries), top_n)
 
-        # Transform historical features
-        X_hist = pipe.transform(df[FEATURES])
+    def recommend(self, query: Dict, top_n: int = 5) -> Dict:
+        return self.recommend_batch([query], top_n)[0]
 
-        # Build a single-row dataframe for the query
-        q_df = pd.DataFrame([{k: query[k] for k in FEATURES}])
-        X_q = pipe.transform(q_df)
+    def recommend_batch(self, queries: List[Dict], top_n: int = 5) -> List[Dict]:
+        """recommend() for many queries with one encode and one batched index search"""
+        if not queries:
+            return []
+        art = self.load_artifacts()
+        df = art["raw_df"]
 
-        # Compute cosine similarity
-        sims = cosine_similarity(X_q, X_hist)[0]
-        idx_sorted = np.argsort(sims)[::-1][:top_n]
+        q_df = pd.DataFrame([{k: query[k] for k in FEATURES} for query in queries])
+        X_q = self.encode(art["pipeline"], q_df)
 
-        top_rows = df.iloc[idx_sorted].copy()
-        top_sims = sims[idx_sorted]
+        # Nearest historical rows by cosine similarity (exact or IVF index)
+        return [self._recommendation(df, ids, sims) for ids, sims in art["index"].search_batch(X_q, top_n)]
+
+    @staticmethod
+    def _recommendation(df: pd.DataFrame, idx_sorted, top_sims) -> Dict:
+        top_rows = df.iloc[idx_sorted]
 
         # Aggregate predicted condition (majority vote weighted by similarity)
-        from collections import Counter
         weighted = {}
         for cond, s in zip(top_rows["condition"], top_sims):
             weighted[cond] = weighted.get(cond, 0.0) + float(s)
@@ -84,7 +340,7 @@ class WeatherDataProcessor:
 
         # Build response list
         top_similar = []
-        for (_, row), sim in zip(top_rows.iterrows(), top_sims):
+        for row, sim in zip(top_rows.to_dict("records"), top_sims):
             top_similar.append({
                 "location": row["location"],
                 "month": int(row["month"]),
@@ -100,4 +356,91 @@ class WeatherDataProcessor:
             "confidence": float(conf_norm),
             "top_similar_days": top_similar,
             "message": "Content-based recommendation using cosine similarity on historical weather-like features."
-        }
\ No newline at end of file
+        }
+
+    def _region_profiles(self, art: Dict) -> Dict:
+        """Per-location mean conditions by month, plus the spread used to apply impacts"""
+        profiles = art.get("_region_profiles")
+        if profiles is None:
+            df = art["raw_df"]
+            by_month = df.groupby(["location", "month"])[list(IMPACT_FEATURES)].mean()
+            by_location = df.groupby("location")[list(IMPACT_FEATURES)].mean()
+            profiles = {
+                "by_month": {key: row.to_dict() for key, row in by_month.iterrows()},
+                "by_location": {key: row.to_dict() for key, row in by_location.iterrows()},
+                "names": {str(name).lower(): name for name in by_location.index},
+                "std": df[list(IMPACT_FEATURES)].std().fillna(0.0).to_dict(),
+            }
+            art["_region_profiles"] = profiles
+        return profiles
+
+    def policy_queries(self, climate_factors: Dict, month: int, max_regions: int = 10) -> List[Dict]:
+        """
+        One query per known region a policy mentions (DEFAULT_QUERY's location
+        when none is known): the region's mean conditions for the month,
+        shifted by the policy's temperature/humidity/wind impacts (-1..1) in
+        standard deviations of the history.
+        """
+        profiles = self._region_profiles(self.load_artifacts())
+        regions = []
+        for mention in sorted(climate_factors.get("affected_regions", ())):
+            name = profiles["names"].get(str(mention).strip().lower())
+            if name is not None and name not in regions:
+                regions.append(name)
+        regions = regions[:max_regions] or [DEFAULT_QUERY["location"]]
+
+        queries = []
+        for region in regions:
+            base = (profiles["by_month"].get((region, month))
+                    or profiles["by_location"].get(region)
+                    or {f: DEFAULT_QUERY[f] for f in IMPACT_FEATURES})
+            query = {"location": region, "month": month}
+            for feature, impact_key in IMPACT_FEATURES.items():
+                shifted = base[feature] + climate_factors.get(impact_key, 0.0) * profiles["std"].get(feature, 0.0)
+                query[feature] = round(float(shifted), 1)
+            queries.append(query)
+        return queries
+
+    def recommend_for_policies(self, policies: Dict[str, Dict], month: int, top_n: int = 5) -> Dict[str, List[Dict]]:
+        """
+        Region-aware recommendations for several policies' climate factors.
+        Identical queries are scored once; everything is one recommend_batch call.
+        """
+        per_policy = {name: self.policy_queries(factors, month) for name, factors in policies.items()}
+        unique: Dict[tuple, int] = {}
+        for queries in per_policy.values():
+            for query in queries:
+                unique.setdefault(tuple(query[f] for f in FEATURES), len(unique))
+        results = self.recommend_batch([dict(zip(FEATURES, key)) for key in unique], top_n)
+        return {
+            name: [
+                {"region": query["location"], "query": query, **results[unique[tuple(query[f] for f in FEATURES)]]}
+                for query in queries
+            ]
+            for name, queries in per_policy.items()
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the weather recommender artifacts")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--artifacts-dir", default="artifacts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Add observation CSVs incrementally")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument("--chunksize", type=int, default=50_000)
+    ingest.add_argument("--no-append-source", action="store_true",
+                        help="Do not append the rows to the source CSV")
+    sub.add_parser("refit", help="Refit the encoder and rebuild the index over the whole history")
+    args = parser.parse_args(argv)
+
+    processor = WeatherDataProcessor(data_dir=args.data_dir, artifacts_dir=args.artifacts_dir)
+    if args.command == "ingest":
+        report = processor.ingest(args.paths, chunksize=args.chunksize,
+                                  append_to_source=not args.no_append_source)
+        print(json.dumps(report, indent=2))
+    else:
+        print(processor.fit_and_serialize())
+
+
+if __name__ == "__main__":
+    main()